@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Bulk import/export of projects as newline-delimited LDL documents.
+
+Run from the backend directory:
+    python -m app.bulk_cli export -o backup.ndjson
+    python -m app.bulk_cli import backup.ndjson --batch-size 500
+    python -m app.bulk_cli reindex
+
+The storage backend is chosen as for the API (LUMOS_STORAGE, DB_* / SQLITE_PATH).
+"""
+import argparse
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables before the storage settings are read
+load_dotenv()
+
+from .models.project_model import ProjectModel
+from .services.bulk_service import BulkService, DEFAULT_BULK_BATCH_SIZE, DEFAULT_EXPORT_CHUNK_SIZE
+
+
+def export_projects(bulk, output, after_id, chunk_size):
+    count = 0
+    for line in bulk.export_lines(after_id, chunk_size):
+        output.write(line)
+        count += 1
+    output.flush()
+    print(f"✅ Exported {count} projects", file=sys.stderr)
+    return True
+
+
+def import_projects(bulk, source, batch_size):
+    imported = failed = 0
+    for result in bulk.import_lines(source, batch_size):
+        if result["status"] == "success":
+            imported += 1
+        else:
+            failed += 1
+            print(f"❌ Line {result['line']}: {result['message']}", file=sys.stderr)
+    print(f"✅ Imported {imported} projects, {failed} failed", file=sys.stderr)
+    return failed == 0
+
+
+def reindex_projects(model, chunk_size):
+    count = model.strategy.reindex_search(chunk_size)
+    print(f"✅ Reindexed {count} projects for search", file=sys.stderr)
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Bulk import/export Lumos projects as NDJSON')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = commands.add_parser('export', help='Write every project as one JSON line')
+    export_parser.add_argument('-o', '--output', help='Output file (default: stdout)')
+    export_parser.add_argument('--after-id', type=int, help='Resume after this project id')
+    export_parser.add_argument('--chunk-size', type=int, default=DEFAULT_EXPORT_CHUNK_SIZE,
+                               help='Projects loaded per round of queries')
+
+    import_parser = commands.add_parser('import', help='Create a project per JSON line')
+    import_parser.add_argument('input', nargs='?', help='Input file (default: stdin)')
+    import_parser.add_argument('--batch-size', type=int, default=DEFAULT_BULK_BATCH_SIZE,
+                               help='Projects written per transaction')
+
+    reindex_parser = commands.add_parser('reindex', help='Rebuild the search index of every project')
+    reindex_parser.add_argument('--chunk-size', type=int, default=DEFAULT_EXPORT_CHUNK_SIZE,
+                                help='Projects reindexed per transaction')
+    args = parser.parse_args()
+
+    model = ProjectModel()
+    bulk = BulkService(model)
+    if args.command == 'reindex':
+        ok = reindex_projects(model, args.chunk_size)
+    elif args.command == 'export':
+        if args.output:
+            with open(args.output, 'wb') as output:
+                ok = export_projects(bulk, output, args.after_id, args.chunk_size)
+        else:
+            ok = export_projects(bulk, sys.stdout.buffer, args.after_id, args.chunk_size)
+    else:
+        if args.input:
+            with open(args.input, 'r', encoding='utf-8') as source:
+                ok = import_projects(bulk, source, args.batch_size)
+        else:
+            ok = import_projects(bulk, sys.stdin, args.batch_size)
+    sys.exit(0 if ok else 1)
@@ -1,12 +1,36 @@
-from fastapi import APIRouter, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Header, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
+from datetime import date, datetime
+import asyncio
+import hmac
+import json
+import os
 from ..services.project_service import ProjectService
+from ..services.bulk_service import BulkService, DEFAULT_BULK_BATCH_SIZE, DEFAULT_EXPORT_CHUNK_SIZE, iter_lines
 from ..schemas.project_schema import ProjectExport
 
 router = APIRouter()
 service = ProjectService()
+bulk_service = BulkService(service.model)
+
+# Shared with the proxy, which wakes parked exports through /api/routes
+ROUTES_TOKEN = os.getenv("PROXY_ROUTES_TOKEN", "")
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# HTTP status for the error kinds services report in result["error"]
+ERROR_STATUS = {"not_found": 404, "conflict": 409, "unsupported": 501}
+
+def _error_response(result, status_code=500):
+    return JSONResponse(status_code=ERROR_STATUS.get(result.get("error"), status_code), content=result)
+
+class RouteScale(BaseModel):
+    replicas: int
 
 class ProjectSave(BaseModel):
     project: Dict[str, Any]
@@ -16,17 +40,152 @@ class ProjectSave(BaseModel):
     connections: Optional[List[Dict[str, Any]]] = []
 
 @router.post("/export")
-async def export_project(project_data: ProjectExport):
-    result = await service.export_project(project_data)
-    # Handle any error status prefix
-    if result["status"].startswith("error"):
-        # Extract message after 'error:' if present
-        msg = result["status"].split(":", 1)[1].strip() if ":" in result["status"] else "Error exporting project"
-        raise HTTPException(status_code=400, detail=msg)
-    return {"message": "Project exported successfully","url":result["ngrok_url"]}
+async def export_project(
+    project_data: ProjectExport,
+    request: Request,
+    priority: int = Query(0, ge=-10, le=10),
+    wait: bool = False,
+    x_tenant_id: Optional[str] = Header(None),
+):
+    """
+    Queue an export of a project to a running ui_app container and return
+    its job id. Follow it with GET /api/export/{job_id} or its event stream.
+
+    - priority: higher runs first when exports are queued
+    - X-Tenant-ID header: exports are shared fairly between tenants (defaults to the client address)
+    - wait: hold the request until the export is done and return its URL, as before
+    """
+    tenant = x_tenant_id or (request.client.host if request.client else "default")
+    if wait:
+        result = await service.export_project(project_data, priority=priority, tenant=tenant)
+        # Handle any error status prefix
+        if result["status"].startswith("error"):
+            # Extract message after 'error:' if present
+            msg = result["status"].split(":", 1)[1].strip() if ":" in result["status"] else "Error exporting project"
+            raise HTTPException(status_code=400, detail=msg)
+        return {"message": "Project exported successfully","url":result["ngrok_url"]}
+
+    result = service.submit_export(project_data, priority=priority, tenant=tenant)
+    if result["status"] == "error":
+        print(f"❌ ERROR in export_project: {result['message']}")
+        return JSONResponse(status_code=503, content=result)
+    job_id = result["job_id"]
+    return JSONResponse(status_code=202, content={
+        "status": "accepted",
+        "job_id": job_id,
+        "state": result["state"],
+        "status_url": f"/api/export/{job_id}",
+        "events_url": f"/api/export/{job_id}/events",
+    })
+
+@router.get("/export/jobs")
+async def list_export_jobs():
+    """
+    List this worker's queued, running and recently finished exports
+    """
+    return service.list_export_jobs()
+
+@router.get("/export/{job_id}")
+async def get_export_job(job_id: str):
+    """
+    Get the state, current stage and, once finished, the result or error of an export
+    """
+    result = await service.get_export_job(job_id)
+    if result["status"] == "error":
+        return JSONResponse(status_code=404, content=result)
+    return result
+
+@router.get("/export/{job_id}/events")
+async def export_job_events(job_id: str, after: int = Query(0, ge=0), last_event_id: Optional[int] = Header(None)):
+    """
+    Server-Sent Events stream of an export's progress: queued, running,
+    image_ready, container_started, healthy, route_registered, public_url,
+    then succeeded, failed, cancelled or timed_out. The stream ends with
+    the job. Reconnecting clients resume after Last-Event-ID (or ?after=).
+    While the ui_app image builds, its output arrives as `output` events,
+    which have no id and are not replayed.
+    """
+    result = await service.get_export_job(job_id)
+    if result["status"] == "error":
+        return JSONResponse(status_code=404, content=result)
+    events = service.export_events(job_id, max(after, last_event_id or 0))
+    return StreamingResponse(_stream_events(events), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+async def _stream_events(events, keepalive=15):
+    """Encode events as SSE, with a comment line whenever the stream is idle for `keepalive` seconds."""
+    events = events.__aiter__()
+    next_event = asyncio.ensure_future(events.__anext__())
+    try:
+        while True:
+            done, _ = await asyncio.wait({next_event}, timeout=keepalive)
+            if not done:
+                yield b": keep-alive\n\n"
+                continue
+            try:
+                event = next_event.result()
+            except StopAsyncIteration:
+                return
+            # output lines are live only; an id would make reconnects skip real events
+            event_id = f"id: {event['seq']}\n" if event["stage"] != "output" else ""
+            yield f"{event_id}event: {event['stage']}\ndata: {json.dumps(event)}\n\n".encode()
+            next_event = asyncio.ensure_future(events.__anext__())
+    finally:
+        next_event.cancel()
+
+@router.delete("/export/{job_id}")
+async def cancel_export(job_id: str):
+    """
+    Cancel a queued or running export; a running export's container is removed.
+    An export that identical ones were merged into keeps running until all of
+    them are cancelled. A finished export is released: its container is
+    removed once no other export of the same project uses it
+    """
+    result = await service.cancel_export(job_id)
+    if result["status"] == "error":
+        return JSONResponse(status_code=404, content=result)
+    return result
+
+@router.post("/routes/{route}/wake")
+async def wake_route(route: str, x_routes_token: Optional[str] = Header(None)):
+    """
+    Called by the proxy when a request hits an export parked while idle:
+    starts a container for it again and returns its URL
+    """
+    if ROUTES_TOKEN and not hmac.compare_digest(x_routes_token or "", ROUTES_TOKEN):
+        return JSONResponse(status_code=403, content={"status": "error", "message": "Forbidden"})
+    result = await service.wake_route(route)
+    if result["status"] == "error":
+        print(f"❌ ERROR in wake_route: {result['message']}")
+        return JSONResponse(status_code=404, content=result)
+    return result
+
+@router.get("/routes/{route}/replicas")
+async def get_route_replicas(route: str):
+    """URLs of the containers serving an export's route"""
+    result = await service.get_route_replicas(route)
+    if result["status"] == "error":
+        return JSONResponse(status_code=404, content=result)
+    return result
+
+@router.post("/routes/{route}/scale")
+async def scale_route(route: str, scale: RouteScale):
+    """
+    Run scale.replicas containers for an export (capped at EXPORT_MAX_REPLICAS);
+    busy exports are also scaled automatically from the proxy's traffic
+    """
+    result = await service.scale_route(route, scale.replicas)
+    if result["status"] == "error":
+        print(f"❌ ERROR in scale_route: {result['message']}")
+        return _error_response(result)
+    return result
 
 @router.post("/save")
-async def save_project(project_data: ProjectSave):
+async def save_project(project_data: ProjectSave, project_id: Optional[int] = None):
+    """
+    Save a project. With ?project_id= the existing project is updated in
+    place and only changed agents, tools and connections are written.
+    """
     try:
         print("Received save request with data:")
         print(f"Project: {project_data.project}")
@@ -42,7 +201,7 @@ async def save_project(project_data: ProjectSave):
                 content={"status": "error", "message": "Project name is required"}
             )
         
-        result = service.save_project(project_data.dict())
+        result = await service.save_project_async(project_data.dict(), project_id)
         
         print(f"Save result: {result}")
         
@@ -53,7 +212,8 @@ async def save_project(project_data: ProjectSave):
                 content={"status": "error", "message": result["message"]}
             )
             
-        return {"status": "success", "project_id": result.get("project_id")}
+        return {"status": "success", "project_id": result.get("project_id"),
+                "changes": result.get("changes"), "version": result.get("version")}
     except Exception as e:
         print(f"❌ EXCEPTION in save_project: {str(e)}")
         return JSONResponse(
@@ -62,12 +222,31 @@ async def save_project(project_data: ProjectSave):
         )
 
 @router.get("/projects")
-async def get_all_projects():
+async def get_all_projects(
+    after_id: Optional[int] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    sort: str = "id",
+    fields: Optional[str] = None,
+    stream: bool = False,
+):
     """
-    Retrieve all saved projects from the database
+    Retrieve saved projects from the database.
+
+    - after_id / limit / sort: keyset pagination ordered by `sort` (id or created_at) then id
+    - fields: comma-separated projection, e.g. `fields=name,created_at` (id is always included)
+    - stream: write rows to the client as they are read from a server-side cursor
     """
+    field_list = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
     try:
-        result = service.get_all_projects()
+        if stream:
+            rows = service.iter_projects(after_id, limit, sort, field_list)
+            return StreamingResponse(_stream_projects(rows), media_type="application/json")
+
+        if limit is None and after_id is None and fields is None and sort == "id":
+            # Unpaginated listing kept for existing clients
+            result = await service.get_all_projects_async()
+        else:
+            result = await service.get_projects_page_async(after_id, limit or DEFAULT_PAGE_SIZE, sort, field_list)
         
         # Debug logs
         print(f"Retrieved {len(result.get('projects', []))} projects")
@@ -76,18 +255,81 @@ async def get_all_projects():
             print(f"❌ ERROR in get_all_projects: {result['message']}")
             return {"status": "error", "message": result["message"]}
             
-        return {"status": "success", "projects": result["projects"]}
+        response = {"status": "success", "projects": result["projects"]}
+        if "next_after_id" in result:
+            response["next_after_id"] = result["next_after_id"]
+        return response
+    except ValueError as e:
+        return JSONResponse(
+            status_code=400,
+            content={"status": "error", "message": str(e)}
+        )
     except Exception as e:
         print(f"❌ EXCEPTION in get_all_projects: {str(e)}")
         return {"status": "error", "message": str(e)}
 
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+def _stream_projects(rows, flush_every=200):
+    """Encode project rows as one JSON document, flushing every `flush_every` rows."""
+    yield b'{"status": "success", "projects": ['
+    buffer = []
+    first = True
+    for row in rows:
+        buffer.append(("" if first else ",") + json.dumps(row, default=_json_default))
+        first = False
+        if len(buffer) >= flush_every:
+            yield "".join(buffer).encode()
+            buffer = []
+    if buffer:
+        yield "".join(buffer).encode()
+    yield b"]}"
+
+@router.post("/projects/import")
+async def import_projects(request: Request, batch_size: int = Query(DEFAULT_BULK_BATCH_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    """
+    Import projects from a newline-delimited JSON body, one LDL project per
+    line. Valid lines are written batch_size per transaction; invalid lines
+    are reported by line number without aborting their batch.
+    """
+    imported, errors = 0, []
+    try:
+        async for result in bulk_service.import_lines_async(iter_lines(request.stream()), batch_size):
+            if result["status"] == "success":
+                imported += 1
+            else:
+                errors.append({"line": result["line"], "message": result["message"]})
+    except Exception as e:
+        print(f"❌ EXCEPTION in import_projects: {str(e)}")
+        return JSONResponse(
+            status_code=500,
+            content={"status": "error", "message": str(e), "imported": imported, "errors": errors}
+        )
+    print(f"Imported {imported} projects, {len(errors)} failed")
+    return {"status": "success", "imported": imported,
+            "failed": len(errors), "errors": errors}
+
+@router.get("/projects/export")
+async def export_projects(
+    after_id: Optional[int] = None,
+    chunk_size: int = Query(DEFAULT_EXPORT_CHUNK_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    Stream every project as newline-delimited JSON, one LDL project per
+    line, in id order. Resume an interrupted export with after_id.
+    """
+    return StreamingResponse(bulk_service.export_lines(after_id, chunk_size), media_type="application/x-ndjson")
+
 @router.get("/projects/{project_id}")
 async def get_project_by_id(project_id: int):
     """
     Get details for a specific project by ID
     """
     try:
-        result = service.get_project_by_id(project_id)
+        result = await service.get_project_by_id_async(project_id)
         
         if result["status"] == "error":
             print(f"❌ ERROR in get_project_by_id: {result['message']}")
@@ -102,4 +344,89 @@ async def get_project_by_id(project_id: int):
         return JSONResponse(
             status_code=500,
             content={"status": "error", "message": str(e)}
-        )
\ No newline at end of file
+        )
+
+@router.get("/projects/{project_id}/versions")
+async def list_project_versions(project_id: int):
+    """
+    List the saved versions of a project, oldest first
+    """
+    try:
+        result = await service.list_versions_async(project_id)
+        if result["status"] == "error":
+            print(f"❌ ERROR in list_project_versions: {result['message']}")
+            return _error_response(result)
+        if not result["versions"]:
+            return JSONResponse(
+                status_code=404,
+                content={"status": "error", "message": f"Project with ID {project_id} has no versions"}
+            )
+        return result
+    except Exception as e:
+        print(f"❌ EXCEPTION in list_project_versions: {str(e)}")
+        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+
+@router.get("/projects/{project_id}/versions/diff")
+async def diff_project_versions(project_id: int, from_version: int, to_version: int):
+    """
+    Show what changed between two versions: changed project fields and the
+    added, removed and changed agents, tools and connections
+    """
+    try:
+        result = await service.diff_versions_async(project_id, from_version, to_version)
+        if result["status"] == "error":
+            print(f"❌ ERROR in diff_project_versions: {result['message']}")
+            return _error_response(result, 404)
+        return result
+    except Exception as e:
+        print(f"❌ EXCEPTION in diff_project_versions: {str(e)}")
+        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+
+@router.get("/projects/{project_id}/versions/latest")
+async def get_latest_project_version(project_id: int):
+    """
+    Get the document of the latest saved version of a project
+    """
+    return await get_project_version(project_id, None)
+
+@router.get("/projects/{project_id}/versions/{version_number}")
+async def get_project_version(project_id: int, version_number: Optional[int]):
+    """
+    Get the document of one saved version of a project
+    """
+    try:
+        result = await service.get_version_async(project_id, version_number)
+        if result["status"] == "error":
+            print(f"❌ ERROR in get_project_version: {result['message']}")
+            return _error_response(result, 404)
+        return result
+    except Exception as e:
+        print(f"❌ EXCEPTION in get_project_version: {str(e)}")
+        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+
+@router.get("/search")
+async def search(
+    q: str = "",
+    kind: Optional[str] = None,
+    type: Optional[str] = None,
+    subtype: Optional[str] = None,
+    capability: Optional[str] = None,
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+    offset: int = Query(0, ge=0),
+):
+    """
+    Search the agents and tools of all saved projects.
+
+    - q: terms matched against names, descriptions, types and capabilities; all must match
+    - kind (agent or tool), type, subtype, capability: exact facet filters
+    - limit / offset: pagination over results ranked by score
+    """
+    filters = {"kind": kind, "type": type, "subtype": subtype, "capability": capability}
+    try:
+        result = await service.search_async(q, filters, limit, offset)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+    if result["status"] == "error":
+        print(f"❌ ERROR in search: {result['message']}")
+        return _error_response(result)
+    return result
@@ -61,6 +61,100 @@ def create_database_and_user():
             cursor.close()
             conn.close()
 
+# Columns added to tables since they were first created. CREATE TABLE IF NOT
+# EXISTS leaves existing tables (e.g. loaded from lumos_export_20250413.sql)
+# as they are, so these are added by migrate_schema when missing:
+# (table, column, definition, existing column to copy values from)
+ADDED_COLUMNS = [
+    ("agents", "content_hash", "CHAR(40)", None),
+    ("tools", "tool_id", "VARCHAR(255) NOT NULL DEFAULT ''", None),
+    ("tools", "content_hash", "CHAR(40)", None),
+    ("connections", "connection_id", "VARCHAR(255) NOT NULL DEFAULT ''", None),
+    ("connections", "source", "VARCHAR(255) NOT NULL DEFAULT ''", "source_id"),
+    ("connections", "target", "VARCHAR(255) NOT NULL DEFAULT ''", "target_id"),
+    ("connections", "label", "VARCHAR(255)", None),
+    ("connections", "content_hash", "CHAR(40)", None),
+]
+
+ADDED_INDEXES = [
+    ("agents", "idx_agents_project", "(project_id, agent_id)"),
+    ("tools", "idx_tools_project", "(project_id, tool_id)"),
+    ("connections", "idx_connections_project", "(project_id, connection_id)"),
+]
+
+# Columns of older tables that saves no longer write; made nullable so that
+# inserts without them succeed
+LEGACY_COLUMNS = [
+    ("connections", "source_type"),
+    ("connections", "source_id"),
+    ("connections", "target_type"),
+    ("connections", "target_id"),
+]
+
+def _columns(cursor, db_name, table):
+    """Column name -> (column type, nullable) of a table, from information_schema"""
+    cursor.execute(
+        "SELECT COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s",
+        (db_name, table)
+    )
+    return {name: (column_type, nullable == 'YES') for name, column_type, nullable in cursor.fetchall()}
+
+def _has_index(cursor, db_name, table, index):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s AND INDEX_NAME = %s LIMIT 1",
+        (db_name, table, index)
+    )
+    return bool(cursor.fetchall())
+
+def apply_migrations(cursor, db_name):
+    """Bring existing tables up to schema.sql; returns the statements run"""
+    applied = []
+
+    def run(statement):
+        cursor.execute(statement)
+        applied.append(statement)
+
+    tables = {table for table, *_ in ADDED_COLUMNS + ADDED_INDEXES + LEGACY_COLUMNS}
+    columns = {table: _columns(cursor, db_name, table) for table in sorted(tables)}
+    for table, column, definition, copy_from in ADDED_COLUMNS:
+        # a table missing entirely is left to schema.sql
+        if not columns[table] or column in columns[table]:
+            continue
+        run(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        if copy_from in columns[table]:
+            run(f"UPDATE {table} SET {column} = {copy_from} WHERE {copy_from} IS NOT NULL")
+    for table, column in LEGACY_COLUMNS:
+        if column in columns[table] and not columns[table][column][1]:
+            run(f"ALTER TABLE {table} MODIFY COLUMN {column} {columns[table][column][0]} NULL")
+    for table, index, key in ADDED_INDEXES:
+        if columns[table] and not _has_index(cursor, db_name, table, index):
+            run(f"CREATE INDEX {index} ON {table} {key}")
+    return applied
+
+def migrate_schema():
+    """Add the columns and indexes that existing tables are missing"""
+    conn = None
+    try:
+        conn = get_db_connection(root_conn=True)
+        cursor = conn.cursor()
+        db_name = os.getenv('DB_NAME', 'lumos')
+        cursor.execute(f"USE {db_name}")
+        applied = apply_migrations(cursor, db_name)
+        conn.commit()
+        for statement in applied:
+            print(f"Note: Migrated: {statement}")
+        print(f"✅ Schema up to date ({len(applied)} migrations applied)")
+        return True
+    except Error as e:
+        print(f"❌ Error migrating schema: {str(e)}")
+        return False
+    finally:
+        if conn is not None and conn.is_connected():
+            cursor.close()
+            conn.close()
+
 def execute_sql_file(file_path):
     """Execute SQL commands from file"""
     conn = None  # Initialize conn to None
@@ -122,7 +216,7 @@ if __name__ == "__main__":
     print("🚀 Starting database initialization...")
     
     if create_database_and_user():
-        if execute_sql_file(args.schema):
+        if execute_sql_file(args.schema) and migrate_schema():
             print("🎉 Database setup completed successfully!")
         else:
             print("💥 Failed to initialize schema")
@@ -1,10 +1,11 @@
 from fastapi import FastAPI, Request
-from app.controllers.export_controller import router as export_router
+from app.controllers.export_controller import router as export_router, service as project_service
 from app.controllers.generator_controller import GeneratorController
 # from app.controllers.save_controller import router as save_router
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
+from contextlib import asynccontextmanager
 import time
 from app.utils.metrics_utils import record_latency, get_metrics
 
@@ -12,7 +13,25 @@ from app.utils.metrics_utils import record_latency, get_metrics
 templates = Jinja2Templates(directory=str(Path(__file__).parent / "templates"))
     
 
-app = FastAPI(title="Lumos Backend", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start warming ui_app containers so the first exports don't wait for docker
+    await project_service.warm_pool.start()
+    await project_service.tunnels.start()
+    await project_service.proxy_metrics.start()
+    await project_service.start_exports()
+    await project_service.lifecycle.start()
+    await project_service.replicas.start()
+    yield
+    # Cancel outstanding exports first; they hold claimed containers
+    await project_service.replicas.shutdown()
+    await project_service.lifecycle.shutdown()
+    await project_service.shutdown_exports()
+    await project_service.warm_pool.shutdown()
+    await project_service.tunnels.shutdown()
+    await project_service.proxy_metrics.shutdown()
+
+app = FastAPI(title="Lumos Backend", version="1.0.0", lifespan=lifespan)
 
 # CORS configuration
 app.add_middleware(
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncProjectStorageStrategy(ABC):
+    """Awaitable counterpart of ProjectStorageStrategy for the async handlers."""
+
+    @abstractmethod
+    async def save_project(self, project_data, project_id=None):
+        pass
+
+    @abstractmethod
+    async def create_project(self, project_data):
+        pass
+
+    @abstractmethod
+    async def get_all_projects(self):
+        pass
+
+    @abstractmethod
+    async def get_projects_page(self, after_id=None, limit=50, sort="id", fields=None):
+        pass
+
+    @abstractmethod
+    async def get_project_by_id(self, project_id):
+        pass
+
+
+class ThreadedProjectStorage(AsyncProjectStorageStrategy):
+    """
+    Runs a synchronous ProjectStorageStrategy (and any other blocking
+    database call passed to run()) on a bounded thread pool, so a slow
+    query never blocks the event loop. Size the pool to the number of
+    database connections: more threads would only wait on the pool.
+    """
+
+    def __init__(self, strategy, max_workers=8):
+        self.strategy = strategy
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="storage")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._queue_waits = deque(maxlen=100)
+
+    async def run(self, fn, *args, **kwargs):
+        """Run the blocking callable fn(*args, **kwargs) on the storage pool."""
+        submitted = time.monotonic()
+        with self._lock:
+            self._queued += 1
+
+        def call():
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._queue_waits.append(time.monotonic() - submitted)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, call)
+
+    async def save_project(self, project_data, project_id=None):
+        return await self.run(self.strategy.save_project, project_data, project_id)
+
+    async def create_project(self, project_data):
+        return await self.run(self.strategy.create_project, project_data)
+
+    async def get_all_projects(self):
+        return await self.run(self.strategy.get_all_projects)
+
+    async def get_projects_page(self, after_id=None, limit=50, sort="id", fields=None):
+        return await self.run(self.strategy.get_projects_page, after_id, limit, sort, fields)
+
+    async def get_project_by_id(self, project_id):
+        return await self.run(self.strategy.get_project_by_id, project_id)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        with self._lock:
+            waits = list(self._queue_waits)
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "avg_queue_wait": sum(waits) / len(waits) if waits else 0,
+                "max_queue_wait": max(waits) if waits else 0,
+            }
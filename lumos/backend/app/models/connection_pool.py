@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import deque
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+class PooledConnection:
+    """
+    Wrapper around a raw DB-API connection checked out of a ConnectionPool.
+    Calling close() hands the connection back to the pool instead of
+    tearing down the socket, so existing `conn.close()` call sites keep working.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+        self._released = False
+
+    def close(self):
+        if not self._released:
+            self._released = True
+            self._pool._release(self._raw)
+
+    def invalidate(self):
+        """Close the underlying connection instead of returning it, e.g. after
+        abandoning a half-read streaming result."""
+        if not self._released:
+            self._released = True
+            self._pool._discard(self._raw)
+
+    def is_connected(self):
+        if self._released:
+            return False
+        is_connected = getattr(self._raw, "is_connected", None)
+        return is_connected() if is_connected else True
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of database connections.
+
+    - pool_size: connections kept open while idle
+    - max_overflow: extra connections opened under burst load and closed on return
+    - timeout: seconds to wait for a free connection before PoolTimeoutError
+    - recycle: seconds after which a connection is replaced (0 disables)
+    - pre_ping: check liveness of an idle connection before handing it out
+    """
+
+    def __init__(self, creator, pool_size=5, max_overflow=10, timeout=30.0, recycle=3600, pre_ping=True):
+        self._creator = creator
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._idle = deque()  # raw connections, most recently used on the right
+        self._created_at = {}
+        self._cond = threading.Condition()
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._disposed = False
+
+        self._checkouts = 0
+        self._timeouts = 0
+        self._checkout_latencies = deque(maxlen=100)
+
+    def checkout(self, timeout=None):
+        """Return a PooledConnection, opening a new connection if allowed."""
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        raw = None
+
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._disposed:
+                        raise PoolTimeoutError("Connection pool has been disposed")
+                    if self._idle:
+                        raw = self._idle.pop()
+                        break
+                    if self._open < self.pool_size + self.max_overflow:
+                        self._open += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {timeout}s waiting for a database connection "
+                            f"(pool_size={self.pool_size}, max_overflow={self.max_overflow})"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            if raw is None or not self._is_usable(raw):
+                if raw is not None:
+                    self._close_raw(raw)
+                raw = self._creator()
+                self._created_at[id(raw)] = time.monotonic()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        latency = time.monotonic() - start
+        with self._cond:
+            self._checkouts += 1
+            self._checkout_latencies.append(latency)
+        return PooledConnection(self, raw)
+
+    def connection(self, timeout=None):
+        """Context manager form of checkout()."""
+        return self.checkout(timeout)
+
+    def _is_usable(self, raw):
+        created = self._created_at.get(id(raw), 0)
+        if self.recycle and time.monotonic() - created > self.recycle:
+            return False
+        if self.pre_ping:
+            try:
+                ping = getattr(raw, "ping", None)
+                if ping is not None:
+                    ping(reconnect=False)
+                elif hasattr(raw, "is_connected"):
+                    return raw.is_connected()
+            except Exception:
+                return False
+        return True
+
+    def _reset(self, raw):
+        """Roll back any transaction left open so the next user starts clean."""
+        try:
+            if getattr(raw, "in_transaction", False):
+                raw.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _close_raw(self, raw):
+        self._created_at.pop(id(raw), None)
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _release(self, raw):
+        keep = self._reset(raw)
+        with self._cond:
+            self._in_use -= 1
+            if keep and not self._disposed and len(self._idle) < self.pool_size:
+                self._idle.append(raw)
+                raw = None
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if raw is not None:
+            self._close_raw(raw)
+
+    def _discard(self, raw):
+        with self._cond:
+            self._in_use -= 1
+            self._open -= 1
+            self._cond.notify()
+        self._close_raw(raw)
+
+    def dispose(self):
+        """Close all idle connections; checked-out ones are closed when returned."""
+        with self._cond:
+            self._disposed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for raw in idle:
+            self._close_raw(raw)
+
+    def stats(self):
+        with self._cond:
+            latencies = sorted(self._checkout_latencies)
+            return {
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "waiting": self._waiting,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "avg_checkout_latency": sum(latencies) / len(latencies) if latencies else 0,
+                "p95_checkout_latency": latencies[int(len(latencies) * 0.95) - 1] if latencies else 0,
+                "max_checkout_latency": latencies[-1] if latencies else 0,
+            }
@@ -1,38 +1,66 @@
 import mysql.connector
 from mysql.connector import Error
 import os
+import threading
 from dotenv import load_dotenv
+from .connection_pool import ConnectionPool
+from ..utils.metrics_utils import register_metrics_provider
 
 load_dotenv()
 
 class Database:
+    """
+    Owns the MySQL connection pool. Use Database.instance() so that
+    ProjectModel and every storage strategy share the same pool.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+    Error = Error  # driver error type, for callers that don't import mysql.connector
+
     def __init__(self):
         self.host = os.getenv("DB_HOST")
         self.database = os.getenv("DB_NAME")
         self.user = os.getenv("DB_USER")
         self.password = os.getenv("DB_PASSWORD")
-        self.connection = None
+        self.pool = ConnectionPool(
+            self._create_connection,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_POOL_MAX_OVERFLOW", "10")),
+            timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            recycle=int(os.getenv("DB_POOL_RECYCLE", "3600")),
+            pre_ping=os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes"),
+        )
+
+    @classmethod
+    def instance(cls):
+        """Return the process-wide Database, creating it on first use."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+                    register_metrics_provider("db_pool", cls._instance.pool_stats)
+        return cls._instance
 
-    def connect(self):
+    def _create_connection(self):
         try:
-            self.connection = mysql.connector.connect(
+            return mysql.connector.connect(
                 host=self.host,
                 database=self.database,
                 user=self.user,
                 password=self.password,
                 auth_plugin='mysql_native_password'
             )
-            if self.connection.is_connected():
-                print("Connected to MySQL database")
         except Error as e:
             print(f"Error while connecting to MySQL: {e}")
+            raise
 
     def disconnect(self):
-        if self.connection and self.connection.is_connected():
-            self.connection.close()
-            print("MySQL connection closed")
+        self.pool.dispose()
+        print("MySQL connection pool closed")
 
     def get_connection(self):
-        if not self.connection or not self.connection.is_connected():
-            self.connect()
-        return self.connection
\ No newline at end of file
+        """Check out a pooled connection; close() returns it to the pool."""
+        return self.pool.checkout()
+
+    def pool_stats(self):
+        return self.pool.stats()
@@ -1,127 +1,100 @@
-from .database import Database
-import json  # Add this import
-import mysql.connector
-from mysql.connector import Error
+import os
 from .sql_storage_strategy import SQLProjectStorage
+from .async_storage_strategy import ThreadedProjectStorage
+from ..utils.metrics_utils import register_metrics_provider
+
+
+def create_storage_strategy():
+    """
+    Build the storage strategy selected by LUMOS_STORAGE: "mysql" (default)
+    or "sqlite" for single-node deployments, stored at SQLITE_PATH.
+    """
+    backend = os.getenv("LUMOS_STORAGE", "mysql").lower()
+    if backend == "sqlite":
+        from .sqlite_storage_strategy import SQLiteProjectStorage
+        return SQLiteProjectStorage(os.getenv("SQLITE_PATH", "lumos.sqlite3"))
+    if backend == "mysql":
+        return SQLProjectStorage()
+    raise ValueError(f"Unknown LUMOS_STORAGE backend '{backend}'")
+
 
 class ProjectModel:
-    def __init__(self,strategy=SQLProjectStorage()):
-        self.db = Database()
-        self.strategy = strategy
+    def __init__(self, strategy=None):
+        self.strategy = strategy or create_storage_strategy()
+        # Blocking calls made from async handlers run here, one thread per pooled connection
+        self.async_strategy = ThreadedProjectStorage(self.strategy, max_workers=self.strategy.max_concurrency)
+        register_metrics_provider("storage_executor", self.async_strategy.stats)
+
+    @property
+    def supports_versions(self):
+        return self.strategy.supports_versions
+
+    @property
+    def supports_search(self):
+        return self.strategy.supports_search
 
     def create_project(self, project_data):
         return self.strategy.create_project(project_data)
+
+    def create_projects(self, documents):
+        return self.strategy.create_projects(documents)
+
+    def iter_project_documents(self, after_id=None, chunk_size=100):
+        return self.strategy.iter_project_documents(after_id, chunk_size)
        
-    def save_project(self, project_data):
-        return self.strategy.save_project(project_data)
+    def save_project(self, project_data, project_id=None):
+        return self.strategy.save_project(project_data, project_id)
 
     def get_all_projects(self):
-        """
-        Fetch all projects from the database.
-        """
-        try:
-            # Modified query to match the actual schema in schema.sql
-            query = "SELECT id, name, version, description, created_at FROM projects"
-            conn = self.db.get_connection()
-            cursor = conn.cursor(dictionary=True)
-            try:
-                cursor.execute(query)
-                projects = cursor.fetchall()
-                return projects
-            finally:
-                cursor.close()
-                conn.close()
-        except Exception as e:
-            print(f"Error fetching projects: {str(e)}")
-            return []  # Return empty list instead of raising exception
+        return self.strategy.get_all_projects()
+
+    def get_projects_page(self, after_id=None, limit=50, sort="id", fields=None):
+        return self.strategy.get_projects_page(after_id, limit, sort, fields)
+
+    def iter_projects(self, after_id=None, limit=None, sort="id", fields=None, chunk_size=500):
+        return self.strategy.iter_projects(after_id, limit, sort, fields, chunk_size)
 
     def get_project_by_id(self, project_id):
-        """
-        Fetch a complete project by ID including agents, tools, and interactions
-        """
-        conn = None
-        cursor = None
-        try:
-            # Get project metadata
-            conn = self.db.get_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            # Get project details
-            cursor.execute("SELECT id, name, version, description, created_at FROM projects WHERE id = %s", (project_id,))
-            project = cursor.fetchone()
-            
-            if not project:
-                return {"status": "error", "message": f"Project with ID {project_id} not found"}
-            
-            # Get agents for this project
-            cursor.execute("SELECT * FROM agents WHERE project_id = %s", (project_id,))
-            agents = cursor.fetchall()
-            
-            # Add position data for frontend visualization
-            agents = [
-                {
-                    **agent, 
-                    "position": {"x": 200 + i * 150, "y": 200 + (i % 3) * 100}
-                } for i, agent in enumerate(agents)
-            ]
-            
-            # Get tools for this project (if table exists)
-            try:
-                cursor.execute("SELECT * FROM tools WHERE project_id = %s", (project_id,))
-                tools = cursor.fetchall()
-                tools = [
-                    {
-                        **tool, 
-                        "position": {"x": 200 + i * 100, "y": 500}
-                    } for i, tool in enumerate(tools)
-                ]
-            except:
-                tools = []
-            
-            # Get connections for this project (if table exists)
-            try:
-                cursor.execute("SELECT * FROM connections WHERE project_id = %s", (project_id,))
-                connections = cursor.fetchall()
-            except:
-                connections = []
-            
-            # Format connections as interactions
-            interactions = []
-            for conn_data in connections:
-                interactions.append({
-                    "id": f"interaction-{conn_data['source']}-{conn_data['target']}",
-                    "name": conn_data["label"] if conn_data.get("label") else f"Connection {conn_data['source']}-{conn_data['target']}",
-                    "description": f"Connection between {conn_data['source']} and {conn_data['target']}",
-                    "type": "AgentAgent",
-                    "participants": [conn_data["source"], conn_data["target"]],
-                    "protocol": {
-                        "type": "DirectedMessaging",
-                        "messageTypes": ["task"]
-                    }
-                })
-            
-            # Build complete project data
-            return {
-                "project": {
-                    "id": project["id"],
-                    "name": project["name"],
-                    "version": project["version"],
-                    "description": project["description"],
-                    "created_at": project["created_at"]
-                },
-                "agents": agents,
-                "tools": tools,
-                "interactions": interactions,
-                "connections": connections
-            }
-        
-        except Exception as e:
-            print(f"Error fetching project by ID: {str(e)}")
-            return {"status": "error", "message": str(e)}
-        
-        finally:
-            # Only close cursor and connection if they exist
-            if cursor:
-                cursor.close()
-            if conn and hasattr(conn, 'close'):
-                conn.close()
\ No newline at end of file
+        return self.strategy.get_project_by_id(project_id)
+
+    def search(self, query="", filters=None, limit=20, offset=0):
+        return self.strategy.search(query, filters, limit, offset)
+
+    def list_versions(self, project_id):
+        return self.strategy.list_versions(project_id)
+
+    def get_version(self, project_id, version_number=None):
+        return self.strategy.get_version(project_id, version_number)
+
+    def diff_versions(self, project_id, from_version, to_version):
+        return self.strategy.diff_versions(project_id, from_version, to_version)
+
+    async def create_project_async(self, project_data):
+        return await self.async_strategy.create_project(project_data)
+
+    async def create_projects_async(self, documents):
+        return await self.async_strategy.run(self.strategy.create_projects, documents)
+
+    async def save_project_async(self, project_data, project_id=None):
+        return await self.async_strategy.save_project(project_data, project_id)
+
+    async def get_all_projects_async(self):
+        return await self.async_strategy.get_all_projects()
+
+    async def get_projects_page_async(self, after_id=None, limit=50, sort="id", fields=None):
+        return await self.async_strategy.get_projects_page(after_id, limit, sort, fields)
+
+    async def get_project_by_id_async(self, project_id):
+        return await self.async_strategy.get_project_by_id(project_id)
+
+    async def search_async(self, query="", filters=None, limit=20, offset=0):
+        return await self.async_strategy.run(self.strategy.search, query, filters, limit, offset)
+
+    async def list_versions_async(self, project_id):
+        return await self.async_strategy.run(self.strategy.list_versions, project_id)
+
+    async def get_version_async(self, project_id, version_number=None):
+        return await self.async_strategy.run(self.strategy.get_version, project_id, version_number)
+
+    async def diff_versions_async(self, project_id, from_version, to_version):
+        return await self.async_strategy.run(self.strategy.diff_versions, project_id, from_version, to_version)
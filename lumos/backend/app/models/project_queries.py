@@ -0,0 +1,227 @@
+"""
+SQL shared by the relational storage strategies. Queries use %s
+placeholders; strategies whose driver expects another style translate them.
+"""
+import ast
+import json
+
+
+PROJECT_FIELDS = ("id", "name", "version", "description", "created_at")
+PROJECT_SORT_KEYS = ("id", "created_at")
+
+
+def build_projects_query(after_id=None, sort="id", fields=None):
+    """
+    SELECT for listing projects ordered by (sort, id). The keyset condition
+    compares against the row of the `after_id` project, so it can use the
+    primary key / created_at index instead of an OFFSET scan.
+    """
+    if sort not in PROJECT_SORT_KEYS:
+        raise ValueError(f"Unsupported sort key '{sort}', expected one of {', '.join(PROJECT_SORT_KEYS)}")
+    fields = list(fields) if fields else list(PROJECT_FIELDS)
+    unknown = [field for field in fields if field not in PROJECT_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown project fields: {', '.join(unknown)}")
+    if "id" not in fields:
+        fields.insert(0, "id")  # needed as the pagination cursor
+
+    query = f"SELECT {', '.join(fields)} FROM projects"
+    params = ()
+    if after_id is not None:
+        if sort == "id":
+            query += " WHERE id > %s"
+        else:
+            query += f" WHERE ({sort}, id) > (SELECT {sort}, id FROM projects WHERE id = %s)"
+        params = (after_id,)
+    order = "id" if sort == "id" else f"{sort}, id"
+    return f"{query} ORDER BY {order}", params
+
+
+# One query per child table, keyed by project ids only, so loading a batch
+# of projects costs len(PROJECT_CHILD_QUERIES) + 1 round trips regardless of
+# their size. {ids} is replaced by one placeholder per project id.
+_AGENT_IDS = "SELECT id FROM agents WHERE project_id IN ({ids})"
+_INTERACTION_IDS = "SELECT id FROM interactions WHERE project_id IN ({ids})"
+PROJECT_BATCH_CHILD_QUERIES = {
+    "authors": "SELECT project_id, name FROM authors WHERE project_id IN ({ids}) ORDER BY id",
+    "agents": "SELECT project_id, id, agent_id, name, description, type, subtype FROM agents WHERE project_id IN ({ids}) ORDER BY id",
+    "agent_models": f"SELECT agent_id, name, version, provider, parameters FROM agent_models WHERE agent_id IN ({_AGENT_IDS})",
+    "agent_capabilities": f"SELECT agent_id, capability FROM agent_capabilities WHERE agent_id IN ({_AGENT_IDS}) ORDER BY id",
+    "agent_tools": f"SELECT agent_id, name, description, type, subtype, parameters FROM agent_tools WHERE agent_id IN ({_AGENT_IDS}) ORDER BY id",
+    "tools": "SELECT project_id, tool_id, name, description, type FROM tools WHERE project_id IN ({ids}) ORDER BY id",
+    "connections": "SELECT project_id, connection_id, source, target, label FROM connections WHERE project_id IN ({ids}) ORDER BY id",
+    "interactions": "SELECT project_id, id, interaction_id, type, subtype, pattern FROM interactions WHERE project_id IN ({ids}) ORDER BY id",
+    "interaction_participants": f"SELECT interaction_id, agent_id FROM interaction_participants WHERE interaction_id IN ({_INTERACTION_IDS}) ORDER BY id",
+    "interaction_protocols": f"SELECT interaction_id, type, message_types FROM interaction_protocols WHERE interaction_id IN ({_INTERACTION_IDS})",
+}
+# The same queries for a single project
+PROJECT_CHILD_QUERIES = {key: query.format(ids="%s") for key, query in PROJECT_BATCH_CHILD_QUERIES.items()}
+OPTIONAL_CHILD_TABLES = {"tools", "connections"}
+
+
+def child_queries(count):
+    """PROJECT_BATCH_CHILD_QUERIES for `count` project ids."""
+    ids = ", ".join(["%s"] * count)
+    return {key: query.format(ids=ids) for key, query in PROJECT_BATCH_CHILD_QUERIES.items()}
+
+
+def group_project_rows(projects, rows):
+    """
+    Split child rows loaded for several projects into one rows dict per
+    project, in the order of `projects`, ready for assemble_project.
+    Agent and interaction children are routed through their parent rows.
+    """
+    grouped = {}
+    for project in projects:
+        grouped[project["id"]] = {"project": project}
+        for key in rows:
+            grouped[project["id"]][key] = []
+
+    owner = {"agents": {}, "interactions": {}}
+    for key in ("authors", "agents", "tools", "connections", "interactions"):
+        for row in rows[key]:
+            grouped[row["project_id"]][key].append(row)
+            if key in owner:
+                owner[key][row["id"]] = row["project_id"]
+    for key, parent, column in (
+        ("agent_models", "agents", "agent_id"),
+        ("agent_capabilities", "agents", "agent_id"),
+        ("agent_tools", "agents", "agent_id"),
+        ("interaction_participants", "interactions", "interaction_id"),
+        ("interaction_protocols", "interactions", "interaction_id"),
+    ):
+        for row in rows[key]:
+            grouped[owner[parent][row[column]]][key].append(row)
+    return [grouped[project["id"]] for project in projects]
+
+
+def _parse_literal(text, default):
+    """
+    Parameters are stored as JSON; rows written before that hold Python
+    literals from str(), which are read back with ast.literal_eval.
+    """
+    if not text:
+        return default
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text)
+    except (ValueError, SyntaxError):
+        return default
+
+
+def assemble_project(rows):
+    """
+    Build the nested LDL project from flat per-table rows in a single pass,
+    attaching children to their parents through dict indexes.
+    """
+    project = rows["project"]
+
+    agents = []
+    agents_by_row_id = {}
+    for i, row in enumerate(rows["agents"]):
+        agent = {
+            "id": row["agent_id"],
+            "name": row["name"],
+            "description": row["description"],
+            "type": row["type"],
+            "subtype": row["subtype"] or "",
+            "model": None,
+            "capabilities": [],
+            "tools": [],
+            # Add position data for frontend visualization
+            "position": {"x": 200 + i * 150, "y": 200 + (i % 3) * 100},
+        }
+        agents.append(agent)
+        agents_by_row_id[row["id"]] = agent
+
+    for row in rows["agent_models"]:
+        agents_by_row_id[row["agent_id"]]["model"] = {
+            "name": row["name"] or "",
+            "version": row["version"] or "latest",
+            "provider": row["provider"] or "",
+            "parameters": _parse_literal(row["parameters"], {}),
+        }
+    for row in rows["agent_capabilities"]:
+        agents_by_row_id[row["agent_id"]]["capabilities"].append(row["capability"])
+    for row in rows["agent_tools"]:
+        agents_by_row_id[row["agent_id"]]["tools"].append({
+            "name": row["name"],
+            "description": row["description"],
+            "type": row["type"],
+            "subtype": row["subtype"] or "",
+            "parameters": _parse_literal(row["parameters"], {}),
+        })
+
+    tools = [
+        {
+            "id": tool["tool_id"],
+            "name": tool["name"],
+            "description": tool["description"],
+            "type": tool["type"],
+            "position": {"x": 200 + i * 100, "y": 500},
+        }
+        for i, tool in enumerate(rows["tools"])
+    ]
+
+    interactions = []
+    interactions_by_row_id = {}
+    for row in rows["interactions"]:
+        interaction = {
+            "id": row["interaction_id"],
+            "type": row["type"],
+            "subtype": row["subtype"] or "",
+            "pattern": row["pattern"] or "",
+            "participants": [],
+            "protocol": None,
+        }
+        interactions.append(interaction)
+        interactions_by_row_id[row["id"]] = interaction
+    for row in rows["interaction_participants"]:
+        interactions_by_row_id[row["interaction_id"]]["participants"].append(row["agent_id"])
+    for row in rows["interaction_protocols"]:
+        interactions_by_row_id[row["interaction_id"]]["protocol"] = {
+            "type": row["type"],
+            "messageTypes": _parse_literal(row["message_types"], []),
+        }
+
+    # Canvas saves store edges as connections; expose them as interactions too,
+    # skipping ids already stored as interactions so round-trips don't grow them
+    connections = [
+        {"id": row["connection_id"], "source": row["source"], "target": row["target"], "label": row["label"]}
+        for row in rows["connections"]
+    ]
+    interaction_ids = {interaction["id"] for interaction in interactions}
+    for conn_data in connections:
+        interaction_id = conn_data["id"] or f"interaction-{conn_data['source']}-{conn_data['target']}"
+        if interaction_id in interaction_ids:
+            continue
+        interaction_ids.add(interaction_id)
+        interactions.append({
+            "id": interaction_id,
+            "name": conn_data["label"] if conn_data.get("label") else f"Connection {conn_data['source']}-{conn_data['target']}",
+            "description": f"Connection between {conn_data['source']} and {conn_data['target']}",
+            "type": "AgentAgent",
+            "participants": [conn_data["source"], conn_data["target"]],
+            "protocol": {
+                "type": "DirectedMessaging",
+                "messageTypes": ["task"]
+            }
+        })
+
+    return {
+        "project": {
+            "id": project["id"],
+            "name": project["name"],
+            "version": project["version"],
+            "description": project["description"],
+            "created_at": project["created_at"],
+            "authors": [row["name"] for row in rows["authors"]],
+        },
+        "agents": agents,
+        "tools": tools,
+        "interactions": interactions,
+        "connections": connections
+    }
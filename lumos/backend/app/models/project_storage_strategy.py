@@ -1,11 +1,69 @@
-
 from abc import ABC, abstractmethod
 
 class ProjectStorageStrategy(ABC):
+    # Number of calls the backend can serve in parallel (e.g. pooled connections)
+    max_concurrency = 8
+    # Optional capabilities. Backends keeping version history set
+    # supports_versions and implement list_versions(project_id),
+    # get_version(project_id, version_number=None) and
+    # diff_versions(project_id, from_version, to_version); backends with a
+    # search index set supports_search and implement
+    # search(query="", filters=None, limit=20, offset=0) -> (results, next_offset)
+    supports_versions = False
+    supports_search = False
+
     @abstractmethod
-    def save_project(self, project_data):
-        pass
+    def save_project(self, project_data, project_id=None):
+        """Insert a new project, or update project_id in place when given."""
 
     @abstractmethod
     def create_project(self, project_data):
         pass
+
+    @abstractmethod
+    def get_all_projects(self):
+        pass
+
+    @abstractmethod
+    def get_projects_page(self, after_id=None, limit=50, sort="id", fields=None):
+        """Return (rows, next_after_id) for one keyset-paginated page."""
+
+    @abstractmethod
+    def iter_projects(self, after_id=None, limit=None, sort="id", fields=None, chunk_size=500):
+        """Yield project rows without materialising the whole listing."""
+
+    @abstractmethod
+    def get_project_by_id(self, project_id):
+        pass
+
+    def create_projects(self, documents):
+        """
+        Create several projects, returning one result per project. Backends
+        that can should share one transaction and isolate failures.
+        """
+        return [self.create_project(document) for document in documents]
+
+    def iter_project_documents(self, after_id=None, chunk_size=100):
+        """Yield complete projects in id order, after project `after_id`."""
+        while True:
+            rows, after_id = self.get_projects_page(after_id, chunk_size, "id", ["id"])
+            for row in rows:
+                yield self.get_project_by_id(row["id"])
+            if after_id is None:
+                return
+
+    def add_listener(self, listener):
+        """
+        Register `listener(event, project_id)`, called after a write commits.
+        Events are "created" and "saved"; used e.g. to invalidate caches.
+        """
+        if not hasattr(self, "_listeners"):
+            self._listeners = []
+        self._listeners.append(listener)
+
+    def _notify(self, event, project_id):
+        for listener in getattr(self, "_listeners", []):
+            try:
+                listener(event, project_id)
+            except Exception as e:
+                print(f"Error in storage listener: {str(e)}")
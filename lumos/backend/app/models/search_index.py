@@ -0,0 +1,155 @@
+import re
+
+# Searchable facets and the entity fields they come from
+SEARCH_FACETS = ("kind", "type", "subtype", "capability")
+# Score contributed by one occurrence of a term in each field
+FIELD_WEIGHTS = {"name": 4, "capability": 3, "type": 2, "subtype": 2, "description": 1}
+MAX_TERM_LENGTH = 64
+STOP_WORDS = {"a", "an", "and", "are", "for", "in", "is", "of", "on", "or", "the", "to", "with"}
+
+
+def tokenize(text):
+    """Lowercased alphanumeric terms of `text`, without stop words."""
+    return [
+        term[:MAX_TERM_LENGTH]
+        for term in re.findall(r"[a-z0-9]+", str(text or "").lower())
+        if len(term) > 1 and term not in STOP_WORDS
+    ]
+
+
+def _normalize(value):
+    return str(value or "").strip().lower()
+
+
+def _entities(document):
+    """
+    Searchable entities of an LDL document: agents, the tools attached to
+    them and the canvas tools. Yields (kind, entity_id, fields, capabilities).
+    Agents and canvas tools without an id can't be told apart, so they
+    (and an agent's tools) are not indexed.
+    """
+    for agent in document.get("agents") or []:
+        agent_id = agent.get("id")
+        if not agent_id:
+            continue
+        yield "agent", agent_id, agent, agent.get("capabilities") or []
+        for index, tool in enumerate(agent.get("tools") or []):
+            yield "tool", f"{agent_id}/tools/{index}", tool, []
+    for tool in document.get("tools") or []:
+        if tool.get("id"):
+            yield "tool", tool["id"], tool, []
+
+
+class SearchIndex:
+    """
+    Inverted index over the agents and tools of every saved project.
+
+    search_postings maps each term to the entities containing it with a
+    field-weighted score, search_facets maps facet values (kind, type,
+    subtype, capability) to entities and search_entities holds what a
+    result displays. All three are keyed so that queries seek on the
+    term or facet value instead of scanning. A project is reindexed
+    inside the transaction that saves it.
+
+    Methods take an open cursor, like VersionStore.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+
+    def index_project(self, cursor, project_id, document):
+        """Replace the index entries of a project with those of `document`."""
+        for table in ("search_postings", "search_facets", "search_entities"):
+            cursor.execute(f"DELETE FROM {table} WHERE project_id = %s", (project_id,))
+
+        entities, postings, facets = {}, {}, set()
+        for kind, entity_id, fields, capabilities in _entities(document):
+            key = (project_id, kind, entity_id)
+            if key in entities:
+                continue
+            entities[key] = (
+                project_id, kind, entity_id, fields.get("name") or "", fields.get("description") or "",
+                fields.get("type") or "", fields.get("subtype") or "",
+            )
+
+            texts = [(field, fields.get(field)) for field in ("name", "description", "type", "subtype")]
+            texts += [("capability", capability) for capability in capabilities]
+            for field, text in texts:
+                for term in tokenize(text):
+                    posting = (term,) + key
+                    postings[posting] = postings.get(posting, 0) + FIELD_WEIGHTS[field]
+
+            values = [("kind", kind), ("type", fields.get("type")), ("subtype", fields.get("subtype"))]
+            values += [("capability", capability) for capability in capabilities]
+            facets.update((facet, _normalize(value)) + key for facet, value in values if _normalize(value))
+
+        self._insert(cursor, "search_entities",
+                     ("project_id", "kind", "entity_id", "name", "description", "type", "subtype"),
+                     list(entities.values()))
+        self._insert(cursor, "search_postings", ("term", "project_id", "kind", "entity_id", "weight"),
+                     [posting + (weight,) for posting, weight in postings.items()])
+        self._insert(cursor, "search_facets", ("facet", "value", "project_id", "kind", "entity_id"),
+                     sorted(facets))
+
+    def _insert(self, cursor, table, columns, rows):
+        placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES " + ", ".join([placeholders] * len(chunk)),
+                [value for row in chunk for value in row]
+            )
+
+    def search(self, cursor, query="", filters=None, limit=20, offset=0):
+        """
+        Entities matching every term of `query` and every facet filter,
+        best score first. Returns (results, next_offset), next_offset being
+        None on the last page.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        filters = {facet: _normalize(value) for facet, value in (filters or {}).items() if _normalize(value)}
+        unknown = [facet for facet in filters if facet not in SEARCH_FACETS]
+        if unknown:
+            raise ValueError(f"Unknown search facets: {', '.join(unknown)}")
+        if not terms and not filters:
+            raise ValueError("Search needs a query or at least one facet filter")
+
+        # Drive the query from the postings of the terms, or from the first
+        # facet when there are none; every other condition is a keyed join
+        params = []
+        if terms:
+            source = (
+                "SELECT project_id, kind, entity_id, SUM(weight) AS score FROM search_postings "
+                f"WHERE term IN ({', '.join(['%s'] * len(terms))}) "
+                "GROUP BY project_id, kind, entity_id HAVING COUNT(*) = %s"
+            )
+            params += terms + [len(terms)]
+            facet_filters = list(filters.items())
+        else:
+            (first_facet, first_value), *facet_filters = filters.items()
+            source = "SELECT project_id, kind, entity_id, 0 AS score FROM search_facets WHERE facet = %s AND value = %s"
+            params += [first_facet, first_value]
+
+        joins = []
+        for index, (facet, value) in enumerate(facet_filters):
+            joins.append(
+                f"JOIN search_facets f{index} ON f{index}.facet = %s AND f{index}.value = %s "
+                f"AND f{index}.project_id = m.project_id AND f{index}.kind = m.kind AND f{index}.entity_id = m.entity_id"
+            )
+            params += [facet, value]
+
+        cursor.execute(
+            "SELECT m.project_id, p.name AS project_name, m.kind, m.entity_id, e.name, e.description, "
+            f"e.type, e.subtype, m.score FROM ({source}) m {' '.join(joins)} "
+            "JOIN search_entities e ON e.project_id = m.project_id AND e.kind = m.kind AND e.entity_id = m.entity_id "
+            "JOIN projects p ON p.id = m.project_id "
+            "ORDER BY m.score DESC, m.project_id, m.kind, m.entity_id LIMIT %s OFFSET %s",
+            params + [limit + 1, offset]
+        )
+        columns = ("project_id", "project_name", "kind", "id", "name", "description", "type", "subtype", "score")
+        rows = [dict(zip(columns, row.values() if isinstance(row, dict) else row)) for row in cursor.fetchall()]
+        for row in rows:
+            row["score"] = int(row["score"])
+        if len(rows) > limit:
+            return rows[:limit], offset + limit
+        return rows, None
@@ -0,0 +1,133 @@
+import os
+import sqlite3
+from pathlib import Path
+from .connection_pool import ConnectionPool
+from .sql_storage_strategy import SQLProjectStorage, DEFAULT_BATCH_SIZE
+from ..utils.metrics_utils import register_metrics_provider
+
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "schema_sqlite.sql"
+
+
+class _SQLiteCursor:
+    """
+    Gives a sqlite3 cursor the mysql.connector surface SQLProjectStorage
+    uses: %s placeholders and optional dict rows.
+    """
+
+    def __init__(self, cursor, dictionary):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def execute(self, query, params=()):
+        self._cursor.execute(query.replace("%s", "?"), tuple(params))
+
+    def _rows(self, rows):
+        if not self._dictionary or not rows:
+            return rows
+        names = [column[0] for column in self._cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return self._rows([row])[0] if row is not None else None
+
+    def fetchmany(self, size):
+        return self._rows(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._rows(self._cursor.fetchall())
+
+    def close(self):
+        self._cursor.close()
+
+
+class _SQLiteConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False, buffered=True):
+        # sqlite3 cursors step through results lazily, so buffered is a no-op
+        return _SQLiteCursor(self._conn.cursor(), dictionary)
+
+    def start_transaction(self):
+        # Explicit BEGIN, so savepoints nest in it instead of committing on release;
+        # IMMEDIATE takes the write lock up front, as SQLite has no FOR UPDATE
+        if not self._conn.in_transaction:
+            self._conn.execute("BEGIN IMMEDIATE")
+
+    @property
+    def in_transaction(self):
+        return self._conn.in_transaction
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+class SQLiteDatabase:
+    """
+    Pooled connections to an embedded SQLite file in WAL mode, so readers
+    never block on the writer. Reusing connections keeps sqlite3's
+    per-connection prepared statement cache warm.
+    """
+    Error = sqlite3.Error
+
+    def __init__(self, path, pool_size=None, max_overflow=None, timeout=None):
+        self.path = str(path)
+        self._create_schema()
+        self.pool = ConnectionPool(
+            self._create_connection,
+            pool_size=pool_size if pool_size is not None else int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=max_overflow if max_overflow is not None else int(os.getenv("DB_POOL_MAX_OVERFLOW", "10")),
+            timeout=timeout if timeout is not None else float(os.getenv("DB_POOL_TIMEOUT", "30")),
+            recycle=0,
+            pre_ping=False,
+        )
+        register_metrics_provider("db_pool", self.pool_stats)
+
+    def _create_connection(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, cached_statements=256)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return _SQLiteConnection(conn)
+
+    def _create_schema(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA_PATH.read_text())
+        finally:
+            conn.close()
+
+    def get_connection(self):
+        """Check out a pooled connection; close() returns it to the pool."""
+        return self.pool.checkout()
+
+    def disconnect(self):
+        self.pool.dispose()
+
+    def pool_stats(self):
+        return self.pool.stats()
+
+
+class SQLiteProjectStorage(SQLProjectStorage):
+    """
+    ProjectStorageStrategy backed by an embedded SQLite file, for
+    single-node deployments and tests that run without a MySQL server.
+    Shares all SQL with SQLProjectStorage through a driver adapter.
+    """
+    INSERT_IGNORE = "INSERT OR IGNORE INTO"
+    # Writers are serialized by BEGIN IMMEDIATE instead
+    FOR_UPDATE = ""
+
+    def __init__(self, path, batch_size=DEFAULT_BATCH_SIZE, db=None):
+        super().__init__(db or SQLiteDatabase(path), batch_size=batch_size)
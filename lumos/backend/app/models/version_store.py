@@ -0,0 +1,253 @@
+import hashlib
+import json
+import zlib
+
+# Entity hashes per page blob. An edit rewrites one page, not the whole list.
+PAGE_SIZE = 64
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+class VersionStore:
+    """
+    Versioned snapshots of project documents in content-addressed blobs.
+
+    A document is split into sub-documents: the project metadata and every
+    entity (agent, tool, connection, ...) of its list sections, each stored
+    once as a zlib-compressed blob keyed by the SHA-256 of its content.
+    A version is a manifest blob naming the pages of (entity id, hash)
+    pairs of each section, so saving a version only writes the blobs that
+    changed. The latest version of each project is also kept whole in
+    project_heads, so reading it is a single-row lookup.
+
+    Methods take an open cursor so they run inside the caller's transaction.
+    """
+
+    def __init__(self, insert_ignore="INSERT IGNORE INTO", batch_size=500, for_update=" FOR UPDATE"):
+        self.insert_ignore = insert_ignore
+        self.batch_size = batch_size
+        # Locking read suffix; empty where the transaction already excludes other writers
+        self.for_update = for_update
+
+    # Writing
+
+    def record(self, cursor, project_id, document):
+        """
+        Record `document` as the next version of the project and return its
+        version number. Saving a document identical to the latest version
+        records nothing and returns the latest version number.
+        """
+        document_data = _canonical(document)
+        document_hash = hashlib.sha256(document_data).hexdigest()
+
+        # Concurrent saves of the project wait for the row lock, then read
+        # the latest version it committed, so they never pick the same number
+        cursor.execute(f"SELECT id FROM projects WHERE id = %s{self.for_update}", (project_id,))
+        cursor.fetchall()
+        cursor.execute(
+            "SELECT version_number, document_hash FROM project_versions "
+            f"WHERE project_id = %s ORDER BY version_number DESC LIMIT 1{self.for_update}",
+            (project_id,)
+        )
+        latest = cursor.fetchone()
+        latest = tuple(latest.values()) if isinstance(latest, dict) else latest
+        if latest and latest[1] == document_hash:
+            return latest[0]
+        version_number = latest[0] + 1 if latest else 1
+
+        blobs = {}
+        manifest = {"fields": {}, "sections": {}}
+        for key, value in document.items():
+            if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+                pairs = []
+                for index, item in enumerate(value):
+                    entity_hash = self._add_blob(blobs, item)
+                    pairs.append([str(item.get("id", index)), entity_hash])
+                manifest["sections"][key] = [
+                    self._add_blob(blobs, pairs[start:start + PAGE_SIZE])
+                    for start in range(0, len(pairs), PAGE_SIZE)
+                ]
+            else:
+                manifest["fields"][key] = self._add_blob(blobs, value)
+        manifest_hash = self._add_blob(blobs, manifest)
+
+        self._write_blobs(cursor, blobs)
+        cursor.execute(
+            "INSERT INTO project_versions (project_id, version_number, manifest_hash, document_hash, size) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            (project_id, version_number, manifest_hash, document_hash, len(document_data))
+        )
+        cursor.execute("DELETE FROM project_heads WHERE project_id = %s", (project_id,))
+        cursor.execute(
+            "INSERT INTO project_heads (project_id, version_number, data) VALUES (%s, %s, %s)",
+            (project_id, version_number, zlib.compress(document_data))
+        )
+        return version_number
+
+    def _add_blob(self, blobs, value):
+        data = _canonical(value)
+        blob_hash = hashlib.sha256(data).hexdigest()
+        blobs.setdefault(blob_hash, data)
+        return blob_hash
+
+    def _write_blobs(self, cursor, blobs):
+        hashes = list(blobs)
+        existing = set()
+        for start in range(0, len(hashes), self.batch_size):
+            chunk = hashes[start:start + self.batch_size]
+            cursor.execute(
+                f"SELECT hash FROM project_blobs WHERE hash IN ({', '.join(['%s'] * len(chunk))})", chunk
+            )
+            existing.update(self._first_column(cursor.fetchall()))
+
+        rows = [(h, zlib.compress(blobs[h]), len(blobs[h])) for h in hashes if h not in existing]
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            # IGNORE: a concurrent save may have written the same blob meanwhile
+            cursor.execute(
+                f"{self.insert_ignore} project_blobs (hash, data, size) VALUES "
+                + ", ".join(["(%s, %s, %s)"] * len(chunk)),
+                [value for row in chunk for value in row]
+            )
+
+    # Reading
+
+    def list_versions(self, cursor, project_id):
+        cursor.execute(
+            "SELECT version_number, document_hash, size, created_at FROM project_versions "
+            "WHERE project_id = %s ORDER BY version_number",
+            (project_id,)
+        )
+        columns = ("version_number", "document_hash", "size", "created_at")
+        return [row if isinstance(row, dict) else dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_latest(self, cursor, project_id):
+        """Return (version_number, document) of the latest version, or None."""
+        cursor.execute("SELECT version_number, data FROM project_heads WHERE project_id = %s", (project_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        version_number, data = tuple(row.values()) if isinstance(row, dict) else row
+        return version_number, json.loads(zlib.decompress(data))
+
+    def get_version(self, cursor, project_id, version_number):
+        """Rebuild the document of a version, or return None if it does not exist."""
+        manifest = self._manifest(cursor, project_id, version_number)
+        if manifest is None:
+            return None
+        sections = self._section_pairs(cursor, manifest)
+        wanted = list(manifest["fields"].values())
+        wanted += [entity_hash for pairs in sections.values() for _, entity_hash in pairs]
+        values = self._read_blobs(cursor, wanted)
+
+        document = {key: values[blob_hash] for key, blob_hash in manifest["fields"].items()}
+        for key, pairs in sections.items():
+            document[key] = [values[entity_hash] for _, entity_hash in pairs]
+        return document
+
+    def diff(self, cursor, project_id, from_version, to_version):
+        """
+        Describe what changed between two versions: changed top-level
+        fields and, per section, added, removed and changed entity ids with
+        the fields that differ. Only the blobs of changed entities are read.
+        """
+        old = self._manifest(cursor, project_id, from_version)
+        new = self._manifest(cursor, project_id, to_version)
+        if old is None or new is None:
+            return None
+
+        old_sections = self._section_pairs(cursor, old)
+        new_sections = self._section_pairs(cursor, new)
+
+        changed_fields = [
+            key for key in sorted(set(old["fields"]) | set(new["fields"]))
+            if old["fields"].get(key) != new["fields"].get(key)
+        ]
+        to_read = [old["fields"][key] for key in changed_fields if key in old["fields"]]
+        to_read += [new["fields"][key] for key in changed_fields if key in new["fields"]]
+
+        section_changes = {}
+        for key in sorted(set(old_sections) | set(new_sections)):
+            before = dict(old_sections.get(key, []))
+            after = dict(new_sections.get(key, []))
+            changed = [entity_id for entity_id in after if entity_id in before and before[entity_id] != after[entity_id]]
+            section_changes[key] = {
+                "added": [entity_id for entity_id in after if entity_id not in before],
+                "removed": [entity_id for entity_id in before if entity_id not in after],
+                "changed": changed,
+            }
+            to_read += [before[entity_id] for entity_id in changed] + [after[entity_id] for entity_id in changed]
+
+        values = self._read_blobs(cursor, to_read)
+        result = {
+            "from_version": from_version,
+            "to_version": to_version,
+            "fields": {
+                key: {
+                    "from": values.get(old["fields"].get(key)),
+                    "to": values.get(new["fields"].get(key)),
+                }
+                for key in changed_fields
+            },
+            "sections": {},
+        }
+        for key, changes in section_changes.items():
+            before = dict(old_sections.get(key, []))
+            after = dict(new_sections.get(key, []))
+            result["sections"][key] = {
+                "added": changes["added"],
+                "removed": changes["removed"],
+                "changed": [
+                    {"id": entity_id, "fields": self._changed_fields(values[before[entity_id]], values[after[entity_id]])}
+                    for entity_id in changes["changed"]
+                ],
+            }
+        return result
+
+    @staticmethod
+    def _changed_fields(before, after):
+        if not isinstance(before, dict) or not isinstance(after, dict):
+            return {"value": {"from": before, "to": after}}
+        return {
+            key: {"from": before.get(key), "to": after.get(key)}
+            for key in sorted(set(before) | set(after))
+            if before.get(key) != after.get(key)
+        }
+
+    def _manifest(self, cursor, project_id, version_number):
+        cursor.execute(
+            "SELECT manifest_hash FROM project_versions WHERE project_id = %s AND version_number = %s",
+            (project_id, version_number)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        manifest_hash = self._first_column([row])[0]
+        return self._read_blobs(cursor, [manifest_hash])[manifest_hash]
+
+    def _section_pairs(self, cursor, manifest):
+        page_hashes = [page for pages in manifest["sections"].values() for page in pages]
+        pages = self._read_blobs(cursor, page_hashes)
+        return {
+            key: [tuple(pair) for page in page_list for pair in pages[page]]
+            for key, page_list in manifest["sections"].items()
+        }
+
+    def _read_blobs(self, cursor, hashes):
+        hashes = list(dict.fromkeys(h for h in hashes if h))
+        values = {}
+        for start in range(0, len(hashes), self.batch_size):
+            chunk = hashes[start:start + self.batch_size]
+            cursor.execute(
+                f"SELECT hash, data FROM project_blobs WHERE hash IN ({', '.join(['%s'] * len(chunk))})", chunk
+            )
+            for row in cursor.fetchall():
+                blob_hash, data = tuple(row.values()) if isinstance(row, dict) else row
+                values[blob_hash] = json.loads(zlib.decompress(data))
+        return values
+
+    @staticmethod
+    def _first_column(rows):
+        return [next(iter(row.values())) if isinstance(row, dict) else row[0] for row in rows]
@@ -17,7 +17,8 @@ CREATE TABLE IF NOT EXISTS projects (
     name VARCHAR(255) NOT NULL,
     version VARCHAR(50) NOT NULL,
     description TEXT,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_projects_created_at (created_at, id)
 );
 
 CREATE TABLE IF NOT EXISTS authors (
@@ -35,6 +36,8 @@ CREATE TABLE IF NOT EXISTS agents (
     description TEXT,
     type VARCHAR(50) NOT NULL,
     subtype VARCHAR(50),
+    content_hash CHAR(40),
+    INDEX idx_agents_project (project_id, agent_id),
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
 );
 
@@ -89,4 +92,95 @@ CREATE TABLE IF NOT EXISTS interaction_protocols (
     type VARCHAR(50) NOT NULL,
     message_types TEXT,
     FOREIGN KEY (interaction_id) REFERENCES interactions(id) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+-- Canvas saves: tools and connections keep their LDL ids so that saves
+-- into an existing project can update rows in place
+CREATE TABLE IF NOT EXISTS tools (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    project_id INT NOT NULL,
+    tool_id VARCHAR(255) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    type VARCHAR(50) NOT NULL,
+    content_hash CHAR(40),
+    INDEX idx_tools_project (project_id, tool_id),
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS connections (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    project_id INT NOT NULL,
+    connection_id VARCHAR(255) NOT NULL,
+    source VARCHAR(255) NOT NULL,
+    target VARCHAR(255) NOT NULL,
+    label VARCHAR(255),
+    content_hash CHAR(40),
+    INDEX idx_connections_project (project_id, connection_id),
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+-- Version history: every save records a version whose document is split
+-- into zlib-compressed, content-addressed blobs shared across versions
+CREATE TABLE IF NOT EXISTS project_blobs (
+    hash CHAR(64) PRIMARY KEY,
+    data LONGBLOB NOT NULL,
+    size INT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS project_versions (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    project_id INT NOT NULL,
+    version_number INT NOT NULL,
+    manifest_hash CHAR(64) NOT NULL,
+    document_hash CHAR(64) NOT NULL,
+    size INT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE KEY uq_project_versions (project_id, version_number),
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+-- Latest version of each project as one compressed document
+CREATE TABLE IF NOT EXISTS project_heads (
+    project_id INT PRIMARY KEY,
+    version_number INT NOT NULL,
+    data LONGBLOB NOT NULL,
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+-- Search index over agents and tools, rebuilt per project on every save
+CREATE TABLE IF NOT EXISTS search_entities (
+    project_id INT NOT NULL,
+    kind VARCHAR(16) NOT NULL,
+    entity_id VARCHAR(255) NOT NULL,
+    name VARCHAR(255),
+    description TEXT,
+    type VARCHAR(50),
+    subtype VARCHAR(50),
+    PRIMARY KEY (project_id, kind, entity_id),
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+-- term -> entities containing it, with a field-weighted score
+CREATE TABLE IF NOT EXISTS search_postings (
+    term VARCHAR(64) NOT NULL,
+    project_id INT NOT NULL,
+    kind VARCHAR(16) NOT NULL,
+    entity_id VARCHAR(255) NOT NULL,
+    weight INT NOT NULL,
+    PRIMARY KEY (term, project_id, kind, entity_id),
+    INDEX idx_search_postings_project (project_id),
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+-- facet value (kind, type, subtype, capability) -> entities
+CREATE TABLE IF NOT EXISTS search_facets (
+    facet VARCHAR(16) NOT NULL,
+    value VARCHAR(255) NOT NULL,
+    project_id INT NOT NULL,
+    kind VARCHAR(16) NOT NULL,
+    entity_id VARCHAR(255) NOT NULL,
+    PRIMARY KEY (facet, value, project_id, kind, entity_id),
+    INDEX idx_search_facets_project (project_id),
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
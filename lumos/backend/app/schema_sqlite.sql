@@ -0,0 +1,167 @@
+-- Schema for the embedded SQLite storage strategy (LUMOS_STORAGE=sqlite).
+-- Mirrors schema.sql; applied automatically when the database file is opened.
+
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(255) NOT NULL,
+    version VARCHAR(50) NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_projects_created_at ON projects (created_at, id);
+
+CREATE TABLE IF NOT EXISTS authors (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_authors_project ON authors (project_id);
+
+CREATE TABLE IF NOT EXISTS agents (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    agent_id VARCHAR(255) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    type VARCHAR(50) NOT NULL,
+    subtype VARCHAR(50),
+    content_hash CHAR(40)
+);
+CREATE INDEX IF NOT EXISTS idx_agents_project ON agents (project_id, agent_id);
+
+CREATE TABLE IF NOT EXISTS agent_models (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    agent_id INTEGER NOT NULL REFERENCES agents(id) ON DELETE CASCADE,
+    name VARCHAR(255),
+    version VARCHAR(50),
+    provider VARCHAR(255),
+    parameters TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_agent_models_agent ON agent_models (agent_id);
+
+CREATE TABLE IF NOT EXISTS agent_capabilities (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    agent_id INTEGER NOT NULL REFERENCES agents(id) ON DELETE CASCADE,
+    capability VARCHAR(255) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_agent_capabilities_agent ON agent_capabilities (agent_id);
+
+CREATE TABLE IF NOT EXISTS agent_tools (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    agent_id INTEGER NOT NULL REFERENCES agents(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    type VARCHAR(50) NOT NULL,
+    subtype VARCHAR(50),
+    parameters TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_agent_tools_agent ON agent_tools (agent_id);
+
+CREATE TABLE IF NOT EXISTS interactions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    interaction_id VARCHAR(255) NOT NULL,
+    type VARCHAR(50) NOT NULL,
+    subtype VARCHAR(50),
+    pattern VARCHAR(50)
+);
+CREATE INDEX IF NOT EXISTS idx_interactions_project ON interactions (project_id);
+
+CREATE TABLE IF NOT EXISTS interaction_participants (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    interaction_id INTEGER NOT NULL REFERENCES interactions(id) ON DELETE CASCADE,
+    agent_id VARCHAR(255) NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_interaction_participants_interaction ON interaction_participants (interaction_id);
+
+CREATE TABLE IF NOT EXISTS interaction_protocols (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    interaction_id INTEGER NOT NULL REFERENCES interactions(id) ON DELETE CASCADE,
+    type VARCHAR(50) NOT NULL,
+    message_types TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_interaction_protocols_interaction ON interaction_protocols (interaction_id);
+
+-- Canvas saves: tools and connections keep their LDL ids so that saves
+-- into an existing project can update rows in place
+CREATE TABLE IF NOT EXISTS tools (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    tool_id VARCHAR(255) NOT NULL,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    type VARCHAR(50) NOT NULL,
+    content_hash CHAR(40)
+);
+CREATE INDEX IF NOT EXISTS idx_tools_project ON tools (project_id, tool_id);
+
+CREATE TABLE IF NOT EXISTS connections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    connection_id VARCHAR(255) NOT NULL,
+    source VARCHAR(255) NOT NULL,
+    target VARCHAR(255) NOT NULL,
+    label VARCHAR(255),
+    content_hash CHAR(40)
+);
+CREATE INDEX IF NOT EXISTS idx_connections_project ON connections (project_id, connection_id);
+
+-- Version history: every save records a version whose document is split
+-- into zlib-compressed, content-addressed blobs shared across versions
+CREATE TABLE IF NOT EXISTS project_blobs (
+    hash CHAR(64) PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS project_versions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    version_number INTEGER NOT NULL,
+    manifest_hash CHAR(64) NOT NULL,
+    document_hash CHAR(64) NOT NULL,
+    size INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (project_id, version_number)
+);
+
+-- Latest version of each project as one compressed document
+CREATE TABLE IF NOT EXISTS project_heads (
+    project_id INTEGER PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE,
+    version_number INTEGER NOT NULL,
+    data BLOB NOT NULL
+);
+
+-- Search index over agents and tools, rebuilt per project on every save
+CREATE TABLE IF NOT EXISTS search_entities (
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    kind VARCHAR(16) NOT NULL,
+    entity_id VARCHAR(255) NOT NULL,
+    name VARCHAR(255),
+    description TEXT,
+    type VARCHAR(50),
+    subtype VARCHAR(50),
+    PRIMARY KEY (project_id, kind, entity_id)
+);
+
+-- term -> entities containing it, with a field-weighted score
+CREATE TABLE IF NOT EXISTS search_postings (
+    term VARCHAR(64) NOT NULL,
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    kind VARCHAR(16) NOT NULL,
+    entity_id VARCHAR(255) NOT NULL,
+    weight INTEGER NOT NULL,
+    PRIMARY KEY (term, project_id, kind, entity_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_search_postings_project ON search_postings (project_id);
+
+-- facet value (kind, type, subtype, capability) -> entities
+CREATE TABLE IF NOT EXISTS search_facets (
+    facet VARCHAR(16) NOT NULL,
+    value VARCHAR(255) NOT NULL,
+    project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    kind VARCHAR(16) NOT NULL,
+    entity_id VARCHAR(255) NOT NULL,
+    PRIMARY KEY (facet, value, project_id, kind, entity_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_search_facets_project ON search_facets (project_id);
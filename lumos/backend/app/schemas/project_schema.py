@@ -46,6 +46,23 @@ class ProjectExport(BaseModel):
     project: ProjectBase
     agents: List[Agent] = []
     interactions: List[Interaction] = []
+
+class CanvasTool(BaseModel):
+    id: str
+    name: str
+    description: Optional[str] = ""
+    type: str
+
+class Connection(BaseModel):
+    id: str
+    source: str
+    target: str
+    label: Optional[str] = ""
+
+class ProjectDocument(ProjectExport):
+    """A complete LDL project, as read by GET /api/projects/{id} and bulk import/export."""
+    tools: List[CanvasTool] = []
+    connections: List[Connection] = []
     
 class Position(BaseModel):
     x: int
@@ -0,0 +1,138 @@
+import json
+import os
+from datetime import date, datetime
+from pydantic import ValidationError
+from ..schemas.project_schema import ProjectDocument
+
+# Projects written per transaction by bulk imports
+DEFAULT_BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "100"))
+# Projects loaded per round of queries by bulk exports
+DEFAULT_EXPORT_CHUNK_SIZE = int(os.getenv("BULK_EXPORT_CHUNK_SIZE", "100"))
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def parse_document(line):
+    """
+    Parse and validate one NDJSON line (str, or UTF-8 bytes) as an LDL
+    project document. Raises ValueError with a readable message when the
+    line is invalid.
+    """
+    if isinstance(line, bytes):
+        try:
+            line = line.decode("utf-8")
+        except UnicodeDecodeError as e:
+            raise ValueError(f"Invalid UTF-8: {e}")
+    try:
+        data = json.loads(line)
+    except ValueError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    try:
+        document = ProjectDocument.parse_obj(data).dict()
+    except ValidationError as e:
+        raise ValueError(f"Invalid project: {e.errors()}")
+    # Exports list connections both as connections and as derived
+    # interactions; store each edge once
+    connection_ids = {connection["id"] for connection in document["connections"]}
+    document["interactions"] = [
+        interaction for interaction in document["interactions"] if interaction["id"] not in connection_ids
+    ]
+    return document
+
+
+class BulkService:
+    """
+    Moves many projects in or out as newline-delimited LDL documents.
+
+    Imports validate each line, then write valid documents batch_size at a
+    time through the storage strategy's create_projects, one transaction per
+    batch; a bad line is reported without aborting its batch. Exports read
+    projects in chunks and encode one line per project, so memory stays
+    constant in the number of projects either way.
+    """
+
+    def __init__(self, model):
+        self.model = model
+
+    def _batches(self, lines, batch_size):
+        """
+        Group numbered lines into batches of parsed documents. Yields
+        (batch, errors): valid (line_number, document) pairs and per-line
+        error results, in line order within each group.
+        """
+        batch, errors = [], []
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                batch.append((line_number, parse_document(line)))
+            except ValueError as e:
+                errors.append({"line": line_number, "status": "error", "message": str(e)})
+            if len(batch) >= batch_size:
+                yield batch, errors
+                batch, errors = [], []
+        if batch or errors:
+            yield batch, errors
+
+    @staticmethod
+    def _line_results(batch, errors, results):
+        combined = errors + [
+            {"line": line_number, **result} for (line_number, _), result in zip(batch, results)
+        ]
+        return sorted(combined, key=lambda result: result["line"])
+
+    def import_lines(self, lines, batch_size=DEFAULT_BULK_BATCH_SIZE):
+        """Import NDJSON lines, yielding one result per non-blank line."""
+        for batch, errors in self._batches(lines, batch_size):
+            results = self.model.create_projects([document for _, document in batch]) if batch else []
+            yield from self._line_results(batch, errors, results)
+
+    async def import_lines_async(self, lines, batch_size=DEFAULT_BULK_BATCH_SIZE):
+        """
+        Import NDJSON lines from an async iterator, yielding one result per
+        non-blank line. Batches are written on the storage thread pool.
+        """
+        batch, errors = [], []
+        line_number = 0
+        async for line in lines:
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                batch.append((line_number, parse_document(line)))
+            except ValueError as e:
+                errors.append({"line": line_number, "status": "error", "message": str(e)})
+            if len(batch) >= batch_size:
+                results = await self.model.create_projects_async([document for _, document in batch])
+                for result in self._line_results(batch, errors, results):
+                    yield result
+                batch, errors = [], []
+        results = await self.model.create_projects_async([document for _, document in batch]) if batch else []
+        for result in self._line_results(batch, errors, results):
+            yield result
+
+    def export_lines(self, after_id=None, chunk_size=DEFAULT_EXPORT_CHUNK_SIZE):
+        """Yield every project after `after_id` as one NDJSON line (bytes)."""
+        for document in self.model.iter_project_documents(after_id, chunk_size):
+            yield (json.dumps(document, default=_json_default) + "\n").encode()
+
+
+async def iter_lines(chunks):
+    """
+    Split an async iterator of byte chunks into lines, left as bytes so
+    parse_document() reports an undecodable line as that line's error.
+    """
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
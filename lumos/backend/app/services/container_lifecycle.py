@@ -0,0 +1,226 @@
+import asyncio
+import re
+import time
+from ..utils.process_utils import CommandTimeout, run_blocking, run_command
+from .route_registry import RouteAccessTracker
+
+# docker stats memory units, e.g. "45.3MiB / 7.6GiB"
+MEMORY_UNITS = {
+    "b": 1, "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3,
+    "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3,
+}
+
+
+def parse_memory(usage):
+    """Bytes used from a docker stats MemUsage value; 0 if unreadable."""
+    match = re.match(r"\s*([\d.]+)\s*([a-zA-Z]+)", usage)
+    if not match:
+        return 0
+    return int(float(match.group(1)) * MEMORY_UNITS.get(match.group(2).lower(), 0))
+
+
+class ContainerLifecycle:
+    """
+    Stops exported containers nobody uses and starts them again on demand.
+
+    Every `interval` seconds a sweep parks running deployments whose route
+    has not been requested for idle_ttl seconds, then parks the least
+    recently used ones while more than max_containers run or their memory
+    exceeds memory_budget bytes. Parking removes the container, and any
+    replicas, and parks its route; the deployment and its config are kept,
+    and the next request to the route (the proxy calls wake()) starts one
+    container from the warm pool with the same config.
+
+    Request times come from the proxy's access file; a deployment counts as
+    used when it was last started, too.
+    """
+
+    def __init__(self, store, routes, warm_pool, access_path, idle_ttl=3600.0, max_containers=20,
+                 memory_budget=None, interval=60.0, docker="docker"):
+        self.store = store
+        self.routes = routes
+        self.warm_pool = warm_pool
+        self.access_path = access_path
+        self.idle_ttl = idle_ttl
+        self.max_containers = max_containers
+        self.memory_budget = memory_budget
+        self.interval = interval
+        self.docker = docker
+        self._memory = {}
+        # Deployment counts by state as of the last sweep, kept current by park() and wake()
+        self._running = set()
+        self._parked = 0
+        self._wakes = {}
+        self._sweep_needed = asyncio.Event()
+        self._sweep_task = None
+        self.parked_idle = 0
+        self.parked_for_capacity = 0
+        self.wakes = 0
+        self.reclaimed_bytes = 0
+
+    async def start(self):
+        if self._sweep_task is None or self._sweep_task.done():
+            self._sweep_task = asyncio.ensure_future(self._sweep_loop())
+
+    async def shutdown(self):
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            try:
+                await self._sweep_task
+            except asyncio.CancelledError:
+                pass
+            self._sweep_task = None
+
+    async def _sweep_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._sweep_needed.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._sweep_needed.clear()
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"Error sweeping export containers: {str(e)}")
+
+    async def register(self, route, container, url, bundle):
+        """Record a new export's container and config bundle so it can be parked and woken later."""
+        await run_blocking(self.store.save_deployment, route, container, url, bundle)
+        self._running.add(container)
+        self._sweep_needed.set()
+
+    async def _memory_usage(self):
+        returncode, stdout, stderr = await run_command(
+            self.docker, "stats", "--no-stream", "--format", "{{.Name}}\t{{.MemUsage}}"
+        )
+        if returncode != 0:
+            print(f"Error reading container memory: {stderr.strip()}")
+            return {}
+        memory = {}
+        for line in stdout.splitlines():
+            name, _, usage = line.partition("\t")
+            if name:
+                memory[name] = parse_memory(usage)
+        return memory
+
+    def _last_used(self, deployments):
+        access = RouteAccessTracker.read(self.access_path)
+        return {d["route"]: max(d["started_at"], access.get(d["route"], 0)) for d in deployments}
+
+    async def sweep(self):
+        """Park idle deployments, then the least recently used ones over capacity."""
+        deployments = await run_blocking(self.store.deployments)
+        running = [d for d in deployments if d["state"] == "running"]
+        self._running = {d["container"] for d in running}
+        self._parked = sum(1 for d in deployments if d["state"] in ("parked", "waking"))
+        running = [d for d in running if d["route"] not in self._wakes]
+        last_used = self._last_used(running)
+        self._memory = await self._memory_usage() if running else {}
+        now = time.time()
+
+        idle = {d["route"] for d in running if now - last_used[d["route"]] > self.idle_ttl}
+        for deployment in running:
+            if deployment["route"] in idle and await self.park(deployment):
+                self.parked_idle += 1
+
+        remaining = sorted((d for d in running if d["route"] not in idle), key=lambda d: last_used[d["route"]])
+        while remaining and (len(remaining) > self.max_containers or self._over_budget(remaining)):
+            if await self.park(remaining.pop(0)):
+                self.parked_for_capacity += 1
+
+    def _over_budget(self, deployments):
+        if not self.memory_budget:
+            return False
+        return sum(self._memory.get(d["container"], 0) for d in deployments) > self.memory_budget
+
+    async def park(self, deployment):
+        """
+        Stop a deployment's container, keeping its route so a request can
+        wake it. False if another worker parked or is waking it.
+        """
+        route = deployment["route"]
+        # read while running: releasing a parked deployment leaves its containers to us
+        replicas = await run_blocking(self.store.replicas, route)
+        if not await run_blocking(self.store.claim_deployment, route, "running", "parked"):
+            return False
+        replicas += await run_blocking(self.store.delete_replicas, route)
+        await run_blocking(self.routes.park, route)
+        if await run_blocking(self.store.get_deployment, route) is None:
+            # the last export using it was released meanwhile, and its route
+            # removed; a release after this check removes the route after us
+            await run_blocking(self.routes.remove, route)
+        containers = list(dict.fromkeys([deployment["container"]] + [replica["container"] for replica in replicas]))
+        try:
+            returncode, _, stderr = await run_command(self.docker, "rm", "-f", *containers)
+        except CommandTimeout as e:
+            returncode, stderr = -1, str(e)
+        if returncode != 0:
+            print(f"Error removing containers {', '.join(containers)}: {stderr.strip()}")
+        self.reclaimed_bytes += self._memory.pop(deployment["container"], 0)
+        self._running.discard(deployment["container"])
+        self._parked += 1
+        print(f"Parked idle export {deployment['route']} ({deployment['container']})")
+        return True
+
+    async def wake(self, route):
+        """
+        Make sure a container serves `route` and return its URL; None if the
+        route has no deployment. Concurrent wakes of a route share one start.
+        """
+        wake = self._wakes.get(route)
+        if wake is None:
+            wake = asyncio.ensure_future(self._wake(route))
+            self._wakes[route] = wake
+            wake.add_done_callback(lambda _: self._wakes.pop(route, None))
+        return await asyncio.shield(wake)
+
+    async def _wake(self, route, timeout=60.0, poll_interval=0.2):
+        deadline = time.monotonic() + timeout
+        while True:
+            deployment = await run_blocking(self.store.get_deployment, route)
+            if deployment is None:
+                return None
+            if deployment["state"] == "running":
+                return deployment["url"]
+            if await run_blocking(self.store.claim_deployment, route, "parked", "waking"):
+                break
+            # another worker is waking it
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"Export {route} did not wake within {timeout}s")
+            await asyncio.sleep(poll_interval)
+
+        try:
+            instance = await self.warm_pool.claim()
+            try:
+                await self.warm_pool.configure(instance, deployment["config"])
+            except Exception:
+                await run_command(self.docker, "rm", "-f", instance.name)
+                raise
+        except BaseException:
+            await run_blocking(self.store.claim_deployment, route, "waking", "parked")
+            raise
+        if not await run_blocking(self.store.move_deployment, route, instance.name, instance.url):
+            # the last export using it was released meanwhile
+            await run_command(self.docker, "rm", "-f", instance.name)
+            return None
+        await run_blocking(self.routes.add, route, instance.url)
+        self.wakes += 1
+        self._running.add(instance.name)
+        self._parked = max(0, self._parked - 1)
+        # the woken container may push others over capacity
+        self._sweep_needed.set()
+        return instance.url
+
+    def stats(self):
+        return {
+            "running": len(self._running),
+            "parked": self._parked,
+            "memory_bytes": sum(self._memory.get(container, 0) for container in self._running),
+            "memory_budget": self.memory_budget,
+            "max_containers": self.max_containers,
+            "idle_ttl": self.idle_ttl,
+            "parked_idle": self.parked_idle,
+            "parked_for_capacity": self.parked_for_capacity,
+            "wakes": self.wakes,
+            "reclaimed_bytes": self.reclaimed_bytes,
+        }
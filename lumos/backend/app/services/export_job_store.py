@@ -0,0 +1,470 @@
+import json
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from ..utils.config_bundle import ConfigBundle
+from .export_scheduler import FINISHED_STATES
+
+
+def _owner():
+    # The boot id tells a restarted worker from the one before it, which in a
+    # container usually had the same hostname and pid
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+
+class ExportJobStore:
+    """
+    Export jobs and their progress events in a local SQLite file, so job
+    status outlives the worker that ran the job and every uvicorn worker on
+    the host can answer for any job.
+
+    Each job row records its owner (host, pid and boot id of the worker
+    running it). Workers renew a lease with heartbeat() and give it up with
+    retire(); recover() hands the unfinished jobs of owners whose lease ran
+    out, or was given up, to the worker calling it.
+
+    Deployments are the routes exports left behind, with the config bundle
+    their container was given, so a container stopped while idle can be
+    started again with the same project. A deployment is shared by every
+    export of an identical config (config_key, the bundle's version) and
+    counts their references; release_export() drops one, and the last one
+    deletes the deployment. A busy deployment
+    may run replicas: more containers with the same config, besides the
+    one the deployment row names.
+    """
+
+    def __init__(self, path, lease=30.0, writer_idle=5.0):
+        self.path = path
+        self.lease = lease
+        self._local = threading.local()
+        self._ready = False
+        self.owner = _owner()
+        # Events recorded from the event loop, written by one thread
+        self._pending = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._writer_idle = writer_idle
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            if not self._ready:
+                self._create_tables(conn)
+                self._ready = True
+        return conn
+
+    @staticmethod
+    def _create_tables(conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS export_jobs (
+                id TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                stage TEXT,
+                priority INTEGER NOT NULL,
+                tenant TEXT NOT NULL,
+                owner TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                container TEXT,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS export_job_events (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                stage TEXT NOT NULL,
+                state TEXT NOT NULL,
+                data TEXT NOT NULL,
+                at REAL NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_export_jobs_state ON export_jobs (state)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS export_workers (
+                owner TEXT PRIMARY KEY,
+                heartbeat_at REAL NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS deployments (
+                route TEXT PRIMARY KEY,
+                container TEXT NOT NULL,
+                url TEXT NOT NULL,
+                config BLOB NOT NULL,
+                config_key TEXT NOT NULL,
+                refs INTEGER NOT NULL DEFAULT 1,
+                state TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_deployments_config_key ON deployments (config_key)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS deployment_replicas (
+                route TEXT NOT NULL,
+                container TEXT NOT NULL,
+                url TEXT NOT NULL,
+                started_at REAL NOT NULL,
+                PRIMARY KEY (route, container)
+            )
+        """)
+
+    def record(self, job, event):
+        """
+        Scheduler listener: store the job's current state and the new event.
+        Called on the event loop, so the row is only queued here; a writer
+        thread stores queued rows in order, a batch per transaction.
+        """
+        self._pending.put((
+            (job.id, job.state, job.stage, job.priority, job.tenant, self.owner,
+             json.dumps(job.payload), job.container,
+             json.dumps(job.result) if job.result is not None else None,
+             str(job.error) if job.error else None, event["at"], event["at"]),
+            (job.id, event["seq"], event["stage"], event["state"], json.dumps(event["data"]), event["at"]),
+        ))
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_pending, name="export-job-writer", daemon=True)
+                self._writer.start()
+
+    def flush(self):
+        """Wait until every recorded event is stored."""
+        self._pending.join()
+
+    def _write_pending(self):
+        while True:
+            try:
+                batch = [self._pending.get(timeout=self._writer_idle)]
+            except queue.Empty:
+                with self._writer_lock:
+                    if self._pending.empty():
+                        # record() starts another writer when there is more
+                        self._writer = None
+                        return
+                continue
+            while True:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Error recording {len(batch)} export job events: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._pending.task_done()
+
+    def _write(self, batch):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                """
+                INSERT INTO export_jobs
+                    (id, state, stage, priority, tenant, owner, payload, container, result, error, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    state = excluded.state, stage = excluded.stage, owner = excluded.owner,
+                    container = excluded.container, result = excluded.result,
+                    error = excluded.error, updated_at = excluded.updated_at
+                """,
+                [job for job, _ in batch],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO export_job_events (job_id, seq, stage, state, data, at) VALUES (?, ?, ?, ?, ?, ?)",
+                [event for _, event in batch],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, job_id):
+        self.flush()
+        row = self._connection().execute(
+            "SELECT id, state, stage, priority, tenant, container, result, error, created_at, updated_at "
+            "FROM export_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["job_id"] = job.pop("id")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["finished"] = job["state"] in FINISHED_STATES
+        return job
+
+    def events(self, job_id, after_seq=0):
+        self.flush()
+        rows = self._connection().execute(
+            "SELECT seq, stage, state, data, at FROM export_job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+            (job_id, after_seq),
+        ).fetchall()
+        return [{"seq": row["seq"], "stage": row["stage"], "state": row["state"],
+                 "data": json.loads(row["data"]), "at": row["at"]} for row in rows]
+
+    def heartbeat(self):
+        """Renew this worker's lease on its jobs for another `lease` seconds."""
+        self._connection().execute(
+            "INSERT INTO export_workers (owner, heartbeat_at) VALUES (?, ?) "
+            "ON CONFLICT (owner) DO UPDATE SET heartbeat_at = excluded.heartbeat_at",
+            (self.owner, time.time()),
+        )
+
+    def retire(self):
+        """Give up this worker's lease, e.g. on shutdown, so others take over its jobs right away."""
+        self._connection().execute("DELETE FROM export_workers WHERE owner = ?", (self.owner,))
+
+    def recover(self):
+        """
+        Take over the unfinished jobs of workers whose lease ran out. Returns
+        them as dicts with their payload; each is claimed by exactly one caller.
+        """
+        conn = self._connection()
+        cutoff = time.time() - self.lease
+        placeholders = ", ".join("?" for _ in FINISHED_STATES)
+        rows = conn.execute(
+            f"SELECT id, state, priority, tenant, export_jobs.owner AS owner, payload, container FROM export_jobs "
+            f"LEFT JOIN export_workers ON export_workers.owner = export_jobs.owner "
+            f"WHERE state NOT IN ({placeholders}) AND export_jobs.owner != ? "
+            f"AND (heartbeat_at IS NULL OR heartbeat_at < ?)", (*FINISHED_STATES, self.owner, cutoff)
+        ).fetchall()
+        recovered = []
+        for row in rows:
+            claimed = conn.execute(
+                "UPDATE export_jobs SET owner = ?, updated_at = ? WHERE id = ? AND owner = ?",
+                (self.owner, time.time(), row["id"], row["owner"]),
+            ).rowcount
+            if claimed:
+                job = dict(row)
+                job["job_id"] = job.pop("id")
+                job["payload"] = json.loads(job["payload"])
+                recovered.append(job)
+        conn.execute("DELETE FROM export_workers WHERE heartbeat_at < ? AND owner != ?", (cutoff, self.owner))
+        return recovered
+
+    def fail(self, job_id, error):
+        """Mark a job that can't be resumed as failed."""
+        self.flush()
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM export_job_events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            conn.execute("UPDATE export_jobs SET state = 'failed', stage = 'failed', error = ?, updated_at = ? "
+                         "WHERE id = ?", (error, now, job_id))
+            conn.execute(
+                "INSERT INTO export_job_events (job_id, seq, stage, state, data, at) VALUES (?, ?, 'failed', 'failed', ?, ?)",
+                (job_id, seq, json.dumps({"error": error}), now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def prune(self, max_age):
+        """Delete finished jobs last updated more than max_age seconds ago."""
+        cutoff = time.time() - max_age
+        conn = self._connection()
+        placeholders = ", ".join("?" for _ in FINISHED_STATES)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                f"DELETE FROM export_job_events WHERE job_id IN (SELECT id FROM export_jobs "
+                f"WHERE updated_at < ? AND state IN ({placeholders}))", (cutoff, *FINISHED_STATES)
+            )
+            removed = conn.execute(
+                f"DELETE FROM export_jobs WHERE updated_at < ? AND state IN ({placeholders})",
+                (cutoff, *FINISHED_STATES)
+            ).rowcount
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return removed
+
+    def save_deployment(self, route, container, url, bundle):
+        """
+        Record the container an export started for `route` and the config
+        bundle it was given, with that export's reference.
+        """
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO deployments "
+            "(route, container, url, config, config_key, refs, state, started_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, 1, 'running', ?, ?)",
+            (route, container, url, bundle.data, bundle.version, now, now),
+        )
+
+    def acquire_deployment(self, config_key):
+        """
+        Add a reference to the deployment of an identical config and return
+        it (without its config), or None if there is none.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT route, container, url, state, refs, started_at, updated_at FROM deployments "
+                "WHERE config_key = ? AND refs > 0 ORDER BY started_at DESC LIMIT 1", (config_key,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE deployments SET refs = refs + 1, updated_at = ? WHERE route = ?",
+                             (time.time(), row["route"]))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if row is None:
+            return None
+        deployment = dict(row)
+        deployment["refs"] += 1
+        return deployment
+
+    @staticmethod
+    def _drop_reference(conn, route, now):
+        """
+        Drop one reference to a deployment, within the caller's transaction.
+        The last one deletes the deployment and its replicas there and then,
+        so no export can acquire it while its containers are being removed.
+        """
+        conn.execute("UPDATE deployments SET refs = refs - 1, updated_at = ? WHERE route = ?", (now, route))
+        row = conn.execute("SELECT container, state, refs FROM deployments WHERE route = ?", (route,)).fetchone()
+        if row is None:
+            return {"route": route, "refs": 0, "deployment": None}
+        if row["refs"] > 0:
+            return {"route": route, "refs": row["refs"], "deployment": None}
+        replicas = conn.execute(
+            "SELECT container, url, started_at FROM deployment_replicas WHERE route = ? ORDER BY started_at, rowid",
+            (route,)
+        ).fetchall()
+        conn.execute("DELETE FROM deployment_replicas WHERE route = ?", (route,))
+        conn.execute("DELETE FROM deployments WHERE route = ?", (route,))
+        deployment = {"container": row["container"], "state": row["state"], "replicas": [dict(r) for r in replicas]}
+        return {"route": route, "refs": 0, "deployment": deployment}
+
+    def release_deployment(self, route):
+        """
+        Drop one reference to a deployment. Returns the route, the references
+        left and, once none are, the deployment deleted with the last one
+        (its container, state and replicas), for the caller to remove.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            released = self._drop_reference(conn, route, time.time())
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return released
+
+    def release_export(self, job_id):
+        """
+        Drop the reference a succeeded export holds on its deployment, once.
+        Returns what release_deployment() does, or None if the job did not
+        succeed or was released already.
+        """
+        self.flush()
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            job = conn.execute("SELECT state, stage, result FROM export_jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None or job["state"] != "succeeded" or job["stage"] == "released" or not job["result"]:
+                conn.execute("ROLLBACK")
+                return None
+            route = json.loads(job["result"])["container"]
+            seq = conn.execute(
+                "SELECT COALESCE(MAX(seq), 0) + 1 FROM export_job_events WHERE job_id = ?", (job_id,)
+            ).fetchone()[0]
+            conn.execute("UPDATE export_jobs SET stage = 'released', updated_at = ? WHERE id = ?", (now, job_id))
+            conn.execute(
+                "INSERT INTO export_job_events (job_id, seq, stage, state, data, at) "
+                "VALUES (?, ?, 'released', 'succeeded', ?, ?)",
+                (job_id, seq, json.dumps({"route": route}), now),
+            )
+            released = self._drop_reference(conn, route, now)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return released
+
+    def move_deployment(self, route, container, url):
+        """Record that a new container now serves `route`; False if the deployment is gone."""
+        now = time.time()
+        return self._connection().execute(
+            "UPDATE deployments SET container = ?, url = ?, state = 'running', started_at = ?, updated_at = ? "
+            "WHERE route = ?", (container, url, now, now, route)
+        ).rowcount == 1
+
+    def claim_deployment(self, route, from_state, to_state):
+        """
+        Move a deployment from from_state to to_state; False if it was not in
+        from_state, e.g. because another worker got to it first.
+        """
+        return self._connection().execute(
+            "UPDATE deployments SET state = ?, updated_at = ? WHERE route = ? AND state = ?",
+            (to_state, time.time(), route, from_state)
+        ).rowcount == 1
+
+    def get_deployment(self, route):
+        row = self._connection().execute(
+            "SELECT route, container, url, config, config_key, refs, state, started_at, updated_at "
+            "FROM deployments WHERE route = ?",
+            (route,)
+        ).fetchone()
+        if row is None:
+            return None
+        deployment = dict(row)
+        deployment["config"] = ConfigBundle(deployment["config_key"], deployment["config"])
+        return deployment
+
+    def deployments(self, state=None):
+        """Deployments without their config, optionally only those in `state`."""
+        query = "SELECT route, container, url, state, refs, started_at, updated_at FROM deployments"
+        rows = self._connection().execute(
+            query + (" WHERE state = ?" if state else ""), (state,) if state else ()
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def add_replica(self, route, container, url):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO deployment_replicas (route, container, url, started_at) VALUES (?, ?, ?, ?)",
+            (route, container, url, time.time()),
+        )
+
+    def remove_replica(self, route, container):
+        self._connection().execute(
+            "DELETE FROM deployment_replicas WHERE route = ? AND container = ?", (route, container)
+        )
+
+    def replicas(self, route):
+        """A deployment's replicas, oldest first."""
+        rows = self._connection().execute(
+            "SELECT container, url, started_at FROM deployment_replicas WHERE route = ? ORDER BY started_at, rowid",
+            (route,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def delete_replicas(self, route):
+        """Forget a deployment's replicas, returning them."""
+        replicas = self.replicas(route)
+        self._connection().execute("DELETE FROM deployment_replicas WHERE route = ?", (route,))
+        return replicas
@@ -0,0 +1,347 @@
+import asyncio
+import heapq
+import itertools
+import time
+import uuid
+from collections import OrderedDict, deque
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TIMED_OUT = "timed_out"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED, TIMED_OUT)
+
+# Stage of command output lines, which only reach live subscribers
+OUTPUT = "output"
+# Output lines a subscriber may fall behind by before further ones are dropped for it
+MAX_OUTPUT_BACKLOG = 1000
+
+# Tenants remembered for fair ordering; the least recently served are forgotten first
+MAX_TRACKED_TENANTS = 1000
+
+
+class ExportCancelled(RuntimeError):
+    pass
+
+
+class ExportTimeout(RuntimeError):
+    pass
+
+
+class ExportJob:
+    """One export waiting for, or holding, a scheduler slot."""
+
+    def __init__(self, payload, priority=0, tenant="default", timeout=None, job_id=None, listener=None, key=None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.payload = payload
+        self.priority = priority
+        self.tenant = tenant
+        self.timeout = timeout
+        self.key = key
+        # Submits coalesced into this job; it is only abandoned once all of them are
+        self.requests = 1
+        self.state = QUEUED
+        self.stage = None
+        # Progress events, in order; each is also passed to listener(job, event)
+        self.events = []
+        self._listener = listener
+        self._subscribers = set()
+        # Set by the runner once a container belongs to this job, so it can be removed
+        self.container = None
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting on the outcome (e.g. a cancelled job); don't log it as lost
+        self.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._task = None
+
+    def report(self, stage, **data):
+        """Record that the job reached `stage` and tell the listener and subscribers."""
+        self.stage = stage
+        event = {"seq": len(self.events) + 1, "stage": stage, "state": self.state, "data": data, "at": time.time()}
+        self.events.append(event)
+        if self._listener is not None:
+            try:
+                self._listener(self, event)
+            except Exception as e:
+                print(f"Error recording event {stage} of export {self.id}: {str(e)}")
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+            if self.state in FINISHED_STATES:
+                queue.put_nowait(None)
+
+    def output(self, stream, line):
+        """
+        Pass a line a command wrote for this job (e.g. docker build output)
+        to subscribers. Unlike report() it is not kept in `events` nor
+        recorded; its seq is that of the latest event.
+        """
+        event = {"seq": len(self.events), "stage": OUTPUT, "state": self.state,
+                 "data": {"stream": stream, "line": line}, "at": time.time()}
+        for queue in self._subscribers:
+            if queue.qsize() < MAX_OUTPUT_BACKLOG:
+                queue.put_nowait(event)
+
+    def subscribe(self):
+        """
+        Queue receiving the job's events from now on, then None once it has
+        finished. Earlier events are in `events`.
+        """
+        queue = asyncio.Queue()
+        if self.state in FINISHED_STATES:
+            queue.put_nowait(None)
+        else:
+            self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self._subscribers.discard(queue)
+
+    @property
+    def wait_time(self):
+        return (self.started_at or self.finished_at or time.monotonic()) - self.submitted_at
+
+    @property
+    def run_time(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "state": self.state,
+            "stage": self.stage,
+            "priority": self.priority,
+            "tenant": self.tenant,
+            "requests": self.requests,
+            "container": self.container,
+            "wait_time": self.wait_time,
+            "run_time": self.run_time,
+            "error": str(self.error) if self.error else None,
+        }
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] if values else 0
+
+
+class ExportScheduler:
+    """
+    Runs exports as tasks, at most max_concurrent at a time.
+
+    Scheduling is driven by events rather than polling: a submit or a
+    finished job starts as many queued jobs as there are free slots. The
+    next job is the highest-priority one at the head of any tenant's queue;
+    among tenants whose heads share that priority, the one served least
+    recently goes first, so one tenant's burst cannot starve the others.
+
+    Each job runs under a timeout. Cancelled, timed out and failed jobs
+    have their container removed through `cleanup(job)`.
+
+    Submits with the `key` of a queued or running job join that job
+    instead of queuing another, e.g. when a user clicks Export repeatedly.
+
+    State changes, and the stages a runner reports through job.report(),
+    are passed as events to `listener(job, event)` and to subscribers.
+    """
+
+    def __init__(self, runner, max_concurrent=3, timeout=300, cleanup=None, listener=None, history=100):
+        self.runner = runner
+        self.max_concurrent = max(1, max_concurrent)
+        self.timeout = timeout
+        self.cleanup = cleanup
+        self.listener = listener
+        self.history = history
+        self._queues = {}
+        # Dispatch sequence number of each tenant's latest job, for fairness
+        self._last_served = OrderedDict()
+        self._seq = itertools.count()
+        self._jobs = OrderedDict()
+        # Unfinished jobs by key, for coalescing identical submits
+        self._by_key = {}
+        self._running = {}
+        self._closed = False
+        self.counts = {state: 0 for state in FINISHED_STATES}
+        self.submitted = 0
+        self.coalesced = 0
+        self._wait_times = deque(maxlen=100)
+        self._run_times = deque(maxlen=100)
+
+    async def start(self):
+        """Accept jobs (again, after a shutdown) and start any already queued."""
+        self._closed = False
+        self._dispatch()
+
+    async def shutdown(self, cancel_queued=True):
+        """
+        Cancel running jobs, removing their containers, and queued ones
+        unless cancel_queued is False (e.g. to leave them to another worker).
+        """
+        self._closed = True
+        if cancel_queued:
+            for job in [job for job in self._jobs.values() if job.state == QUEUED]:
+                self.cancel(job.id)
+        tasks = [job._task for job in self._running.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def submit(self, payload, priority=0, tenant="default", timeout=None, job_id=None, key=None):
+        """
+        Queue an export; await `job.future` for its result. If a job with the
+        same key is queued or running, that job is returned instead.
+        """
+        if self._closed:
+            raise RuntimeError("Export scheduler is shut down")
+        if key is not None and key in self._by_key:
+            job = self._by_key[key]
+            job.requests += 1
+            self.coalesced += 1
+            return job
+        job = ExportJob(payload, priority, tenant, timeout or self.timeout, job_id, self.listener, key)
+        heapq.heappush(self._queues.setdefault(tenant, []), (-priority, next(self._seq), job))
+        self._jobs[job.id] = job
+        if key is not None:
+            self._by_key[key] = job
+        self.submitted += 1
+        self._trim_history()
+        job.report(QUEUED)
+        self._dispatch()
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs(self):
+        return [job.to_dict() for job in self._jobs.values()]
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; False if it is unknown or already finished."""
+        job = self._jobs.get(job_id)
+        if job is None or job.state in FINISHED_STATES:
+            return False
+        if job.state == QUEUED:
+            queue = self._queues[job.tenant]
+            queue[:] = [entry for entry in queue if entry[2] is not job]
+            heapq.heapify(queue)
+            if not queue:
+                del self._queues[job.tenant]
+            self._finish(job, CANCELLED, error=ExportCancelled(f"Export {job.id} was cancelled"))
+        else:
+            job._task.cancel()
+        return True
+
+    def abandon(self, job_id):
+        """
+        One submitter of a job stopped waiting for it (e.g. its request was
+        disconnected). The job is cancelled once no submitter is left.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.state in FINISHED_STATES:
+            return False
+        job.requests -= 1
+        if job.requests > 0:
+            return False
+        return self.cancel(job_id)
+
+    def _next_job(self):
+        # Best priority first, then the least recently served tenant
+        tenant = min(self._queues, key=lambda t: (self._queues[t][0][0], self._last_served.get(t, -1)))
+        _, _, job = heapq.heappop(self._queues[tenant])
+        if not self._queues[tenant]:
+            del self._queues[tenant]
+        self._last_served.pop(tenant, None)
+        self._last_served[tenant] = next(self._seq)
+        while len(self._last_served) > MAX_TRACKED_TENANTS:
+            self._last_served.popitem(last=False)
+        return job
+
+    def _dispatch(self):
+        while self._queues and len(self._running) < self.max_concurrent and not self._closed:
+            job = self._next_job()
+            job.state = RUNNING
+            job.started_at = time.monotonic()
+            self._wait_times.append(job.wait_time)
+            self._running[job.id] = job
+            job.report(RUNNING)
+            job._task = asyncio.ensure_future(self._run(job))
+            job._task.add_done_callback(lambda task, job=job: self._cancelled_before_start(job, task))
+
+    def _cancelled_before_start(self, job, task):
+        # A task cancelled before its first step never runs _run's handlers
+        if task.cancelled() and job.state not in FINISHED_STATES:
+            self._running.pop(job.id, None)
+            self._finish(job, CANCELLED, error=ExportCancelled(f"Export {job.id} was cancelled"))
+            self._dispatch()
+
+    async def _run(self, job):
+        try:
+            result = await asyncio.wait_for(self.runner(job), job.timeout)
+        except asyncio.TimeoutError:
+            await self._cleanup(job)
+            self._finish(job, TIMED_OUT, error=ExportTimeout(f"Export {job.id} timed out after {job.timeout}s"))
+        except asyncio.CancelledError:
+            await self._cleanup(job)
+            self._finish(job, CANCELLED, error=ExportCancelled(f"Export {job.id} was cancelled"))
+        except Exception as e:
+            await self._cleanup(job)
+            self._finish(job, FAILED, error=e)
+        else:
+            self._finish(job, SUCCEEDED, result=result)
+        finally:
+            self._running.pop(job.id, None)
+            self._dispatch()
+
+    async def _cleanup(self, job):
+        if self.cleanup is None or job.container is None:
+            return
+        try:
+            await self.cleanup(job)
+        except Exception as e:
+            print(f"Error cleaning up export {job.id}: {str(e)}")
+
+    def _finish(self, job, state, result=None, error=None):
+        job.state = state
+        job.result = result
+        job.error = error
+        job.finished_at = time.monotonic()
+        if job.key is not None and self._by_key.get(job.key) is job:
+            del self._by_key[job.key]
+        if job.started_at is not None:
+            self._run_times.append(job.run_time)
+        self.counts[state] += 1
+        job.report(state, **({"result": result} if error is None else {"error": str(error)}))
+        if not job.future.done():
+            if error is None:
+                job.future.set_result(result)
+            else:
+                job.future.set_exception(error)
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.state in FINISHED_STATES]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        wait_times, run_times = list(self._wait_times), list(self._run_times)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "queued_by_tenant": {tenant: len(queue) for tenant, queue in self._queues.items()},
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            **self.counts,
+            "avg_wait_time": sum(wait_times) / len(wait_times) if wait_times else 0,
+            "p95_wait_time": _percentile(wait_times, 0.95),
+            "avg_run_time": sum(run_times) / len(run_times) if run_times else 0,
+            "p95_run_time": _percentile(run_times, 0.95),
+        }
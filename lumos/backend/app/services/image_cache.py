@@ -0,0 +1,197 @@
+import asyncio
+import hashlib
+import os
+import time
+from ..utils.process_utils import command_log, run_command, stream_command
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; builds are then only single-flight per process
+    fcntl = None
+
+# Build context entries that never reach the image
+IGNORED_NAMES = {"__pycache__", ".git", ".DS_Store"}
+IGNORED_SUFFIXES = (".pyc", ".log")
+
+
+class ImageCache:
+    """
+    Docker images for the export pipeline, tagged with a content hash of
+    their build context.
+
+    ensure_image() returns `<repository>:<hash>`, building it only when no
+    image with that tag exists. Concurrent callers share one build: within
+    the process through a shared task, across processes (e.g. several
+    uvicorn workers) through a lock file. After a build, older tags of the
+    repository beyond the `keep` most recent are removed.
+
+    Build output is streamed line by line to `log_path` (rotated) and to
+    output listeners, e.g. exports waiting on the image. A build running
+    longer than build_timeout seconds is killed.
+    """
+
+    def __init__(self, context_dir="./ui_app", repository="simple-ui-app", keep=3, lock_path=None, docker="docker",
+                 log_path=None, build_timeout=None):
+        self.context_dir = context_dir
+        self.repository = repository
+        self.keep = max(1, keep)
+        self.lock_path = lock_path or os.path.join(os.path.dirname(os.path.abspath(context_dir)),
+                                                   f".{repository}.build.lock")
+        self.docker = docker
+        self.log = command_log(log_path) if log_path else None
+        self.build_timeout = build_timeout
+        self._output_listeners = set()
+        self._builds = {}
+        self._signature = None
+        self._hash = None
+        self.hits = 0
+        self.builds = 0
+        self.build_failures = 0
+        self.last_build_seconds = 0.0
+        self.removed_tags = 0
+
+    def _files(self):
+        for root, dirs, files in os.walk(self.context_dir):
+            dirs[:] = sorted(d for d in dirs if d not in IGNORED_NAMES)
+            for name in sorted(files):
+                if name in IGNORED_NAMES or name.endswith(IGNORED_SUFFIXES):
+                    continue
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, self.context_dir).replace(os.sep, "/"), path
+
+    def context_hash(self):
+        """
+        SHA-256 over the relative paths and contents of the build context.
+        File contents are only re-read when a path, size or mtime changed.
+        """
+        files = list(self._files())
+        signature = []
+        for relpath, path in files:
+            stat = os.stat(path)
+            signature.append((relpath, stat.st_size, stat.st_mtime_ns, stat.st_mode & 0o111))
+        if signature == self._signature:
+            return self._hash
+
+        digest = hashlib.sha256()
+        for (relpath, path), (_, _, _, executable) in zip(files, signature):
+            digest.update(relpath.encode() + b"\0" + str(executable).encode() + b"\0")
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 16), b""):
+                    digest.update(block)
+            digest.update(b"\0")
+        self._signature, self._hash = signature, digest.hexdigest()[:16]
+        return self._hash
+
+    def add_output_listener(self, listener):
+        """Call listener(stream, line) with each line builds write from now on."""
+        self._output_listeners.add(listener)
+
+    def remove_output_listener(self, listener):
+        self._output_listeners.discard(listener)
+
+    def _on_build_output(self, stream, line):
+        for listener in list(self._output_listeners):
+            listener(stream, line)
+
+    def tag_for(self, content_hash):
+        return f"{self.repository}:{content_hash}"
+
+    async def _docker(self, *args):
+        return await run_command(self.docker, *args)
+
+    async def _image_exists(self, tag):
+        returncode, _, _ = await self._docker("image", "inspect", tag)
+        return returncode == 0
+
+    async def ensure_image(self):
+        """Return the tag of an image built from the current context, building it if needed."""
+        loop = asyncio.get_running_loop()
+        tag = self.tag_for(await loop.run_in_executor(None, self.context_hash))
+
+        build = self._builds.get(tag)
+        if build is None:
+            build = asyncio.ensure_future(self._ensure(tag))
+            self._builds[tag] = build
+            build.add_done_callback(lambda _: self._builds.pop(tag, None))
+        # shield: one caller being cancelled must not cancel the shared build
+        return await asyncio.shield(build)
+
+    async def _ensure(self, tag):
+        if await self._image_exists(tag):
+            self.hits += 1
+            return tag
+
+        loop = asyncio.get_running_loop()
+        lock_file = await loop.run_in_executor(None, self._acquire_lock)
+        try:
+            # Another process may have built it while we waited for the lock
+            if await self._image_exists(tag):
+                self.hits += 1
+                return tag
+            started = time.monotonic()
+            try:
+                returncode, _, stderr = await stream_command(
+                    self.docker, "build", "-t", tag, "-t", f"{self.repository}:latest", self.context_dir,
+                    on_output=self._on_build_output, log=self.log, timeout=self.build_timeout,
+                )
+            except RuntimeError:
+                self.build_failures += 1
+                raise
+            if returncode != 0:
+                self.build_failures += 1
+                raise RuntimeError(f"docker build of {tag} failed:\n{stderr}")
+            self.builds += 1
+            self.last_build_seconds = time.monotonic() - started
+        finally:
+            self._release_lock(lock_file)
+
+        await self.collect_garbage(tag)
+        return tag
+
+    def _acquire_lock(self):
+        if fcntl is None:
+            return None
+        lock_file = open(self.lock_path, "w")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def _release_lock(self, lock_file):
+        if lock_file is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+    async def collect_garbage(self, current_tag):
+        """
+        Remove hash tags of the repository beyond the `keep` most recent,
+        never the current one. Images still used by a container fail to
+        remove and are kept until a later pass.
+        """
+        returncode, stdout, _ = await self._docker(
+            "image", "ls", self.repository, "--format", "{{.Tag}}"
+        )
+        if returncode != 0:
+            return []
+        # docker lists images newest first
+        tags = [line.strip() for line in stdout.splitlines() if line.strip() not in ("", "latest", "<none>")]
+        current = current_tag.split(":", 1)[1]
+        stale = [tag for tag in tags if tag != current][self.keep - 1:]
+        removed = []
+        for tag in stale:
+            returncode, _, stderr = await self._docker("rmi", f"{self.repository}:{tag}")
+            if returncode == 0:
+                removed.append(tag)
+            else:
+                print(f"Keeping image {self.repository}:{tag}: {stderr.strip()}")
+        self.removed_tags += len(removed)
+        return removed
+
+    def stats(self):
+        return {
+            "current_hash": self._hash,
+            "hits": self.hits,
+            "builds": self.builds,
+            "build_failures": self.build_failures,
+            "building": len(self._builds),
+            "last_build_seconds": self.last_build_seconds,
+            "removed_tags": self.removed_tags,
+        }
@@ -0,0 +1,382 @@
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date, datetime
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode(value):
+    return json.dumps(value, default=_json_default).encode()
+
+
+class CacheBackend(ABC):
+    """
+    Storage behind ProjectCache. Backends enforce their own size bounds and TTL.
+
+    Each key has a generation, raised by invalidate(). A caller loading a
+    missing value reads generation() first and passes it to set(), which
+    skips the value if the key was invalidated meanwhile, so a load that
+    raced with a write is not cached over it. Generations are kept for the
+    last max_generations invalidated keys; older ones read as the highest
+    generation forgotten, which can only make set() skip more.
+    """
+
+    @abstractmethod
+    def get(self, key):
+        """Return the cached value, or None if missing or expired."""
+
+    @abstractmethod
+    def set(self, key, value, generation=None):
+        """Cache value; False if skipped because the key was invalidated after `generation`."""
+
+    @abstractmethod
+    def delete(self, key):
+        pass
+
+    @abstractmethod
+    def generation(self, key):
+        pass
+
+    @abstractmethod
+    def invalidate(self, key):
+        """Delete the key's value and raise its generation."""
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def stats(self):
+        """Return a dict with at least entries, bytes and evictions."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    In-process LRU bounded by entry count and by the JSON-encoded size of
+    the cached values. Values are kept as objects, so hits cost no decoding;
+    they are copied in and out, so callers cannot mutate cached entries.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl=300, max_generations=4096):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_generations = max_generations
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._evictions = 0
+        self._generations = OrderedDict()  # key -> generation, least recently invalidated first
+        self._last_generation = 0
+        self._generation_floor = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, size, expires_at = entry
+            if expires_at and expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def set(self, key, value, generation=None):
+        size = len(_encode(value))
+        if size > self.max_bytes:
+            return True
+        value = copy.deepcopy(value)
+        expires_at = time.monotonic() + self.ttl if self.ttl else 0
+        with self._lock:
+            if generation is not None and self._generations.get(key, self._generation_floor) != generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def generation(self, key):
+        with self._lock:
+            return self._generations.get(key, self._generation_floor)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._last_generation += 1
+            self._generations[key] = self._last_generation
+            self._generations.move_to_end(key)
+            while len(self._generations) > self.max_generations:
+                _, self._generation_floor = self._generations.popitem(last=False)
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "evictions": self._evictions,
+            }
+
+
+class SharedCacheBackend(CacheBackend):
+    """
+    LRU stored in a local SQLite file, so every uvicorn worker on the host
+    sees the same entries and the same invalidations. Stand-in for a shared
+    cache server on single-host deployments.
+    """
+
+    def __init__(self, path, max_entries=1024, max_bytes=256 * 1024 * 1024, ttl=300, max_generations=4096):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.max_generations = max_generations
+        self._local = threading.local()
+        self._evictions = 0
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache (last_access)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_generations (
+                key TEXT PRIMARY KEY,
+                generation INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_generations ON cache_generations (generation)")
+        # last generation handed out, and the highest one forgotten
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.execute("INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('generation', 0), ('generation_floor', 0)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connection()
+        row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] and row[1] < now:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE cache SET last_access = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value, generation=None):
+        data = _encode(value)
+        if len(data) > self.max_bytes:
+            return True
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else 0
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # checked under the write lock, so another worker's invalidate() can't slip in before the insert
+            if generation is not None and self._generation(conn, key) != generation:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), expires_at, now),
+            )
+            self._evict(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def _evict(self, conn):
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        while entries > self.max_entries or total > self.max_bytes:
+            key, size = conn.execute("SELECT key, size FROM cache ORDER BY last_access LIMIT 1").fetchone()
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            entries -= 1
+            total -= size
+            self._evictions += 1
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    @staticmethod
+    def _generation(conn, key):
+        return conn.execute(
+            "SELECT COALESCE((SELECT generation FROM cache_generations WHERE key = ?), "
+            "(SELECT value FROM cache_meta WHERE name = 'generation_floor'))", (key,)
+        ).fetchone()[0]
+
+    def generation(self, key):
+        return self._generation(self._connection(), key)
+
+    def invalidate(self, key):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("UPDATE cache_meta SET value = value + 1 WHERE name = 'generation'")
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_generations (key, generation) "
+                "SELECT ?, value FROM cache_meta WHERE name = 'generation'", (key,)
+            )
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            row = conn.execute(
+                "SELECT generation FROM cache_generations ORDER BY generation DESC LIMIT 1 OFFSET ?",
+                (self.max_generations,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM cache_generations WHERE generation <= ?", (row[0],))
+                conn.execute("UPDATE cache_meta SET value = MAX(value, ?) WHERE name = 'generation_floor'", (row[0],))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        self._connection().execute("DELETE FROM cache")
+
+    def stats(self):
+        entries, total = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+        return {
+            "backend": "shared",
+            "entries": entries,
+            "bytes": total,
+            "evictions": self._evictions,
+        }
+
+
+class ProjectCache:
+    """
+    Read-through cache of hydrated projects keyed by project id. A load
+    that raced with a write, in this worker or another sharing the backend,
+    is not cached over it (see CacheBackend).
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.stale_loads = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(project_id):
+        return f"project:{project_id}"
+
+    def _lookup(self, key):
+        """Return (cached project, None) or, on a miss, (None, generation of the key)."""
+        project = self.backend.get(key)
+        with self._lock:
+            if project is not None:
+                self.hits += 1
+                return project, None
+            self.misses += 1
+        return None, self.backend.generation(key)
+
+    def _store(self, key, generation, project):
+        if not project or project.get("status") == "error":
+            return
+        # Invalidated while loading: the loaded project may predate the write
+        if not self.backend.set(key, project, generation):
+            with self._lock:
+                self.stale_loads += 1
+
+    def get_or_load(self, project_id, loader):
+        """
+        Return the cached project, or call loader() and cache its result.
+        Results with status "error" are not cached.
+        """
+        key = self._key(project_id)
+        project, generation = self._lookup(key)
+        if project is not None:
+            return project
+        project = loader()
+        self._store(key, generation, project)
+        return project
+
+    async def get_or_load_async(self, project_id, loader):
+        """Like get_or_load() for a loader returning an awaitable."""
+        key = self._key(project_id)
+        project, generation = self._lookup(key)
+        if project is not None:
+            return project
+        project = await loader()
+        self._store(key, generation, project)
+        return project
+
+    def invalidate(self, project_id):
+        with self._lock:
+            self.invalidations += 1
+        self.backend.invalidate(self._key(project_id))
+
+    def on_storage_event(self, event, project_id):
+        """Storage strategy listener: drop the entry of any written project."""
+        self.invalidate(project_id)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0,
+                "invalidations": self.invalidations,
+                "stale_loads": self.stale_loads,
+            }
+        stats.update(self.backend.stats())
+        return stats
+
+
+def create_cache_backend():
+    """Build the cache backend configured through PROJECT_CACHE_* env vars."""
+    max_entries = int(os.getenv("PROJECT_CACHE_MAX_ENTRIES", "256"))
+    max_bytes = int(os.getenv("PROJECT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    ttl = float(os.getenv("PROJECT_CACHE_TTL", "300"))
+    if os.getenv("PROJECT_CACHE_BACKEND", "memory") == "shared":
+        path = os.getenv("PROJECT_CACHE_PATH", "project_cache.sqlite3")
+        return SharedCacheBackend(path, max_entries, max_bytes, ttl)
+    return MemoryCacheBackend(max_entries, max_bytes, ttl)
@@ -1,7 +1,7 @@
 from ..models.project_model import ProjectModel
+from ..models.project_queries import build_projects_query
 from ..schemas.project_schema import ProjectExport
 import asyncio
-import aiofiles
 import aiohttp
 import socket 
 import random 
@@ -13,6 +13,19 @@ import json
 import requests
 import subprocess
 from ..utils.network_utils import random_free_port, random_name, random_port
+from ..utils.metrics_utils import register_metrics_provider
+from ..utils.process_utils import COMMAND_TIMEOUT, command_log, stream_command
+from ..utils.config_bundle import canonical_json, config_version, encode_config
+from .project_cache import ProjectCache, create_cache_backend
+from .image_cache import ImageCache
+from .warm_pool import WarmPool
+from .export_scheduler import ExportScheduler, FINISHED_STATES, OUTPUT
+from .export_job_store import ExportJobStore
+from .tunnel_resolver import TunnelResolver
+from .route_registry import RouteRegistry, ProxyRouteNotifier
+from .container_lifecycle import ContainerLifecycle
+from .proxy_metrics import ProxyMetricsScraper
+from .replica_scaler import ExportNotRunningError, ReplicaScaler
 from collections import deque
 from datetime import datetime
 
@@ -20,58 +33,247 @@ from datetime import datetime
 # Constants
 MAX_CONCURRENT_EXPORTS = 3
 EXPORT_TIMEOUT = 300  # 5 minutes
+EXPORT_JOB_RETENTION = 7 * 24 * 3600  # finished jobs are kept a week
+BUILD_TIMEOUT = 900  # seconds a ui_app image build may run
+
+
+def export_config(project_data: dict):
+    """The config an export hands its container, from a ProjectExport dict."""
+    return {
+        'project': project_data['project'],
+        'agents': project_data['agents'],
+        'tools': project_data.get('tools', []),
+        'interactions': project_data.get('interactions', [])
+    }
+
+
+def export_key(config):
+    """Hash of an export config's canonical JSON, the version of its bundle; identical projects share it."""
+    return config_version(canonical_json(config))
 
 class ProjectService:
-    def __init__(self):
+    def __init__(self, cache=None):
         self.model = ProjectModel()
-        self.queue = deque()
-        self.active_tasks = set()
-        self.lock = asyncio.Lock()
-        # Start the scheduler if an event loop is already running
+        # Saved projects only change when written, so cache hydrated reads
+        # and drop entries when the storage strategy reports a write
+        self.cache = cache or ProjectCache(create_cache_backend())
+        self.model.strategy.add_listener(self.cache.on_storage_event)
+        register_metrics_provider("project_cache", self.cache.stats)
+        # Output of the docker commands exports run, rotated
+        self.command_log_path = os.getenv("EXPORT_COMMAND_LOG", "export_commands.log")
+        self.command_log = command_log(
+            self.command_log_path,
+            max_bytes=int(os.getenv("EXPORT_COMMAND_LOG_MAX_BYTES", 10 * 1024 * 1024)),
+            backup_count=int(os.getenv("EXPORT_COMMAND_LOG_BACKUPS", "5")),
+        )
+        # ui_app image, rebuilt only when its build context changes
+        self.image_cache = ImageCache(
+            os.getenv("UI_APP_CONTEXT", "./ui_app"),
+            repository=os.getenv("UI_APP_IMAGE", "simple-ui-app"),
+            keep=int(os.getenv("UI_APP_IMAGE_KEEP", "3")),
+            log_path=self.command_log_path,
+            build_timeout=float(os.getenv("UI_APP_BUILD_TIMEOUT", BUILD_TIMEOUT)),
+        )
+        register_metrics_provider("image_cache", self.image_cache.stats)
+        # Idle ui_app containers that exports claim and configure
+        self.warm_pool = WarmPool(
+            self.image_cache,
+            min_size=int(os.getenv("WARM_POOL_MIN_SIZE", "2")),
+            max_size=int(os.getenv("WARM_POOL_MAX_SIZE", "5")),
+        )
+        register_metrics_provider("warm_pool", self.warm_pool.stats)
+        # Public URL of the ngrok tunnel in front of the proxy
+        self.tunnels = TunnelResolver(
+            os.getenv("NGROK_API_URL", "http://localhost:4040/api/tunnels"),
+            refresh_interval=float(os.getenv("NGROK_REFRESH_INTERVAL", "10")),
+        )
+        register_metrics_provider("tunnel", self.tunnels.stats)
+        # Container routes shared with the proxy, which is told about each change
+        self.routes = RouteRegistry(os.getenv("ROUTE_MAP_PATH", "route_map.json"))
+        if os.getenv("PROXY_ROUTES_TOKEN"):
+            self.routes.add_listener(ProxyRouteNotifier(
+                os.getenv("PROXY_ROUTES_URL", "http://localhost:8080/_routes"), os.getenv("PROXY_ROUTES_TOKEN")
+            ))
+        register_metrics_provider("routes", self.routes.stats)
+        # Traffic per route as seen by the proxy, read in the background for /metrics
+        self.proxy_metrics = ProxyMetricsScraper(
+            os.getenv("PROXY_METRICS_URL", "http://localhost:8080/_metrics"), os.getenv("PROXY_ROUTES_TOKEN", ""),
+            interval=float(os.getenv("PROXY_METRICS_INTERVAL", "15")),
+        )
+        register_metrics_provider("proxy", self.proxy_metrics.stats)
+        # Export jobs and their progress, readable by every worker and after restarts
+        self.job_store = ExportJobStore(os.getenv("EXPORT_JOB_STORE_PATH", "export_jobs.sqlite3"),
+                                        lease=float(os.getenv("EXPORT_WORKER_LEASE", "30")))
+        self._lease_task = None
+        # Exports run as tasks, MAX_CONCURRENT_EXPORTS at a time
+        self.scheduler = ExportScheduler(
+            self._run_export_job,
+            max_concurrent=int(os.getenv("MAX_CONCURRENT_EXPORTS", MAX_CONCURRENT_EXPORTS)),
+            timeout=float(os.getenv("EXPORT_TIMEOUT", EXPORT_TIMEOUT)),
+            cleanup=self._cleanup_export,
+            listener=self.job_store.record,
+        )
+        register_metrics_provider("export_scheduler", self.scheduler.stats)
+        # Parks export containers nobody uses and wakes them on their next request
+        memory_budget_mb = os.getenv("CONTAINER_MEMORY_BUDGET_MB")
+        self.lifecycle = ContainerLifecycle(
+            self.job_store, self.routes, self.warm_pool,
+            access_path=self.routes.path + ".access",
+            idle_ttl=float(os.getenv("CONTAINER_IDLE_TTL", "3600")),
+            max_containers=int(os.getenv("MAX_EXPORT_CONTAINERS", "20")),
+            memory_budget=int(float(memory_budget_mb) * 1024 * 1024) if memory_budget_mb else None,
+            interval=float(os.getenv("CONTAINER_SWEEP_INTERVAL", "60")),
+        )
+        register_metrics_provider("containers", self.lifecycle.stats)
+        # Extra containers for busy exports, scaled to the load the proxy reports
+        self.replicas = ReplicaScaler(
+            self.job_store, self.routes, self.warm_pool,
+            load=self.proxy_metrics.stats,
+            max_replicas=int(os.getenv("EXPORT_MAX_REPLICAS", "4")),
+            target_in_flight=float(os.getenv("REPLICA_TARGET_IN_FLIGHT", "4")),
+            interval=float(os.getenv("AUTOSCALE_INTERVAL", "30")),
+            scale_down_after=float(os.getenv("SCALE_DOWN_AFTER", "300")),
+            drain_seconds=float(os.getenv("REPLICA_DRAIN_SECONDS", "5")),
+        )
+        register_metrics_provider("replicas", self.replicas.stats)
+
+    async def start_exports(self):
+        """
+        Start the scheduler and keep this worker's lease on its export jobs,
+        resuming queued jobs of workers whose lease ran out and failing the
+        ones they were running.
+        """
+        await self.scheduler.start()
         try:
-            loop = asyncio.get_running_loop()
-            loop.create_task(self._process_queue())
-        except RuntimeError:
-            # No running loop (e.g., during testing import), defer scheduling
-            pass
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.job_store.prune, float(os.getenv("EXPORT_JOB_RETENTION", EXPORT_JOB_RETENTION))
+            )
+        except Exception as e:
+            print(f"Error pruning export jobs: {str(e)}")
+        await self._renew_lease()
+        if self._lease_task is None or self._lease_task.done():
+            self._lease_task = asyncio.ensure_future(self._lease_loop())
 
-    async def _process_queue(self):
-        """Background task to process the export queue"""
+    async def _lease_loop(self):
         while True:
-            async with self.lock:
-                if len(self.active_tasks) >= MAX_CONCURRENT_EXPORTS or not self.queue:
-                    await asyncio.sleep(1)
+            await asyncio.sleep(self.job_store.lease / 3)
+            await self._renew_lease()
+
+    async def _renew_lease(self):
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.job_store.heartbeat)
+            for job in await loop.run_in_executor(None, self.job_store.recover):
+                if job["state"] == "queued":
+                    self.scheduler.submit(job["payload"], job["priority"], job["tenant"], job_id=job["job_id"],
+                                          key=export_key(export_config(job["payload"])))
                     continue
-                
-                task_id, project_data, future = self.queue.popleft()
-                self.active_tasks.add(task_id)
-            
+                if job["container"]:
+                    await self._release_container(job["container"])
+                await loop.run_in_executor(None, self.job_store.fail, job["job_id"], "Interrupted by a worker restart")
+        except Exception as e:
+            print(f"Error recovering export jobs: {str(e)}")
+
+    async def shutdown_exports(self):
+        if self._lease_task is not None:
+            self._lease_task.cancel()
             try:
-                result = await self._execute_export(project_data)
-                future.set_result(result)
-            except Exception as e:
-                future.set_exception(e)
+                await self._lease_task
+            except asyncio.CancelledError:
+                pass
+            self._lease_task = None
+        # Queued jobs stay queued in the job store; giving up the lease lets
+        # the next worker to start resume them right away
+        await self.scheduler.shutdown(cancel_queued=False)
+        try:
+            loop = asyncio.get_running_loop()
+            # the last events, e.g. of cancelled jobs, are stored before the lease is given up
+            await loop.run_in_executor(None, self.job_store.flush)
+            await loop.run_in_executor(None, self.job_store.retire)
+        except Exception as e:
+            print(f"Error retiring export worker: {str(e)}")
+
+    def submit_export(self, project_data: ProjectExport, priority=0, tenant="default"):
+        """
+        Queue an export and return its job id without waiting for it. An
+        identical export already queued or running is joined instead.
+        """
+        try:
+            job = self._submit(project_data, priority, tenant)
+            return {"status": "success", "job_id": job.id, "state": job.state}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def get_export_job(self, job_id):
+        """
+        Status of an export job, from this worker or any other.
+        """
+        try:
+            job = await asyncio.get_running_loop().run_in_executor(None, self.job_store.get, job_id)
+            if job is None:
+                return {"status": "error", "message": f"No export job with ID {job_id}"}
+            return {"status": "success", "job": job}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def export_events(self, job_id, after_seq=0, poll_interval=0.5):
+        """
+        Yield the progress events of an export job after `after_seq`, live
+        until the job finishes. Jobs run by this worker are followed through
+        a subscription, which also carries their live command output; jobs
+        of other workers by polling the job store.
+        """
+        job = self.scheduler.get(job_id)
+        if job is not None:
+            queue = job.subscribe()
+            try:
+                for event in list(job.events):
+                    if event["seq"] > after_seq:
+                        after_seq = event["seq"]
+                        yield event
+                while True:
+                    event = await queue.get()
+                    if event is None:
+                        return
+                    if event["stage"] == OUTPUT:
+                        yield event
+                    elif event["seq"] > after_seq:
+                        after_seq = event["seq"]
+                        yield event
             finally:
-                async with self.lock:
-                    self.active_tasks.discard(task_id)
-
-    async def export_project(self, project_data: ProjectExport):
-        """Export project with same return structure but with queuing"""
-        # Create a future to await the result
-        future = asyncio.Future()
-        task_id = ''.join(random.choices(string.ascii_lowercase + string.digits, k=12))
-        
-        async with self.lock:
-            self.queue.append((task_id, project_data, future))
-        
-        # Wait for the result (this will block until the task is processed)
+                job.unsubscribe(queue)
+
+        loop = asyncio.get_running_loop()
+        while True:
+            stored = await loop.run_in_executor(None, self.job_store.get, job_id)
+            if stored is None:
+                return
+            for event in await loop.run_in_executor(None, self.job_store.events, job_id, after_seq):
+                after_seq = event["seq"]
+                yield event
+            if stored["finished"]:
+                return
+            await asyncio.sleep(poll_interval)
+
+    async def export_project(self, project_data: ProjectExport, priority=0, tenant="default"):
+        """Export project and wait for it, with the original return structure"""
         try:
-            result = await future
+            job = self._submit(project_data, priority, tenant)
+        except Exception as e:
+            return {"container": "", "ngrok_url": "", "status": f"error: {str(e)}"}
+
+        # Wait for the result (this will block until the job has run)
+        try:
+            result = await job.future
             return {
                 "container": result["container"],
                 "ngrok_url": result["ngrok_url"],
                 "status": "success"
             }
+        except asyncio.CancelledError:
+            # The caller went away; don't keep a slot busy for it unless others wait too
+            self.scheduler.abandon(job.id)
+            raise
         except Exception as e:
             return {
                 "container": "",
@@ -79,69 +281,159 @@ class ProjectService:
                 "status": f"error: {str(e)}"
             }
 
-    async def _execute_export(self, project_data: ProjectExport):
-        """Your original export logic"""
-        project_data = project_data.dict()
-        data = {
-            'project': project_data['project'],
-            'agents': project_data['agents'],
-            'tools': project_data.get('tools', []),
-            'interactions': project_data.get('interactions', [])
-        }
+    def list_export_jobs(self):
+        return {"status": "success", "jobs": self.scheduler.jobs()}
 
-        port = random_free_port()
-        container_name = f"ui_{random_name()}"
-        json_str = json.dumps(data)
+    async def cancel_export(self, job_id):
+        """
+        Withdraw one submission of a queued or running export. The job, and
+        the container a running one started, are cancelled once none of the
+        identical exports merged into it is left. A finished export releases
+        its deployment instead, which is removed when no other export uses it.
+        """
+        job = self.scheduler.get(job_id)
+        if job is not None and job.state not in FINISHED_STATES:
+            if self.scheduler.abandon(job_id):
+                return {"status": "success", "job_id": job_id, "state": "cancelled"}
+            return {"status": "success", "job_id": job_id, "state": job.state, "requests": job.requests}
+        try:
+            released = await asyncio.get_running_loop().run_in_executor(None, self.job_store.release_export, job_id)
+            if released is None:
+                return {"status": "error", "message": f"No queued, running or unreleased export with ID {job_id}"}
+            if released["refs"] == 0:
+                await self._remove_container(released["route"], released["deployment"])
+            return {"status": "success", "job_id": job_id, "state": "released",
+                    "route": released["route"], "refs": released["refs"]}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
 
-        # Build Docker image
-        await self._run_async_command(
-            "docker", "build", "--no-cache", "-t", "simple-ui-app", "./ui_app"
-        )
+    async def wake_route(self, route):
+        """
+        Start a container again for an export parked while idle.
+        """
+        try:
+            url = await self.lifecycle.wake(route)
+            if url is None:
+                return {"status": "error", "message": f"No export is deployed at {route}"}
+            return {"status": "success", "route": route, "url": url}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def get_route_replicas(self, route):
+        """
+        URLs of the containers serving an export's route.
+        """
+        try:
+            urls = await self.replicas.replicas(route)
+            if urls is None:
+                return {"status": "error", "message": f"No export is deployed at {route}"}
+            return {"status": "success", "route": route, "replicas": urls}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def scale_route(self, route, replicas):
+        """
+        Run `replicas` containers for an export's route, e.g. for a demo about
+        to get busy; the proxy balances requests over them. Errors carry the
+        kind "not_found" or "conflict" (not running) when it is one of those.
+        """
+        try:
+            urls = await self.replicas.scale(route, replicas)
+            if urls is None:
+                return {"status": "error", "error": "not_found", "message": f"No export is deployed at {route}"}
+            return {"status": "success", "route": route, "replicas": urls}
+        except ExportNotRunningError as e:
+            return {"status": "error", "error": "conflict", "message": str(e)}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
 
-        # Run Docker container
-        await self._run_async_command(
-            "docker", "run", "-d",
-            "-p", f"{port}:5000",
-            "--name", container_name,
-            "-e", f"CONFIG={json_str}",
-            "simple-ui-app",
-            log_path=f"docker_run_{container_name}.log"
+    def _submit(self, project_data: ProjectExport, priority, tenant):
+        payload = project_data.dict()
+        return self.scheduler.submit(payload, priority=priority, tenant=tenant, key=export_key(export_config(payload)))
+
+    async def _run_export_job(self, job):
+        return await self._execute_export(ProjectExport(**job.payload), job)
+
+    async def _cleanup_export(self, job):
+        await self._release_container(job.container)
+
+    async def _release_container(self, container_name):
+        """
+        Drop an unfinished export's reference to the container it started,
+        removing the container unless an identical export shares it by now.
+        """
+        released = await asyncio.get_running_loop().run_in_executor(
+            None, self.job_store.release_deployment, container_name
         )
+        if released["refs"] == 0:
+            await self._remove_container(container_name, released["deployment"])
 
-        await asyncio.sleep(2)
+    async def _remove_container(self, route, deployment):
+        """
+        Remove an export's route and the containers serving it, once the last
+        reference deleted its deployment (None if it was never registered).
+        A parked or waking deployment has no container of its own left.
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.routes.remove, route)
+        if deployment is None:
+            await self._run_async_command("docker", "rm", "-f", route)
+        elif deployment["state"] not in ("parked", "waking"):
+            # a woken deployment is served by a container other than the one named after its route
+            await self._run_async_command("docker", "rm", "-f", deployment["container"],
+                                          *(r["container"] for r in deployment["replicas"]))
 
-        # Update route_map.json
-        route_name = f"/{container_name}"
-        route_map_path = "route_map.json"
-        if os.path.exists(route_map_path):
+    async def _execute_export(self, project_data: ProjectExport, job=None):
+        """Your original export logic"""
+        report = job.report if job is not None else (lambda stage, **data: None)
+        # Compressed, versioned config for the container; large projects take a while to encode
+        loop = asyncio.get_running_loop()
+        bundle = await loop.run_in_executor(None, encode_config, export_config(project_data.dict()))
+
+        # An identical project already has a container (possibly parked); share it
+        deployment = await loop.run_in_executor(None, self.job_store.acquire_deployment, bundle.version)
+        if deployment is not None:
+            route_name = f"/{deployment['route']}"
             try:
-                async with aiofiles.open(route_map_path, "r") as f:
-                    content = await f.read()
-                    route_map = json.loads(content.strip()) if content.strip() else {}
-            except json.JSONDecodeError:
-                route_map = {}
-        else:
-            route_map = {}
-
-        route_map[container_name] = f"http://localhost:{port}"
-
-        async with aiofiles.open(route_map_path, "w") as f:
-            await f.write(json.dumps(route_map, indent=4))
-
-        # Get public ngrok URL
-        public_url = None
-        async with aiohttp.ClientSession() as session:
-            for _ in range(6):
-                try:
-                    async with session.get("http://localhost:4040/api/tunnels") as resp:
-                        tunnel_info = await resp.json()
-                        public_url = tunnel_info["tunnels"][0]["public_url"]
-                        break
-                except Exception:
-                    await asyncio.sleep(1)
-
-        if not public_url:
-            raise RuntimeError("Ngrok tunnel not found")
+                report("reused", route=route_name, refs=deployment["refs"])
+                public_url = await self.tunnels.resolve()
+            except BaseException:
+                await self._release_container(deployment["route"])
+                raise
+            report("public_url", url=f"{public_url}{route_name}")
+            return {
+                "container": deployment["route"],
+                "ngrok_url": f"{public_url}{route_name}",
+                "status": "success"
+            }
+
+        # Claim a running container and hand it the project; if the image has
+        # to be built first, subscribers to the job see the build output
+        if job is not None:
+            self.image_cache.add_output_listener(job.output)
+        try:
+            instance = await self.warm_pool.claim()
+        finally:
+            if job is not None:
+                self.image_cache.remove_output_listener(job.output)
+        container_name = instance.name
+        port = instance.port
+        report("image_ready", image=instance.image)
+        if job is not None:
+            # From here on the scheduler removes the container if the job fails or is cancelled
+            job.container = container_name
+        report("container_started", container=container_name, port=port)
+        await self.warm_pool.configure(instance, bundle)
+        report("healthy", container=container_name)
+
+        # Route the proxy to the container
+        route_name = f"/{container_name}"
+        await loop.run_in_executor(None, self.routes.add, container_name, f"http://localhost:{port}")
+        await self.lifecycle.register(container_name, container_name, f"http://localhost:{port}", bundle)
+        report("route_registered", route=route_name)
+
+        # Public ngrok URL, cached and refreshed in the background
+        public_url = await self.tunnels.resolve()
+        report("public_url", url=f"{public_url}{route_name}")
 
         return {
             "container": container_name,
@@ -149,57 +441,55 @@ class ProjectService:
             "status": "success"
         }
 
-    async def _run_async_command(self, *cmd, log_path=None):
-        """Existing async command runner"""
-        stdout = asyncio.subprocess.PIPE
-        stderr = asyncio.subprocess.PIPE
-        if log_path:
-            log_file = await aiofiles.open(log_path, "a")
-        else:
-            log_file = None
-
-        process = await asyncio.create_subprocess_exec(*cmd, stdout=stdout, stderr=stderr)
-        stdout_data, stderr_data = await process.communicate()
-
-        if log_file:
-            await log_file.write(stdout_data.decode())
-            await log_file.write(stderr_data.decode())
-            await log_file.close()
-
-        if process.returncode != 0:
-            raise RuntimeError(f"Command {' '.join(cmd)} failed:\n{stderr_data.decode()}")
-    
-    def save_project(self, project_data: dict):
-        try:
-            # Convert Pydantic model to dict
-            project_dict = {
-                'project': project_data['project'],
-                'agents': project_data['agents'],
-                'tools': project_data.get('tools', []),
-                'interactions': project_data.get('interactions', [])
-            }
-            print(project_data)
-            # Convert interactions to connections format for database
-            connections = []
-            for interaction in project_dict.get('interactions', []):
-                if len(interaction.get('participants', [])) >= 2:
-                    connections.append({
-                        'id': interaction['id'],
-                        'source': interaction['participants'][0],
-                        'target': interaction['participants'][1],
-                        'label': interaction.get('name', '')
-                    })
-            
-            # Final structure for database
-            save_data = {
-                'project': project_dict['project'],
-                'agents': project_dict['agents'],
-                'tools': project_dict['tools'],
-                'tasks': [],  # Not used in current frontend
-                'connections': connections
-            }
-            
-            return self.model.save_project(save_data)
+    async def _run_async_command(self, *cmd, log_path=None, on_output=None, timeout=COMMAND_TIMEOUT):
+        """
+        Run a command, streaming its output line by line to the command log
+        (or the rotating log at log_path) and to on_output(stream, line).
+        Raises RuntimeError with the tail of its stderr if it fails or times out.
+        """
+        log = command_log(log_path) if log_path else self.command_log
+        returncode, _, stderr = await stream_command(*cmd, on_output=on_output, log=log, timeout=timeout)
+        if returncode != 0:
+            raise RuntimeError(f"Command {' '.join(cmd)} failed:\n{stderr}")
+
+    def _build_save_data(self, project_data: dict):
+        # Convert Pydantic model to dict
+        project_dict = {
+            'project': project_data['project'],
+            'agents': project_data['agents'],
+            'tools': project_data.get('tools', []),
+            'interactions': project_data.get('interactions', [])
+        }
+        print(project_data)
+        # Convert interactions to connections format for database
+        connections = []
+        for interaction in project_dict.get('interactions', []):
+            if len(interaction.get('participants', [])) >= 2:
+                connections.append({
+                    'id': interaction['id'],
+                    'source': interaction['participants'][0],
+                    'target': interaction['participants'][1],
+                    'label': interaction.get('name', '')
+                })
+        
+        # Final structure for database
+        return {
+            'project': project_dict['project'],
+            'agents': project_dict['agents'],
+            'tools': project_dict['tools'],
+            'tasks': [],  # Not used in current frontend
+            'connections': connections
+        }
+
+    def save_project(self, project_data: dict, project_id=None):
+        try:
+            return self.model.save_project(self._build_save_data(project_data), project_id)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def save_project_async(self, project_data: dict, project_id=None):
+        try:
+            return await self.model.save_project_async(self._build_save_data(project_data), project_id)
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
@@ -214,17 +504,117 @@ class ProjectService:
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+    async def get_all_projects_async(self):
+        try:
+            projects = await self.model.get_all_projects_async()
+            return {"status": "success", "projects": projects}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def get_projects_page(self, after_id=None, limit=50, sort="id", fields=None):
+        """
+        Retrieve one keyset-paginated page of projects.
+        An invalid sort or fields raises ValueError.
+        """
+        build_projects_query(after_id, sort, fields)
+        try:
+            projects, next_after_id = self.model.get_projects_page(after_id, limit, sort, fields)
+            return {"status": "success", "projects": projects, "next_after_id": next_after_id}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def get_projects_page_async(self, after_id=None, limit=50, sort="id", fields=None):
+        build_projects_query(after_id, sort, fields)
+        try:
+            projects, next_after_id = await self.model.get_projects_page_async(after_id, limit, sort, fields)
+            return {"status": "success", "projects": projects, "next_after_id": next_after_id}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def iter_projects(self, after_id=None, limit=None, sort="id", fields=None):
+        """
+        Stream project rows straight from a server-side cursor.
+        """
+        # Validate eagerly so bad parameters fail before the response starts
+        build_projects_query(after_id, sort, fields)
+        return self.model.iter_projects(after_id, limit, sort, fields)
+
     def get_project_by_id(self, project_id):
         """
         Retrieve a specific project by ID including all its data
         """
         try:
-            # Fetch project data from the model
-            project = self.model.get_project_by_id(project_id)
+            # Fetch project data from the cache, falling back to the model
+            project = self.cache.get_or_load(project_id, lambda: self.model.get_project_by_id(project_id))
             if not project:
                 return {"status": "error", "message": f"Project with ID {project_id} not found"}
+            if project.get("status") == "error":
+                return project
             
             return {"status": "success", "project": project}
         except Exception as e:
             return {"status": "error", "message": str(e)}
 
+    async def get_project_by_id_async(self, project_id):
+        try:
+            project = await self.cache.get_or_load_async(
+                project_id, lambda: self.model.get_project_by_id_async(project_id)
+            )
+            if not project:
+                return {"status": "error", "message": f"Project with ID {project_id} not found"}
+            if project.get("status") == "error":
+                return project
+            
+            return {"status": "success", "project": project}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def search_async(self, query="", filters=None, limit=20, offset=0):
+        """
+        Ranked search over the agents and tools of all saved projects.
+        Invalid queries raise ValueError.
+        """
+        if not self.model.supports_search:
+            return self._unsupported("search")
+        try:
+            results, next_offset = await self.model.search_async(query, filters, limit, offset)
+            return {"status": "success", "results": results, "next_offset": next_offset}
+        except ValueError:
+            raise
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def list_versions_async(self, project_id):
+        """
+        List the recorded versions of a project.
+        """
+        if not self.model.supports_versions:
+            return self._unsupported("version history")
+        try:
+            versions = await self.model.list_versions_async(project_id)
+            return {"status": "success", "project_id": project_id, "versions": versions}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def get_version_async(self, project_id, version_number=None):
+        """
+        Fetch one version of a project, the latest when version_number is None.
+        """
+        if not self.model.supports_versions:
+            return self._unsupported("version history")
+        try:
+            return await self.model.get_version_async(project_id, version_number)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def diff_versions_async(self, project_id, from_version, to_version):
+        if not self.model.supports_versions:
+            return self._unsupported("version history")
+        try:
+            return await self.model.diff_versions_async(project_id, from_version, to_version)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    def _unsupported(self, capability):
+        return {"status": "error", "error": "unsupported",
+                "message": f"{type(self.model.strategy).__name__} does not support {capability}"}
@@ -0,0 +1,171 @@
+import asyncio
+import time
+import aiohttp
+from .route_registry import ROUTES_TOKEN_HEADER
+from ..utils.metrics_utils import Histogram
+
+STATUS_CLASSES = ("1xx", "2xx", "3xx", "4xx", "5xx")
+LATENCIES = ("connect", "ttfb", "total", "overhead")
+
+
+class RouteTraffic:
+    """
+    Requests through the proxy to one route (or all of them): counts per
+    status class, bytes each way, requests in flight and latency
+    histograms in ms:
+
+    connect   opening a new connection to the container (not counted when
+              a kept-alive one was reused)
+    ttfb      from sending the request to the container's response headers
+    total     from sending the request to the last byte passed on
+    overhead  time the proxy spent before sending, waiting for a free slot
+              included
+    """
+    __slots__ = ("requests", "in_flight", "statuses", "bytes_in", "bytes_out", "latencies")
+
+    def __init__(self):
+        self.requests = 0
+        self.in_flight = 0
+        self.statuses = [0] * len(STATUS_CLASSES)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.latencies = {name: Histogram() for name in LATENCIES}
+
+    def record(self, status, bytes_in, bytes_out, timings):
+        self.requests += 1
+        self.statuses[min(max(status // 100, 1), 5) - 1] += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        for name, value in timings.items():
+            if value is not None:
+                self.latencies[name].observe(value)
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "statuses": dict(zip(STATUS_CLASSES, self.statuses)),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "latency_ms": {name: histogram.snapshot() for name, histogram in self.latencies.items()},
+        }
+
+
+class ProxyMetrics:
+    """
+    Traffic of the proxy per route and in total, recorded in memory by
+    the proxy's event loop (no locks) and read through its /_metrics
+    endpoint.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.total = RouteTraffic()
+        self.started_at = time.time()
+
+    def _route(self, route):
+        traffic = self.routes.get(route)
+        if traffic is None:
+            traffic = self.routes[route] = RouteTraffic()
+        return traffic
+
+    def opened(self, route):
+        self._route(route).in_flight += 1
+        self.total.in_flight += 1
+
+    def closed(self, route, status, bytes_in, bytes_out, timings):
+        """A request opened() earlier is done; `timings` maps latency names to ms (None if not measured)."""
+        traffic = self._route(route)
+        traffic.in_flight -= 1
+        self.total.in_flight -= 1
+        if status is not None:
+            traffic.record(status, bytes_in, bytes_out, timings)
+            self.total.record(status, bytes_in, bytes_out, timings)
+
+    def retain(self, routes):
+        """Forget the traffic of routes not in `routes`, once none of their requests is in flight."""
+        for route in [route for route, traffic in self.routes.items() if route not in routes and not traffic.in_flight]:
+            del self.routes[route]
+
+    def snapshot(self):
+        return {
+            "uptime": time.time() - self.started_at,
+            "total": self.total.snapshot(),
+            "routes": {route: traffic.snapshot() for route, traffic in self.routes.items()},
+        }
+
+
+class ProxyMetricsScraper:
+    """
+    The proxy's traffic metrics as reported on the backend's /metrics.
+
+    A background task reads them from the proxy's /_metrics endpoint every
+    `interval` seconds, so /metrics never waits on the proxy; stats()
+    returns the last reading. Needs the token the proxy shares with the
+    backend for /_routes.
+    """
+
+    def __init__(self, url, token, interval=15.0, timeout=2.0):
+        self.url = url
+        self.token = token
+        self.interval = interval
+        self.timeout = timeout
+        self._latest = None
+        self._scraped_at = None
+        self._error = None if token else "PROXY_ROUTES_TOKEN is not set"
+        self._task = None
+        self._session = None
+        self.scrapes = 0
+        self.failures = 0
+
+    async def start(self):
+        if self.token and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._scrape_loop())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _http(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=1, keepalive_timeout=self.interval * 2),
+            )
+        return self._session
+
+    async def scrape(self):
+        self.scrapes += 1
+        async with self._http().get(self.url, headers={ROUTES_TOKEN_HEADER: self.token}) as resp:
+            resp.raise_for_status()
+            self._latest = await resp.json()
+        self._scraped_at, self._error = time.time(), None
+        return self._latest
+
+    async def _scrape_loop(self):
+        while True:
+            try:
+                await self.scrape()
+            except Exception as e:
+                # Keep reporting the last reading, marked with its age and the error
+                self.failures += 1
+                self._error = str(e) or type(e).__name__
+            await asyncio.sleep(self.interval)
+
+    def stats(self):
+        return {
+            **(self._latest or {}),
+            "available": self._latest is not None,
+            "age_seconds": time.time() - self._scraped_at if self._scraped_at else None,
+            "error": self._error,
+            "scrapes": self.scrapes,
+            "failures": self.failures,
+        }
@@ -0,0 +1,221 @@
+import asyncio
+import math
+import time
+from ..utils.process_utils import CommandTimeout, run_blocking, run_command
+
+
+class ExportNotRunningError(RuntimeError):
+    """Raised when scaling a route whose deployment is not running, e.g. parked."""
+
+
+class ReplicaScaler:
+    """
+    Runs extra containers (replicas) of exports too busy for one, with the
+    same config; the proxy balances a route's requests over its replicas
+    and stops sending to those failing their health checks.
+
+    scale() sets the number of containers behind a running route. Every
+    `interval` seconds autoscale() reads each route's load from the
+    proxy's metrics (`load` returns them, as ProxyMetricsScraper.stats()
+    does): the time its requests spent in the containers per second, i.e.
+    the average number in flight. A route gets a container per
+    target_in_flight of load, up to max_replicas. It is scaled down only
+    after scale_down_after seconds of needing fewer, and removed replicas
+    get drain_seconds to finish their requests after the proxy stops
+    sending them more.
+
+    A deployment is moved to the "scaling" state while replicas are added
+    or removed, so the container lifecycle manager does not park it
+    meanwhile. Parking removes the replicas; a woken route starts with one
+    container again.
+    """
+
+    def __init__(self, store, routes, warm_pool, load=None, max_replicas=4, target_in_flight=4.0,
+                 interval=30.0, scale_down_after=300.0, drain_seconds=5.0, docker="docker"):
+        self.store = store
+        self.routes = routes
+        self.warm_pool = warm_pool
+        self.load = load
+        self.max_replicas = max(1, max_replicas)
+        self.target_in_flight = target_in_flight
+        self.interval = interval
+        self.scale_down_after = scale_down_after
+        self.drain_seconds = drain_seconds
+        self.docker = docker
+        self._task = None
+        self._draining = set()
+        # Proxy uptime and time spent in containers per route at the last autoscale
+        self._last_reading = None
+        # When each route started needing fewer replicas than it runs
+        self._below = {}
+        self._loads = {}
+        self.scaled_up = 0
+        self.scaled_down = 0
+        self.replica_failures = 0
+
+    async def start(self):
+        if self.load is not None and self.max_replicas > 1 and (self._task is None or self._task.done()):
+            self._task = asyncio.ensure_future(self._autoscale_loop())
+
+    async def shutdown(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # removed replicas still draining are removed before the backend exits
+        if self._draining:
+            await asyncio.gather(*self._draining, return_exceptions=True)
+
+    async def _autoscale_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.autoscale()
+            except Exception as e:
+                print(f"Error autoscaling export replicas: {str(e)}")
+
+    async def replicas(self, route):
+        """URLs of the containers serving `route`, the deployment's own first; None if not deployed."""
+        deployment = await run_blocking(self.store.get_deployment, route)
+        if deployment is None:
+            return None
+        replicas = await run_blocking(self.store.replicas, route)
+        return [deployment["url"]] + [replica["url"] for replica in replicas]
+
+    async def scale(self, route, replicas):
+        """
+        Run `replicas` containers (1 to max_replicas) for a running route.
+        Returns the URLs now serving it; None if the route has no deployment.
+        """
+        replicas = max(1, min(int(replicas), self.max_replicas))
+        if not await run_blocking(self.store.claim_deployment, route, "running", "scaling"):
+            deployment = await run_blocking(self.store.get_deployment, route)
+            if deployment is None:
+                return None
+            raise ExportNotRunningError(f"Export {route} is {deployment['state']}; only running exports can be scaled")
+        started = []
+        routed = False
+        try:
+            deployment = await run_blocking(self.store.get_deployment, route)
+            current = await run_blocking(self.store.replicas, route)
+            if len(current) < replicas - 1:
+                await self._add_replicas(deployment, replicas - 1 - len(current), started)
+                if started:
+                    current += started
+                    await run_blocking(self.routes.add, route, [deployment["url"]] + [r["url"] for r in current])
+                    self.scaled_up += 1
+                routed = True
+            elif len(current) > replicas - 1:
+                # the newest replicas go first
+                kept, removed = current[:replicas - 1], current[replicas - 1:]
+                await run_blocking(self.routes.add, route, [deployment["url"]] + [r["url"] for r in kept])
+                for replica in removed:
+                    await run_blocking(self.store.remove_replica, route, replica["container"])
+                self.scaled_down += 1
+                drain = asyncio.ensure_future(self._drain(removed))
+                self._draining.add(drain)
+                drain.add_done_callback(self._draining.discard)
+                current = kept
+        finally:
+            restored = await run_blocking(self.store.claim_deployment, route, "scaling", "running")
+            if not restored:
+                # the export was removed meanwhile; so are the replicas started for it
+                await run_blocking(self.store.delete_replicas, route)
+                await self._remove(started)
+            elif started and not routed:
+                # cancelled or failed before the replicas it started were routed
+                for replica in started:
+                    await run_blocking(self.store.remove_replica, route, replica["container"])
+                await self._remove(started)
+        if not restored:
+            return None
+        print(f"Scaled export {route} to {1 + len(current)} containers")
+        return [deployment["url"]] + [replica["url"] for replica in current]
+
+    async def _add_replicas(self, deployment, count, started):
+        """
+        Start `count` replicas of a deployment, appending each to `started`
+        as soon as it is configured, so a caller cancelled meanwhile can
+        remove them.
+        """
+        async def start():
+            instance = await self.warm_pool.claim()
+            try:
+                await self.warm_pool.configure(instance, deployment["config"])
+            except BaseException:
+                await run_command(self.docker, "rm", "-f", instance.name)
+                raise
+            replica = {"container": instance.name, "url": instance.url}
+            started.append(replica)
+            try:
+                await run_blocking(self.store.add_replica, deployment["route"], instance.name, instance.url)
+            except Exception:
+                started.remove(replica)
+                await run_command(self.docker, "rm", "-f", instance.name)
+                raise
+
+        results = await asyncio.gather(*(start() for _ in range(count)), return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                self.replica_failures += 1
+                print(f"Error starting a replica of {deployment['route']}: {str(result)}")
+
+    async def _drain(self, replicas):
+        await asyncio.sleep(self.drain_seconds)
+        await self._remove(replicas)
+
+    async def _remove(self, replicas):
+        if not replicas:
+            return
+        containers = [replica["container"] for replica in replicas]
+        try:
+            returncode, _, stderr = await run_command(self.docker, "rm", "-f", *containers)
+        except CommandTimeout as e:
+            returncode, stderr = -1, str(e)
+        if returncode != 0:
+            print(f"Error removing replicas {', '.join(containers)}: {stderr.strip()}")
+
+    async def autoscale(self):
+        """Scale each running route to its load since the last call."""
+        metrics = self.load() if self.load is not None else {}
+        if not metrics.get("available"):
+            return
+        reading = (metrics["uptime"], {route: traffic["latency_ms"]["total"]["sum"]
+                                       for route, traffic in metrics.get("routes", {}).items()})
+        previous, self._last_reading = self._last_reading, reading
+        # nothing new since the last scrape, or the proxy restarted
+        if previous is None or reading[0] <= previous[0]:
+            return
+        elapsed = reading[0] - previous[0]
+        now = time.monotonic()
+        self._loads = {}
+        for deployment in await run_blocking(self.store.deployments, "running"):
+            route = deployment["route"]
+            if route not in reading[1]:
+                continue
+            load = max(0.0, reading[1][route] - previous[1].get(route, 0.0)) / 1000 / elapsed
+            self._loads[route] = round(load, 3)
+            running = 1 + len(await run_blocking(self.store.replicas, route))
+            wanted = max(1, min(self.max_replicas, math.ceil(load / self.target_in_flight)))
+            if wanted < running and now - self._below.setdefault(route, now) < self.scale_down_after:
+                continue
+            self._below.pop(route, None)
+            if wanted == running:
+                continue
+            try:
+                await self.scale(route, wanted)
+            except Exception as e:
+                print(f"Error scaling export {route}: {str(e)}")
+
+    def stats(self):
+        return {
+            "max_replicas": self.max_replicas,
+            "target_in_flight": self.target_in_flight,
+            "scaled_up": self.scaled_up,
+            "scaled_down": self.scaled_down,
+            "replica_failures": self.replica_failures,
+            "load": dict(self._loads),
+        }
@@ -0,0 +1,315 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+import requests
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; writes are then only serialized per process
+    fcntl = None
+
+# Header carrying the secret of the proxy's route endpoint
+ROUTES_TOKEN_HEADER = "X-Routes-Token"
+
+
+class RouteRegistry:
+    """
+    Routes from exported container names to their base URLs, shared by the
+    backend workers and the proxy.
+
+    State is a snapshot at `path` (a JSON object, as route_map.json always
+    was) plus an append-only log of later changes at `path`.log. A writer
+    takes an exclusive lock, catches up with changes other processes
+    appended, then appends and fsyncs its own. Every `compact_every`
+    changes the log is folded into the snapshot; both files are replaced
+    by atomic renames, and add/remove replay idempotently, so a crash at
+    any point leaves a readable registry.
+
+    Lookups are dict hits. refresh() reads only what was appended since
+    the last read. A parked route (container stopped while idle) looks up
+    as None but is_parked(). A route served by several replicas maps to
+    the list of their URLs; lookup() returns the first, replicas() all of
+    them. Listeners are called with each change made through this
+    instance, e.g. to push it to the proxy.
+    """
+
+    def __init__(self, path="route_map.json", compact_every=1000):
+        self.path = path
+        self.log_path = path + ".log"
+        self.lock_path = path + ".lock"
+        self.compact_every = max(1, compact_every)
+        self._routes = {}
+        self._lock = threading.RLock()
+        self._loaded = False
+        # (st_dev, st_ino) of the snapshot loaded and of the log file read so far, and how far
+        self._snapshot_id = None
+        self._log_id = None
+        self._offset = 0
+        self._log_entries = 0
+        self._listeners = []
+        self.compactions = 0
+
+    def add_listener(self, listener):
+        """Call listener(change) after every change written through this instance."""
+        self._listeners.append(listener)
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _file_id(path):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return stat.st_dev, stat.st_ino
+
+    def _reload(self):
+        try:
+            with open(self.path) as f:
+                stat = os.fstat(f.fileno())
+                self._snapshot_id = (stat.st_dev, stat.st_ino)
+                content = f.read().strip()
+            self._routes = json.loads(content) if content else {}
+        except FileNotFoundError:
+            self._snapshot_id = None
+            self._routes = {}
+        except json.JSONDecodeError as e:
+            print(f"Error reading route snapshot {self.path}: {str(e)}")
+            self._routes = {}
+        self._log_id = None
+        self._offset = 0
+        self._log_entries = 0
+        self._loaded = True
+        self._catch_up()
+
+    def _catch_up(self):
+        if not self._loaded or self._file_id(self.path) != self._snapshot_id:
+            # first read, or another process compacted the log into a new snapshot
+            return self._reload()
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            if self._log_id is not None:
+                # compacted away by another process
+                return self._reload()
+            return
+        if self._log_id is not None and (stat.st_dev, stat.st_ino) != self._log_id:
+            return self._reload()
+        self._log_id = (stat.st_dev, stat.st_ino)
+        if stat.st_size <= self._offset:
+            return
+        with open(self.log_path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # only whole lines; a trailing partial line is still being written (or was torn by a crash)
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                self._apply(json.loads(line))
+            except (ValueError, KeyError):
+                print(f"Skipping unreadable route change in {self.log_path}")
+            self._log_entries += 1
+        self._offset += len(complete)
+
+    def _apply(self, change):
+        if change["op"] == "add":
+            self._routes[change["name"]] = change["url"]
+        elif change["op"] == "park":
+            self._routes[change["name"]] = None
+        elif change["op"] == "remove":
+            self._routes.pop(change["name"], None)
+
+    def _write(self, change):
+        with self._lock, self._file_lock(exclusive=True):
+            self._catch_up()
+            with open(self.log_path, "ab") as f:
+                if f.tell() > self._offset:
+                    # a torn line left by a crashed writer; end it so it gets skipped
+                    f.write(b"\n")
+                f.write(json.dumps(change).encode() + b"\n")
+                f.flush()
+                os.fsync(f.fileno())
+                self._offset = f.tell()
+                stat = os.fstat(f.fileno())
+            self._log_id = (stat.st_dev, stat.st_ino)
+            self._apply(change)
+            self._log_entries += 1
+            if self._log_entries >= self.compact_every:
+                self._compact()
+        for listener in self._listeners:
+            try:
+                listener(change)
+            except Exception as e:
+                print(f"Error notifying route change {change}: {str(e)}")
+        return change
+
+    def _replace(self, path, data):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _compact(self):
+        self._replace(self.path, json.dumps(self._routes, indent=4).encode())
+        self._snapshot_id = self._file_id(self.path)
+        self._replace(self.log_path, b"")
+        stat = os.stat(self.log_path)
+        self._log_id = (stat.st_dev, stat.st_ino)
+        self._offset = 0
+        self._log_entries = 0
+        self.compactions += 1
+
+    def add(self, name, url):
+        """Route `name` to `url`, or to a list of replica URLs."""
+        if isinstance(url, (list, tuple)):
+            url = list(url) if len(url) > 1 else url[0]
+        return self._write({"op": "add", "name": name, "url": url})
+
+    def park(self, name):
+        """Keep a route whose container was stopped, so a request to it can wake it."""
+        return self._write({"op": "park", "name": name})
+
+    def remove(self, name):
+        return self._write({"op": "remove", "name": name})
+
+    def refresh(self):
+        """Pick up changes other processes wrote since the last read."""
+        with self._lock, self._file_lock(exclusive=False):
+            self._catch_up()
+
+    def replicas(self, name, refresh_on_miss=False):
+        """URLs serving `name`, as a list; None if unknown or parked."""
+        with self._lock:
+            if not self._loaded:
+                self.refresh()
+            url = self._routes.get(name)
+        if url is None and refresh_on_miss:
+            self.refresh()
+            with self._lock:
+                url = self._routes.get(name)
+        if url is None:
+            return None
+        return url if isinstance(url, list) else [url]
+
+    def lookup(self, name, refresh_on_miss=False):
+        urls = self.replicas(name, refresh_on_miss)
+        return urls[0] if urls else None
+
+    def is_parked(self, name):
+        with self._lock:
+            return name in self._routes and self._routes[name] is None
+
+    def routes(self):
+        with self._lock:
+            if not self._loaded:
+                self.refresh()
+            return dict(self._routes)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "routes": len(self._routes),
+                "parked": sum(1 for url in self._routes.values() if url is None),
+                "replicated": sum(1 for url in self._routes.values() if isinstance(url, list)),
+                "log_entries": self._log_entries,
+                "compactions": self.compactions,
+            }
+
+
+class ProxyRouteNotifier:
+    """
+    RouteRegistry listener pushing each change to the proxy's /_routes
+    endpoint, where it makes the proxy read the new log entries right away
+    instead of on every request. The log, not the order pushes arrive in,
+    decides the outcome of concurrent changes. A failed push is only
+    logged: the proxy also catches up when a lookup misses.
+    """
+
+    def __init__(self, url, token, timeout=1.0):
+        self.url = url
+        self.token = token
+        self.timeout = timeout
+        self._session = requests.Session()
+        self.pushed = 0
+        self.failures = 0
+
+    def __call__(self, change):
+        try:
+            resp = self._session.post(self.url, json=change, headers={ROUTES_TOKEN_HEADER: self.token},
+                                      timeout=self.timeout)
+            resp.raise_for_status()
+            self.pushed += 1
+        except requests.RequestException as e:
+            self.failures += 1
+            print(f"Error pushing route change to proxy: {str(e)}")
+
+
+class RouteAccessTracker:
+    """
+    Last request time of each route, recorded by the proxy in memory and
+    flushed every `interval` seconds to `path` (route_map.json.access by
+    default) for the backend's container lifecycle manager to read.
+    """
+
+    def __init__(self, path, interval=5.0):
+        self.path = path
+        self.interval = interval
+        self._access = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def touch(self, name):
+        with self._lock:
+            self._access[name] = time.time()
+        if self._thread is None:
+            self.start()
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing route access times: {str(e)}")
+
+    def flush(self):
+        with self._lock:
+            if not self._access:
+                return
+            recent, self._access = self._access, {}
+        access = self.read(self.path)
+        for name, at in recent.items():
+            access[name] = max(at, access.get(name, 0))
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(access, f)
+        os.replace(tmp, self.path)
+
+    @staticmethod
+    def read(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
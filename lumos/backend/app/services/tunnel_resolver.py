@@ -0,0 +1,123 @@
+import asyncio
+import time
+import aiohttp
+from ..utils.network_utils import backoff_delays
+
+
+class TunnelResolver:
+    """
+    Public URL of the ngrok tunnel in front of the proxy.
+
+    The URL is looked up from the ngrok agent API once and cached; a
+    background task re-reads it every refresh_interval seconds, so a
+    restarted tunnel is picked up without exports waiting on the lookup.
+    When a re-read fails the tunnel is gone with the agent, so the cached
+    URL is dropped and exports wait for the new one instead. Concurrent
+    lookups share one request, and every request goes through one pooled
+    HTTP session.
+    """
+
+    def __init__(self, api_url="http://localhost:4040/api/tunnels", refresh_interval=60.0, timeout=6.0):
+        self.api_url = api_url
+        self.refresh_interval = refresh_interval
+        self.timeout = timeout
+        self._public_url = None
+        self._resolved_at = None
+        self._lookup = None
+        self._refresh_task = None
+        self._session = None
+        self.hits = 0
+        self.lookups = 0
+        self.failures = 0
+
+    async def start(self):
+        """Start refreshing the cached URL in the background."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._refresh_loop())
+
+    async def shutdown(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _http(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=2),
+                connector=aiohttp.TCPConnector(limit=4, keepalive_timeout=60),
+            )
+        return self._session
+
+    async def _fetch(self):
+        self.lookups += 1
+        async with self._http().get(self.api_url) as resp:
+            resp.raise_for_status()
+            tunnels = (await resp.json()).get("tunnels", [])
+        urls = [tunnel["public_url"] for tunnel in tunnels if tunnel.get("public_url")]
+        if not urls:
+            raise RuntimeError("Ngrok tunnel not found")
+        # Prefer the https tunnel when ngrok exposes both schemes
+        url = next((url for url in urls if url.startswith("https://")), urls[0])
+        self._public_url, self._resolved_at = url, time.time()
+        return url
+
+    async def _discover(self):
+        deadline = time.monotonic() + self.timeout
+        for delay in backoff_delays(initial=0.1, maximum=1.0):
+            try:
+                return await self._fetch()
+            except Exception as e:
+                self.failures += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise RuntimeError(f"Ngrok tunnel not found: {str(e)}")
+                await asyncio.sleep(min(delay, remaining))
+
+    async def resolve(self):
+        """Return the public URL, discovering it (with retries up to `timeout`) if not cached."""
+        if self._public_url is not None:
+            self.hits += 1
+            return self._public_url
+        if self._lookup is None:
+            self._lookup = asyncio.ensure_future(self._discover())
+            self._lookup.add_done_callback(self._lookup_done)
+        # shield: one export being cancelled must not cancel the shared lookup
+        return await asyncio.shield(self._lookup)
+
+    def _lookup_done(self, task):
+        self._lookup = None
+        if not task.cancelled():
+            task.exception()
+
+    def invalidate(self):
+        """Forget the cached URL, e.g. after the tunnel was found to be gone."""
+        self._public_url = None
+        self._resolved_at = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self._fetch()
+            except Exception as e:
+                # The agent is local: if it is down or reports no tunnel, the
+                # public URL is dead too, e.g. while ngrok restarts
+                self.failures += 1
+                self.invalidate()
+                print(f"Error refreshing ngrok tunnel URL: {str(e)}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def stats(self):
+        return {
+            "public_url": self._public_url,
+            "age_seconds": time.time() - self._resolved_at if self._resolved_at else None,
+            "hits": self.hits,
+            "lookups": self.lookups,
+            "failures": self.failures,
+        }
@@ -0,0 +1,208 @@
+import asyncio
+import secrets
+import time
+from collections import deque
+import aiohttp
+from ..utils.config_bundle import CONTENT_TYPE, VERSION_HEADER, ConfigBundle, encode_config
+from ..utils.network_utils import random_free_port, random_name, wait_until_healthy
+from ..utils.process_utils import CommandTimeout, run_command
+
+# Header carrying the per-container secret of the ui_app admin endpoints
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+# Pushing a config bundle of a large project (tens of MB) may take a while:
+# no overall limit, only on connecting and on waiting for the container
+CONFIG_PUSH_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=5, sock_read=60)
+
+
+class WarmInstance:
+    """A running ui_app container that has not been given a project yet."""
+
+    def __init__(self, name, port, image, token):
+        self.name = name
+        self.port = port
+        self.image = image
+        self.token = token
+        self.started_at = time.time()
+
+    @property
+    def url(self):
+        return f"http://localhost:{self.port}"
+
+
+class WarmPool:
+    """
+    Keeps min_size idle ui_app containers running so an export only has to
+    claim one and push its project config through the container's admin
+    endpoint, instead of starting a container and waiting for it.
+
+    A background task refills the pool whenever a claim takes an instance,
+    never holding more than max_size idle or starting containers, and
+    retires idle containers whose image is no longer current. When the pool
+    is empty, claim() starts a container on demand.
+    """
+
+    def __init__(self, image_cache, min_size=2, max_size=5, ready_timeout=30.0, docker="docker"):
+        self.image_cache = image_cache
+        self.min_size = max(0, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.ready_timeout = ready_timeout
+        self.docker = docker
+        self._idle = deque()
+        self._starting = 0
+        self._refill_needed = asyncio.Event()
+        self._refill_task = None
+        self._session = None
+        self.claims = 0
+        self.cold_starts = 0
+        self.start_failures = 0
+        self._claim_latencies = deque(maxlen=100)
+        # Seconds from `docker run` returning to the container answering its health check
+        self._ready_times = deque(maxlen=100)
+
+    async def start(self):
+        """Start the background refill task."""
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.ensure_future(self._refill_loop())
+        self._refill_needed.set()
+
+    async def shutdown(self):
+        """Stop refilling and remove the idle containers."""
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+        while self._idle:
+            await self._remove(self._idle.popleft())
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _http(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5))
+        return self._session
+
+    async def _refill_loop(self):
+        while True:
+            await self._refill_needed.wait()
+            self._refill_needed.clear()
+            try:
+                await self.refill()
+            except Exception as e:
+                print(f"Error refilling warm pool: {str(e)}")
+                await asyncio.sleep(5)
+                self._refill_needed.set()
+
+    async def refill(self):
+        """Retire idle containers of outdated images and start new ones up to min_size."""
+        image = await self.image_cache.ensure_image()
+        for instance in [instance for instance in self._idle if instance.image != image]:
+            self._idle.remove(instance)
+            await self._remove(instance)
+
+        missing = min(self.min_size - len(self._idle) - self._starting,
+                      self.max_size - len(self._idle) - self._starting)
+        if missing <= 0:
+            return
+        results = await asyncio.gather(*(self._start_instance(image) for _ in range(missing)),
+                                       return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"Error starting warm ui_app container: {str(result)}")
+            else:
+                self._idle.append(result)
+
+    async def _start_instance(self, image):
+        self._starting += 1
+        try:
+            instance = WarmInstance(f"ui_{random_name()}", random_free_port(), image, secrets.token_hex(16))
+            try:
+                returncode, _, stderr = await run_command(
+                    self.docker, "run", "-d",
+                    "-p", f"{instance.port}:5000",
+                    "--name", instance.name,
+                    "--label", "lumos.pool=warm",
+                    "-e", f"ADMIN_TOKEN={instance.token}",
+                    image
+                )
+            except CommandTimeout:
+                # the container may have been created before docker stopped answering
+                self.start_failures += 1
+                await self._remove(instance)
+                raise
+            if returncode != 0:
+                self.start_failures += 1
+                raise RuntimeError(f"docker run of {image} failed:\n{stderr}")
+            try:
+                await self._wait_ready(instance)
+            except (Exception, asyncio.CancelledError):
+                self.start_failures += 1
+                await self._remove(instance)
+                raise
+            return instance
+        finally:
+            self._starting -= 1
+
+    async def _wait_ready(self, instance):
+        """Probe the container's health endpoint until it answers."""
+        try:
+            seconds = await wait_until_healthy(self._http(), f"{instance.url}/_admin/health", self.ready_timeout)
+        except RuntimeError:
+            raise RuntimeError(f"Container {instance.name} not ready after {self.ready_timeout}s")
+        self._ready_times.append(seconds)
+
+    async def _remove(self, instance):
+        try:
+            returncode, _, stderr = await run_command(self.docker, "rm", "-f", instance.name)
+        except CommandTimeout as e:
+            returncode, stderr = -1, str(e)
+        if returncode != 0:
+            print(f"Error removing container {instance.name}: {stderr.strip()}")
+
+    async def claim(self):
+        """Take an idle instance, starting one if the pool is empty."""
+        started = time.monotonic()
+        self.claims += 1
+        if self._idle:
+            instance = self._idle.popleft()
+        else:
+            self.cold_starts += 1
+            instance = await self._start_instance(await self.image_cache.ensure_image())
+        if self.min_size:
+            self._refill_needed.set()
+            if self._refill_task is None:
+                await self.start()
+        self._claim_latencies.append(time.monotonic() - started)
+        return instance
+
+    async def configure(self, instance, config):
+        """
+        Push a project config to a claimed instance, as a ConfigBundle or a
+        config dict to bundle. The container stores the compressed bundle and
+        parses it when it is first used.
+        """
+        if not isinstance(config, ConfigBundle):
+            config = await asyncio.get_running_loop().run_in_executor(None, encode_config, config)
+        headers = {ADMIN_TOKEN_HEADER: instance.token, VERSION_HEADER: config.version, "Content-Type": CONTENT_TYPE}
+        async with self._http().post(f"{instance.url}/_admin/config", data=config.data, headers=headers,
+                                     timeout=CONFIG_PUSH_TIMEOUT) as resp:
+            if resp.status != 200:
+                raise RuntimeError(f"Container {instance.name} rejected its config: HTTP {resp.status}")
+
+    def stats(self):
+        latencies = sorted(self._claim_latencies)
+        ready_times = sorted(self._ready_times)
+        return {
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "idle": len(self._idle),
+            "starting": self._starting,
+            "claims": self.claims,
+            "cold_starts": self.cold_starts,
+            "start_failures": self.start_failures,
+            "p95_claim_latency": latencies[int(len(latencies) * 0.95)] if latencies else 0,
+            "p95_ready_seconds": ready_times[int(len(ready_times) * 0.95)] if ready_times else 0,
+        }
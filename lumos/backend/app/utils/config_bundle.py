@@ -0,0 +1,51 @@
+import gzip
+import hashlib
+import json
+from collections import namedtuple
+
+# Bundle layout: b"LUMOSCFG <format> <version>\n" followed by the gzipped
+# canonical JSON of the config. ui_app/config_store.py reads it.
+MAGIC = b"LUMOSCFG"
+FORMAT_VERSION = 1
+CONTENT_TYPE = "application/vnd.lumos.config"
+# Header carrying a bundle's version when it is pushed to a container
+VERSION_HEADER = "X-Config-Version"
+
+ConfigBundle = namedtuple("ConfigBundle", ["version", "data"])
+
+
+def canonical_json(config):
+    """The config as compact JSON with sorted keys; identical configs give identical bytes."""
+    return json.dumps(config, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def config_version(canonical):
+    return hashlib.sha256(canonical).hexdigest()
+
+
+def encode_config(config, level=6):
+    """
+    Bundle a config for a ui_app container: compressed, and versioned by
+    the hash of its canonical JSON. CPU-bound for large projects; run it
+    in an executor.
+    """
+    canonical = canonical_json(config)
+    version = config_version(canonical)
+    header = MAGIC + f" {FORMAT_VERSION} {version}\n".encode()
+    return ConfigBundle(version, header + gzip.compress(canonical, compresslevel=level, mtime=0))
+
+
+def read_header(data):
+    """(format, version, offset of the compressed config) of a bundle; ValueError if it is not one."""
+    end = bytes(data[:128]).find(b"\n")
+    parts = bytes(data[:end]).split(b" ") if end > 0 else []
+    if len(parts) != 3 or parts[0] != MAGIC:
+        raise ValueError("Not a config bundle")
+    if int(parts[1]) != FORMAT_VERSION:
+        raise ValueError(f"Unsupported config bundle format {parts[1].decode()}")
+    return int(parts[1]), parts[2].decode(), end + 1
+
+
+def decode_config(data):
+    _, _, offset = read_header(data)
+    return json.loads(gzip.decompress(bytes(data[offset:])))
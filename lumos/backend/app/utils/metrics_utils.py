@@ -1,5 +1,6 @@
 import psutil
 import time
+from bisect import bisect_left
 from collections import deque
 from threading import Lock
 
@@ -7,6 +8,13 @@ latencies = deque(maxlen=100)
 latencies_lock = Lock()
 start_time = time.time()
 
+# extra sections merged into get_metrics(), e.g. connection pool stats
+metrics_providers = {}
+
+def register_metrics_provider(name: str, provider):
+    """Register a zero-argument callable whose result is reported under `name`."""
+    metrics_providers[name] = provider
+
 def record_latency(latency: float):
     with latencies_lock:
         latencies.append(latency)
@@ -18,10 +26,60 @@ def get_metrics():
     cpu_percent = psutil.cpu_percent(interval=0.1)
     memory_percent = psutil.virtual_memory().percent
     uptime = time.time() - start_time
-    return {
+    metrics = {
         "average_latency": avg_latency,
         "cpu_percent": cpu_percent,
         "memory_percent": memory_percent,
         "uptime": uptime,
         "latencies": recent_latencies
-    }
\ No newline at end of file
+    }
+    for name, provider in list(metrics_providers.items()):
+        try:
+            metrics[name] = provider()
+        except Exception as e:
+            metrics[name] = {"error": str(e)}
+    return metrics
+
+# Upper bounds (ms) of the latency histogram buckets; one more bucket holds the rest
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+
+class Histogram:
+    """
+    Counts of observations per bucket. Recording is one bisect and three
+    additions, cheap enough for every request; quantiles are worked out
+    from the counts when read.
+    """
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile; the last bound if beyond it, None if empty."""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.bounds[-1]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": round(self.total, 3),
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "bounds": list(self.bounds),
+            "buckets": list(self.counts),
+        }
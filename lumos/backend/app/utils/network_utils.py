@@ -1,6 +1,9 @@
+import asyncio
 import random
 import string
 import socket
+import time
+import aiohttp
 
 
 def random_free_port():
@@ -12,4 +15,35 @@ def random_port():
     return random.randint(2000, 9000)
 
 def random_name():
-    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=6))
\ No newline at end of file
+    return ''.join(random.choices(string.ascii_lowercase + string.digits, k=6))
+
+def backoff_delays(initial=0.02, maximum=0.5, factor=2.0, jitter=0.5):
+    """
+    Endless exponential backoff delays, each randomized by +/- jitter so
+    callers started together don't probe in lockstep.
+    """
+    delay = initial
+    while True:
+        yield delay * random.uniform(1 - jitter, 1 + jitter)
+        delay = min(delay * factor, maximum)
+
+async def wait_until_healthy(session, url, timeout=30.0, probe_timeout=1.0, delays=None):
+    """
+    GET `url` with jittered exponential backoff until it answers 200, and
+    return the seconds that took. Raises RuntimeError at the deadline.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    for delay in delays or backoff_delays():
+        remaining = deadline - time.monotonic()
+        try:
+            probe = aiohttp.ClientTimeout(total=max(0.01, min(probe_timeout, remaining)))
+            async with session.get(url, timeout=probe) as resp:
+                if resp.status == 200:
+                    return time.monotonic() - started
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            pass
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise RuntimeError(f"{url} not healthy after {timeout}s")
+        await asyncio.sleep(min(delay, remaining))
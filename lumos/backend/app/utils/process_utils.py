@@ -0,0 +1,139 @@
+import asyncio
+import logging
+import os
+import signal
+from collections import deque
+from logging.handlers import RotatingFileHandler
+
+# Bytes read from a pipe at a time; lines are split out of these chunks
+READ_CHUNK_SIZE = 1 << 16
+# Seconds a timed out command gets to exit after SIGTERM before it is killed
+KILL_GRACE_SECONDS = 5.0
+# Seconds a docker command may run by default
+COMMAND_TIMEOUT = 60
+
+
+class CommandTimeout(RuntimeError):
+    pass
+
+
+async def run_command(*cmd, timeout=COMMAND_TIMEOUT):
+    """
+    Run a command without blocking the event loop; returns (returncode,
+    stdout, stderr). As with stream_command(), its process group is
+    terminated when it outlives `timeout` seconds (raising CommandTimeout)
+    or the caller is cancelled.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, start_new_session=True
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        await _terminate(process)
+        if isinstance(e, asyncio.TimeoutError):
+            raise CommandTimeout(f"Command {' '.join(cmd)} timed out after {timeout}s")
+        raise
+    return process.returncode, stdout.decode(), stderr.decode()
+
+
+async def run_blocking(func, *args):
+    """Call a blocking function, e.g. a SQLite store method, in the default executor."""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def command_log(path, max_bytes=10 * 1024 * 1024, backup_count=5):
+    """
+    Logger writing command output to `path`, rotated at max_bytes with
+    backup_count old files kept. The file is opened on the first line, once
+    per path, and shared by every command logging to it.
+    """
+    logger = logging.getLogger(f"lumos.commands.{os.path.abspath(path)}")
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8",
+                                      delay=True)
+        handler.setFormatter(logging.Formatter("%(asctime)s %(command)s [%(stream)s] %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def _kill_group(process, sig):
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _terminate(process):
+    """SIGTERM the process group, then SIGKILL it if still running after KILL_GRACE_SECONDS."""
+    _kill_group(process, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(asyncio.shield(process.wait()), KILL_GRACE_SECONDS)
+    except asyncio.TimeoutError:
+        _kill_group(process, signal.SIGKILL)
+        await process.wait()
+
+
+async def _read_lines(reader, stream, on_line):
+    """Pass each line of a pipe to on_line as it arrives, however long it is."""
+    pending = b""
+    while True:
+        chunk = await reader.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            on_line(stream, line.decode(errors="replace").rstrip("\r"))
+    if pending:
+        on_line(stream, pending.decode(errors="replace").rstrip("\r"))
+
+
+async def stream_command(*cmd, on_output=None, log=None, timeout=None, tail_lines=100):
+    """
+    Run a command, handling its stdout and stderr line by line as they are
+    written instead of buffering them until it exits.
+
+    Each line goes to `log` (e.g. a command_log()) and to on_output(stream,
+    line), stream being "stdout" or "stderr". Only the last `tail_lines`
+    lines of each are kept, for error messages; returns (returncode,
+    stdout_tail, stderr_tail).
+
+    The command runs in its own process group. When it outlives `timeout`
+    seconds, or the caller is cancelled, the whole group (e.g. a build's
+    children) gets SIGTERM, then SIGKILL after KILL_GRACE_SECONDS; a
+    timeout raises CommandTimeout.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, start_new_session=True
+    )
+    tails = {"stdout": deque(maxlen=tail_lines), "stderr": deque(maxlen=tail_lines)}
+    command = os.path.basename(cmd[0]) + (f" {cmd[1]}" if len(cmd) > 1 else "")
+
+    def on_line(stream, line):
+        tails[stream].append(line)
+        if log is not None:
+            log.info(line, extra={"command": command, "stream": stream})
+        if on_output is not None:
+            try:
+                on_output(stream, line)
+            except Exception as e:
+                print(f"Error passing on output of {command}: {str(e)}")
+
+    async def communicate():
+        await asyncio.gather(_read_lines(process.stdout, "stdout", on_line),
+                             _read_lines(process.stderr, "stderr", on_line))
+        return await process.wait()
+
+    try:
+        returncode = await asyncio.wait_for(communicate(), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        await _terminate(process)
+        if isinstance(e, asyncio.TimeoutError):
+            raise CommandTimeout(f"Command {' '.join(cmd)} timed out after {timeout}s:\n"
+                                 + "\n".join(tails["stderr"]))
+        raise
+    return returncode, "\n".join(tails["stdout"]), "\n".join(tails["stderr"])
@@ -0,0 +1,126 @@
+"""
+Rows/second of SQLProjectStorage.create_project and save_project, comparing
+one-row-per-statement writes (batch_size=1, the previous behaviour) with
+batched multi-row INSERTs.
+
+By default the database is simulated: every statement costs one network
+round trip (--rtt-ms) plus a small per-row cost, which is what dominates
+against a real server. Pass --mysql to run against the configured MySQL
+database instead (rows are left in the database).
+
+    python -m benchmarks.bench_bulk_insert --sizes 10 1000 10000
+"""
+import argparse
+import copy
+import time
+
+from app.models.sql_storage_strategy import SQLProjectStorage
+from .synthetic import make_project, row_count
+
+
+class SimulatedCursor:
+    def __init__(self, db):
+        self.db = db
+        self.lastrowid = None
+        self._result = []
+
+    def execute(self, query, params=()):
+        self.db.round_trips += 1
+        rows = 0
+        words = query.split()
+        if words[0].upper() == "INSERT":
+            table = words[2]
+            rows = max(query.count("("), 2) - 1  # column list + one group per row
+            ids = self.db.next_ids(table, rows)
+            self.lastrowid = ids[0]
+            self._result = []
+        elif words[0].upper() == "SELECT":
+            table = words[words.index("FROM") + 1]
+            self._result = [(row_id,) for row_id in self.db.ids[table]]
+        time.sleep(self.db.rtt + rows * self.db.row_cost)
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+class SimulatedConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, dictionary=False):
+        return SimulatedCursor(self.db)
+
+    def start_transaction(self):
+        pass
+
+    def commit(self):
+        self.db.round_trips += 1
+
+    def rollback(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class SimulatedDatabase:
+    def __init__(self, rtt, row_cost):
+        self.rtt = rtt
+        self.row_cost = row_cost
+        self.round_trips = 0
+        self.ids = {}
+
+    def next_ids(self, table, count):
+        ids = self.ids.setdefault(table, [])
+        first = len(ids) + 1
+        ids.extend(range(first, first + count))
+        return list(range(first, first + count))
+
+    def get_connection(self):
+        self.ids = {}
+        return SimulatedConnection(self)
+
+
+def run(storage, method, project, rows):
+    start = time.perf_counter()
+    result = getattr(storage, method)(copy.deepcopy(project))
+    elapsed = time.perf_counter() - start
+    if result.get("status") != "success":
+        raise RuntimeError(result.get("message"))
+    return rows / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--rtt-ms", type=float, default=0.2, help="simulated round trip time")
+    parser.add_argument("--row-us", type=float, default=2.0, help="simulated per-row server cost")
+    parser.add_argument("--mysql", action="store_true", help="use the configured MySQL database")
+    args = parser.parse_args()
+
+    if args.mysql:
+        from app.models.database import Database
+        db = Database.instance()
+    else:
+        db = SimulatedDatabase(args.rtt_ms / 1000, args.row_us / 1_000_000)
+
+    print(f"{'method':<15}{'agents':>8}{'rows':>9}{'before rows/s':>16}{'after rows/s':>15}{'speedup':>9}")
+    for size in args.sizes:
+        project = make_project(size)
+        for method in ("create_project", "save_project"):
+            rows = row_count(project) if method == "create_project" else (
+                1 + len(project["agents"]) + len(project["tools"]) + len(project["connections"]))
+            before, _ = run(SQLProjectStorage(db, batch_size=1), method, project, rows)
+            after, _ = run(SQLProjectStorage(db, batch_size=args.batch_size), method, project, rows)
+            print(f"{method:<15}{size:>8}{rows:>9}{before:>16,.0f}{after:>15,.0f}{after / before:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Requests/second and latency percentiles through the container proxy,
+comparing the Flask proxy it replaced (benchmarks/legacy_proxy.py, a new
+upstream connection per request) with the asyncio proxy (proxy.py,
+pooled keep-alive connections).
+
+Each proxy runs in its own process in front of a stub container that
+answers after --upstream-ms, like a ui_app waiting on a model; the load
+is --requests requests from --concurrency clients at a time.
+
+    python -m benchmarks.bench_proxy --concurrency 1 16 64 --requests 2000
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+from aiohttp import web
+
+from app.utils.network_utils import random_free_port
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+PROXIES = {
+    "flask": [sys.executable, "-m", "benchmarks.legacy_proxy"],
+    # proxy.py without ngrok
+    "asyncio": [sys.executable, "-c", "import os; from aiohttp import web; from proxy import create_app; "
+                "web.run_app(create_app(), port=int(os.environ['PROXY_PORT']), print=None, access_log=None)"],
+}
+
+
+def serve_upstream(port, delay):
+    async def answer(request):
+        await request.read()
+        await asyncio.sleep(delay)
+        return web.json_response({"path": request.path})
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", answer)
+    web.run_app(app, host="127.0.0.1", port=port, print=None, access_log=None)
+
+
+def start(args, port, env):
+    process = subprocess.Popen(args, cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{args[-1]} exited with {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{args[-1]} did not listen on {port}")
+
+
+async def load(url, requests, concurrency):
+    latencies = []
+    remaining = iter(range(requests))
+    errors = 0
+
+    async def client(session):
+        nonlocal errors
+        for i in remaining:
+            started = time.perf_counter()
+            async with session.post(f"{url}/chat", json={"message": i}) as resp:
+                await resp.read()
+                errors += resp.status != 200
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(client(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--upstream-ms", type=float, default=5.0, help="time the stub container takes to answer")
+    parser.add_argument("--serve-upstream", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_upstream:
+        serve_upstream(args.serve_upstream, args.upstream_ms / 1000)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        upstream_port = random_free_port()
+        route_map = os.path.join(tmp, "route_map.json")
+        with open(route_map, "w") as f:
+            json.dump({"ui_bench": f"http://127.0.0.1:{upstream_port}"}, f)
+        upstream = start([sys.executable, "-m", "benchmarks.bench_proxy", "--serve-upstream", str(upstream_port),
+                          "--upstream-ms", str(args.upstream_ms)], upstream_port, os.environ.copy())
+
+        print(f"{'concurrency':>11}{'proxy':>9}{'rps':>10}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        try:
+            for concurrency in args.concurrency:
+                for name, command in PROXIES.items():
+                    port = random_free_port()
+                    env = dict(os.environ, ROUTE_MAP_PATH=route_map, PROXY_PORT=str(port))
+                    proxy = start(command, port, env)
+                    try:
+                        result = asyncio.run(load(f"http://127.0.0.1:{port}/ui_bench", args.requests, concurrency))
+                    finally:
+                        proxy.terminate()
+                        proxy.wait()
+                    print(f"{concurrency:>11}{name:>9}{result['rps']:>10,.0f}{result['p50_ms']:>9.1f}"
+                          f"{result['p99_ms']:>9.1f}{result['errors']:>8}")
+        finally:
+            upstream.terminate()
+            upstream.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Runs the same synthetic workload against the storage strategies and
+reports latency per operation:
+
+- create_project for --projects projects of --agents agents
+- get_project_by_id for --reads random projects
+- keyset pagination through the whole project listing
+
+SQLite always runs (in a temporary file). MySQL runs with --mysql, using
+the DB_* settings from the environment; its rows are left in place.
+
+    python -m benchmarks.bench_storage_strategies --projects 50 --agents 100
+"""
+import argparse
+import copy
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from app.models.sqlite_storage_strategy import SQLiteProjectStorage
+from .synthetic import make_project
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def _summary(name, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return (f"  {name:<20}{len(samples):>7}{statistics.mean(samples) * 1000:>12.3f}"
+            f"{statistics.median(samples) * 1000:>12.3f}{p99 * 1000:>12.3f}")
+
+
+def run_workload(label, storage, projects, agents, reads, page_size):
+    project = make_project(agents)
+    writes, ids = [], []
+    for _ in range(projects):
+        result, elapsed = _timed(storage.create_project, copy.deepcopy(project))
+        if result["status"] != "success":
+            raise RuntimeError(result["message"])
+        writes.append(elapsed)
+        ids.append(result["project_id"])
+
+    loads = []
+    for project_id in random.choices(ids, k=reads):
+        _, elapsed = _timed(storage.get_project_by_id, project_id)
+        loads.append(elapsed)
+
+    pages, after_id = [], None
+    while True:
+        (_, after_id), elapsed = _timed(storage.get_projects_page, after_id, page_size)
+        pages.append(elapsed)
+        if after_id is None:
+            break
+
+    print(f"{label}")
+    print(f"  {'operation':<20}{'count':>7}{'mean ms':>12}{'p50 ms':>12}{'p99 ms':>12}")
+    print(_summary("create_project", writes))
+    print(_summary("get_project_by_id", loads))
+    print(_summary("get_projects_page", pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--agents", type=int, default=100)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--mysql", action="store_true", help="also run against the configured MySQL database")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = SQLiteProjectStorage(os.path.join(tmp, "bench.sqlite3"))
+        run_workload("sqlite", storage, args.projects, args.agents, args.reads, args.page_size)
+        storage.db.disconnect()
+
+    if args.mysql:
+        from app.models.sql_storage_strategy import SQLProjectStorage
+        run_workload("mysql", SQLProjectStorage(), args.projects, args.agents, args.reads, args.page_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+The Flask proxy that proxy.py replaced: synchronous, one new upstream
+connection per request (requests without a Session). Kept only as the
+baseline of benchmarks/bench_proxy.py.
+"""
+from flask import Flask, Response, request
+import requests
+import hmac
+import os
+from app.services.route_registry import RouteRegistry, RouteAccessTracker, ROUTES_TOKEN_HEADER
+app = Flask(__name__)
+
+# Container routes written by the backend; lookups are served from memory
+ROUTES = RouteRegistry(os.getenv("ROUTE_MAP_PATH", "route_map.json"))
+# Shared with the backend, which announces route changes on /_routes
+ROUTES_TOKEN = os.getenv("PROXY_ROUTES_TOKEN", "")
+# Request times per route, read by the backend to stop idle containers
+ACCESS = RouteAccessTracker(ROUTES.path + ".access")
+# Backend that starts containers again for routes parked while idle
+BACKEND_URL = os.getenv("BACKEND_URL", "http://localhost:8000")
+WAKE_TIMEOUT = float(os.getenv("WAKE_TIMEOUT", "60"))
+
+
+@app.route('/_routes', methods=["POST"])
+def routes_changed():
+    if not ROUTES_TOKEN or not hmac.compare_digest(request.headers.get(ROUTES_TOKEN_HEADER, ""), ROUTES_TOKEN):
+        return {"error": "Forbidden"}, 403
+    ROUTES.refresh()
+    return {"status": "ok"}
+
+def wake(client):
+    """Ask the backend to start the parked export's container again; its URL or None."""
+    try:
+        resp = requests.post(f"{BACKEND_URL}/api/routes/{client}/wake",
+                             headers={ROUTES_TOKEN_HEADER: ROUTES_TOKEN}, timeout=WAKE_TIMEOUT)
+        if resp.status_code != 200:
+            print(f"Error waking {client}: HTTP {resp.status_code}")
+            return None
+        ROUTES.refresh()
+        return resp.json()["url"]
+    except requests.RequestException as e:
+        print(f"Error waking {client}: {str(e)}")
+        return None
+
+@app.route('/<client>', defaults={'path': ''}, methods=["GET", "POST", "PUT", "DELETE"])
+@app.route('/<client>/<path:path>', methods=["GET", "POST", "PUT", "DELETE"])
+def proxy(client, path):
+    # Admin endpoints of the containers are for the backend only
+    if path.startswith('_admin'):
+        return {"error": "Not found"}, 404
+    # Routes added since the last change notification are read on a miss
+    base_url = ROUTES.lookup(client, refresh_on_miss=True)
+    if base_url is None and ROUTES.is_parked(client):
+        base_url = wake(client)
+        if not base_url:
+            return {"error": "Export could not be started"}, 503
+    print(f"Base URL for {client}: {base_url}")
+    if not base_url:
+        return {"error": "Unknown client"}, 404
+    ACCESS.touch(client)
+
+    print(f"Client: {client}, Path: {path}")
+    target_url = f"{base_url}/{path}"
+    resp = requests.request(
+        method=request.method,
+        url=target_url,
+        headers={key: value for (key, value) in request.headers if key.lower() != 'host'},
+        data=request.get_data(),
+        cookies=request.cookies,
+        allow_redirects=False
+    )
+    print(f"Proxying {request.method} request to {target_url}")
+    excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
+    headers = [(name, value) for (name, value) in resp.raw.headers.items() if name.lower() not in excluded_headers]
+    print(resp.content)
+    print(resp.status_code)
+    print(headers)
+    return Response(resp.content, resp.status_code, headers)
+
+if __name__ == '__main__':
+    app.run(port=int(os.getenv("PROXY_PORT", "8080")), threaded=True)
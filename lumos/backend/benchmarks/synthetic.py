@@ -0,0 +1,78 @@
+"""Synthetic LDL projects for storage benchmarks."""
+
+
+def make_project(agent_count, capabilities_per_agent=3, tools_per_agent=2, name=None):
+    """Build an LDL project dict shaped like the frontend's save/export payloads."""
+    agents = []
+    for i in range(agent_count):
+        agents.append({
+            "id": f"agent-{i}",
+            "name": f"Agent {i}",
+            "description": f"Synthetic agent number {i} used for benchmarking",
+            "type": "AI",
+            "subtype": "LLM",
+            "model": {"name": "gpt-4o", "version": "latest", "provider": "openai", "parameters": {"temperature": 0.2}},
+            "capabilities": [f"capability{c}" for c in range(capabilities_per_agent)],
+            "tools": [
+                {
+                    "name": f"Tool {i}-{t}",
+                    "description": "Synthetic agent tool",
+                    "type": "Information",
+                    "subtype": "Parser",
+                    "parameters": {"format": "json"},
+                }
+                for t in range(tools_per_agent)
+            ],
+        })
+
+    interactions = [
+        {
+            "id": f"interaction-{i}",
+            "name": f"Interaction {i}",
+            "type": "AgentAgent",
+            "subtype": "",
+            "pattern": "RequestResponse",
+            "participants": [f"agent-{i}", f"agent-{i + 1}"],
+            "protocol": {"type": "DirectedMessaging", "messageTypes": ["task"]},
+        }
+        for i in range(max(agent_count - 1, 0))
+    ]
+
+    tools = [
+        {"id": f"tool-{i}", "name": f"Shared Tool {i}", "description": "Synthetic canvas tool", "type": "Information"}
+        for i in range(max(agent_count // 10, 1))
+    ]
+
+    connections = [
+        {
+            "id": interaction["id"],
+            "source": interaction["participants"][0],
+            "target": interaction["participants"][1],
+            "label": interaction["name"],
+        }
+        for interaction in interactions
+    ]
+
+    return {
+        "project": {
+            "name": name or f"Synthetic {agent_count}",
+            "version": "1.0",
+            "description": f"Synthetic project with {agent_count} agents",
+            "authors": ["benchmark"],
+        },
+        "agents": agents,
+        "tools": tools,
+        "interactions": interactions,
+        "connections": connections,
+    }
+
+
+def row_count(project):
+    """Number of table rows create_project writes for `project`."""
+    rows = 1 + len(project["project"].get("authors", []))
+    for agent in project["agents"]:
+        rows += 1 + bool(agent.get("model")) + len(agent.get("capabilities", [])) + len(agent.get("tools", []))
+    for interaction in project["interactions"]:
+        rows += 1 + len(interaction.get("participants", [])) + bool(interaction.get("protocol"))
+    rows += len(project.get("tools", [])) + len(project.get("connections", []))
+    return rows
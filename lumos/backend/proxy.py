@@ -1,51 +1,498 @@
-from flask import Flask, Response, request
-import requests
+"""
+Reverse proxy in front of the exported ui_app containers: /<route>/<path>
+is forwarded to the container serving <route>.
+
+Runs on asyncio (aiohttp), so a slow container only holds up its own
+requests. Upstream connections are kept alive and reused from one pool,
+capped per container; the number of requests in flight, and the time a
+container gets to connect and to answer, are configurable.
+
+Bodies are streamed in both directions through a bounded buffer, so
+server-sent events and large outputs reach the client as the container
+writes them. A sample of the requests is logged, one JSON line each, on
+the "lumos.proxy.access" logger.
+
+Traffic per route (requests by status class, bytes, requests in flight
+and latency histograms) is served on /_metrics, which the backend reads
+into its /metrics dashboard.
+
+A route served by several replicas has its requests balanced over them
+by outstanding requests (power of two choices, or the least loaded of
+all). Replicas failing health checks or requests are left out for a while.
+
+    python proxy.py            # listens on PROXY_PORT (8080) and starts ngrok
+"""
+import asyncio
+import contextvars
+import hmac
 import json
-app = Flask(__name__)
+import logging
+import os
+import random
 import subprocess
+import time
+import aiohttp
+from aiohttp import web
+from multidict import CIMultiDict
+from app.services.proxy_metrics import ProxyMetrics
+from app.services.route_registry import RouteRegistry, RouteAccessTracker, ROUTES_TOKEN_HEADER
+
+ACCESS_LOG = logging.getLogger("lumos.proxy.access")
 
-ROUTE_MAP = {
-    
-    # Add more mappings as needed
+# Headers that describe one connection, not the request or response, and are never forwarded
+HOP_BY_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "proxy-connection", "te", "trailer", "transfer-encoding", "upgrade",
 }
 
 
-def load_map(file_path):
-    try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return {}
-
-@app.route('/<client>', defaults={'path': ''}, methods=["GET", "POST", "PUT", "DELETE"])
-@app.route('/<client>/<path:path>', methods=["GET", "POST", "PUT", "DELETE"])
-def proxy(client, path):
-    # Load the route map from a JSON file
-    ROUTE_MAP = load_map('route_map.json')
-    base_url = ROUTE_MAP.get(client)
-    print(f"Base URL for {client}: {base_url}")
-    if not base_url:
-        return {"error": "Unknown client"}, 404
-
-    print(f"Client: {client}, Path: {path}")
-    target_url = f"{base_url}/{path}"
-    resp = requests.request(
-        method=request.method,
-        url=target_url,
-        headers={key: value for (key, value) in request.headers if key.lower() != 'host'},
-        data=request.get_data(),
-        cookies=request.cookies,
-        allow_redirects=False
-    )
-    print(f"Proxying {request.method} request to {target_url}")
-    excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
-    headers = [(name, value) for (name, value) in resp.raw.headers.items() if name.lower() not in excluded_headers]
-    print(resp.content)
-    print(resp.status_code)
-    print(headers)
-    return Response(resp.content, resp.status_code, headers)
+def _forwardable(headers):
+    """Headers minus hop-by-hop ones, including those the Connection header names."""
+    named = {token.strip().lower() for value in headers.getall("Connection", []) for token in value.split(",")}
+    return CIMultiDict((name, value) for name, value in headers.items()
+                       if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() not in named)
 
-if __name__ == '__main__':
-    subprocess.Popen(["ngrok", "http", "8080"])
 
-    app.run(port=8080)
+# Transfer record of the request ReverseProxy.handle is forwarding in this task
+_TRANSFER = contextvars.ContextVar("transfer", default=None)
+
+
+class _TimedConnector(aiohttp.TCPConnector):
+    """
+    Notes in the current request's transfer record how long a new upstream
+    connection took to open; kept-alive connections are reused without
+    coming here. (aiohttp's TraceConfig does the same, at a cost on every
+    request.)
+    """
+
+    async def _create_connection(self, req, traces, timeout):
+        started = time.monotonic()
+        protocol = await super()._create_connection(req, traces, timeout)
+        transfer = _TRANSFER.get()
+        if transfer is not None:
+            transfer["connect"] = (time.monotonic() - started) * 1000
+        return protocol
+
+
+class Upstream:
+    """One container behind a route, as this proxy has seen it."""
+    __slots__ = ("url", "outstanding", "failures", "ejected_until")
+
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+
+    def snapshot(self, now):
+        return {"outstanding": self.outstanding, "failures": self.failures, "ejected": self.ejected_until > now}
+
+
+class ReverseProxy:
+    """
+    Forwards requests to the containers in `routes`, waking parked ones
+    through the backend.
+
+    At most max_concurrency requests are forwarded at once and at most
+    max_connections_per_upstream connections are open to one container;
+    the rest wait their turn. `timeout` bounds how long a container may
+    stay silent, not how long a response may stream. No more than
+    buffer_size bytes of a body are held per connection and direction:
+    reading stops until the other side has taken them.
+
+    Among a route's replicas, `balancing` "p2c" sends each request to the
+    one with fewer outstanding requests of two picked at random, "least"
+    to the one with the fewest of all. A replica is ejected, i.e. left out
+    for eject_seconds, after eject_after requests in a row failed to reach
+    it, or at once when it fails the health check run on every replica of
+    replicated routes each health_interval seconds. If all are ejected,
+    all are tried.
+
+    Routes are looked up in memory. The registry's files are read off the
+    event loop: when the backend announces a change, on each health check
+    and, for requests to unknown routes (a missed announcement), at most
+    once every miss_refresh_interval seconds.
+    """
+
+    def __init__(self, routes, access=None, routes_token="", backend_url="http://localhost:8000",
+                 wake_timeout=60.0, timeout=60.0, connect_timeout=5.0, max_concurrency=256,
+                 max_connections_per_upstream=32, keepalive_timeout=30.0, buffer_size=64 * 1024,
+                 access_log_sample=0.01, balancing="p2c", health_interval=5.0, health_timeout=2.0,
+                 eject_after=3, eject_seconds=30.0, miss_refresh_interval=1.0):
+        self.routes = routes
+        self.access = access
+        self.routes_token = routes_token
+        self.backend_url = backend_url
+        self.wake_timeout = wake_timeout
+        self.timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout, sock_read=timeout)
+        self.max_concurrency = max_concurrency
+        self.max_connections_per_upstream = max_connections_per_upstream
+        self.keepalive_timeout = keepalive_timeout
+        self.buffer_size = buffer_size
+        self.access_log_sample = access_log_sample
+        self.balancing = balancing
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.miss_refresh_interval = miss_refresh_interval
+        self._upstreams = {}
+        # Route reads requested and done; a read covers the requests made before it started
+        self._refresh_requested = 0
+        self._refreshed = 0
+        self._refresh_task = None
+        self._refresh_started_at = float("-inf")
+        self._health_task = None
+        self._limit = None
+        self._session = None
+        self.requests = 0
+        self.in_flight = 0
+        self.upstream_errors = 0
+        self.upstream_timeouts = 0
+        self.client_aborts = 0
+        self.ejections = 0
+        self.metrics = ProxyMetrics()
+
+    @classmethod
+    def from_env(cls):
+        routes = RouteRegistry(os.getenv("ROUTE_MAP_PATH", "route_map.json"))
+        return cls(
+            routes,
+            # Request times per route, read by the backend to stop idle containers
+            access=RouteAccessTracker(routes.path + ".access"),
+            # Shared with the backend, which announces route changes on /_routes
+            routes_token=os.getenv("PROXY_ROUTES_TOKEN", ""),
+            backend_url=os.getenv("BACKEND_URL", "http://localhost:8000"),
+            wake_timeout=float(os.getenv("WAKE_TIMEOUT", "60")),
+            timeout=float(os.getenv("PROXY_TIMEOUT", "60")),
+            connect_timeout=float(os.getenv("PROXY_CONNECT_TIMEOUT", "5")),
+            max_concurrency=int(os.getenv("PROXY_MAX_CONCURRENCY", "256")),
+            max_connections_per_upstream=int(os.getenv("PROXY_MAX_CONNECTIONS_PER_UPSTREAM", "32")),
+            keepalive_timeout=float(os.getenv("PROXY_KEEPALIVE_TIMEOUT", "30")),
+            buffer_size=int(os.getenv("PROXY_BUFFER_SIZE", str(64 * 1024))),
+            access_log_sample=float(os.getenv("PROXY_ACCESS_LOG_SAMPLE", "0.01")),
+            balancing=os.getenv("PROXY_BALANCING", "p2c"),
+            health_interval=float(os.getenv("PROXY_HEALTH_INTERVAL", "5")),
+            eject_after=int(os.getenv("PROXY_EJECT_AFTER", "3")),
+            eject_seconds=float(os.getenv("PROXY_EJECT_SECONDS", "30")),
+            miss_refresh_interval=float(os.getenv("PROXY_MISS_REFRESH_INTERVAL", "1")),
+        )
+
+    async def start(self, app=None):
+        self._limit = asyncio.Semaphore(self.max_concurrency)
+        connector = _TimedConnector(limit=0, limit_per_host=self.max_connections_per_upstream,
+                                    keepalive_timeout=self.keepalive_timeout)
+        # Bodies pass through as the container encoded them; cookies belong to the clients, not the proxy
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout, auto_decompress=False,
+                                              cookie_jar=aiohttp.DummyCookieJar(),
+                                              read_bufsize=self.buffer_size)
+        await self.refresh_routes()
+        if self.health_interval > 0:
+            self._health_task = asyncio.ensure_future(self._health_loop())
+
+    async def close(self, app=None):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _authorized(self, request):
+        token = request.headers.get(ROUTES_TOKEN_HEADER, "")
+        return bool(self.routes_token) and hmac.compare_digest(token, self.routes_token)
+
+    async def routes_changed(self, request):
+        if not self._authorized(request):
+            return web.json_response({"error": "Forbidden"}, status=403)
+        await self.refresh_routes()
+        return web.json_response({"status": "ok"})
+
+    async def refresh_routes(self):
+        """
+        Read the route changes written since the last read. The read runs in
+        the executor, since it takes the registry's file lock; callers
+        arriving while one runs share the next.
+        """
+        self._refresh_requested += 1
+        requested = self._refresh_requested
+        while self._refreshed < requested:
+            if self._refresh_task is None:
+                self._refresh_task = asyncio.ensure_future(self._read_routes())
+            await asyncio.shield(self._refresh_task)
+
+    async def _read_routes(self):
+        covered = self._refresh_requested
+        self._refresh_started_at = time.monotonic()
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self.routes.refresh)
+            self._refreshed = max(self._refreshed, covered)
+        finally:
+            self._refresh_task = None
+
+    async def _replicas(self, client):
+        """URLs serving `client`; an unknown one is looked for in the registry's files now and then."""
+        urls = self.routes.replicas(client)
+        if urls is None and not self.routes.is_parked(client) \
+                and time.monotonic() - self._refresh_started_at >= self.miss_refresh_interval:
+            await self.refresh_routes()
+            urls = self.routes.replicas(client)
+        return urls
+
+    async def metrics_data(self, request):
+        """Traffic per route for the backend's /metrics; shares the /_routes token."""
+        if not self._authorized(request):
+            return web.json_response({"error": "Forbidden"}, status=403)
+        now = time.monotonic()
+        upstreams = {url: upstream.snapshot(now) for url, upstream in self._upstreams.items()}
+        return web.json_response({"proxy": self.stats(), **self.metrics.snapshot(), "upstreams": upstreams})
+
+    def _upstream(self, url):
+        upstream = self._upstreams.get(url)
+        if upstream is None:
+            upstream = self._upstreams[url] = Upstream(url)
+        return upstream
+
+    def _pick(self, urls):
+        """The replica to send the next request of a route to."""
+        if len(urls) == 1:
+            return self._upstream(urls[0])
+        now = time.monotonic()
+        upstreams = [self._upstream(url) for url in urls]
+        healthy = [upstream for upstream in upstreams if upstream.ejected_until <= now] or upstreams
+        # random order settles ties between equally loaded replicas
+        candidates = random.sample(healthy, 2 if self.balancing == "p2c" and len(healthy) > 2 else len(healthy))
+        return min(candidates, key=lambda upstream: upstream.outstanding)
+
+    def _eject(self, upstream):
+        if upstream.ejected_until <= time.monotonic():
+            self.ejections += 1
+            print(f"Ejected replica {upstream.url} for {self.eject_seconds}s")
+        upstream.ejected_until = time.monotonic() + self.eject_seconds
+
+    def _failed(self, upstream):
+        upstream.failures += 1
+        if upstream.failures >= self.eject_after:
+            self._eject(upstream)
+
+    async def _check(self, upstream):
+        try:
+            async with self._session.get(f"{upstream.url}/_admin/health",
+                                         timeout=aiohttp.ClientTimeout(total=self.health_timeout)) as resp:
+                await resp.read()
+                healthy = resp.status == 200
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            healthy = False
+        if healthy:
+            upstream.failures, upstream.ejected_until = 0, 0.0
+        else:
+            self._eject(upstream)
+
+    async def check_health(self):
+        """
+        Health-check every replica of the replicated routes, forgetting
+        containers no route uses and the traffic of removed routes.
+        """
+        await self.refresh_routes()
+        routes = self.routes.routes()
+        self.metrics.retain(routes)
+        # url -> whether it is one of several replicas
+        routed = {}
+        for urls in routes.values():
+            if isinstance(urls, list):
+                routed.update(dict.fromkeys(urls, True))
+            elif urls:
+                routed.setdefault(urls, False)
+        for url in [url for url in self._upstreams if url not in routed]:
+            del self._upstreams[url]
+        await asyncio.gather(*(self._check(self._upstream(url)) for url, replicated in routed.items() if replicated))
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                print(f"Error checking replica health: {str(e)}")
+
+    async def wake(self, client):
+        """Ask the backend to start the parked export's container again; its URL or None."""
+        try:
+            async with self._session.post(
+                f"{self.backend_url}/api/routes/{client}/wake",
+                headers={ROUTES_TOKEN_HEADER: self.routes_token},
+                timeout=aiohttp.ClientTimeout(total=self.wake_timeout),
+            ) as resp:
+                if resp.status != 200:
+                    print(f"Error waking {client}: HTTP {resp.status}")
+                    return None
+                url = (await resp.json())["url"]
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error waking {client}: {str(e) or type(e).__name__}")
+            return None
+        await self.refresh_routes()
+        return url
+
+    async def handle(self, request):
+        client = request.match_info["client"]
+        path = request.match_info.get("path", "")
+        # Admin endpoints of the containers are for the backend only
+        if path.startswith("_admin"):
+            return web.json_response({"error": "Not found"}, status=404)
+        urls = await self._replicas(client)
+        if urls is None and self.routes.is_parked(client):
+            url = await self.wake(client)
+            if not url:
+                return web.json_response({"error": "Export could not be started"}, status=503)
+            urls = [url]
+        if not urls:
+            return web.json_response({"error": "Unknown client"}, status=404)
+        upstream = self._pick(urls)
+        if self.access is not None:
+            self.access.touch(client)
+
+        headers = _forwardable(request.headers)
+        headers.pop("Host", None)
+        headers["X-Forwarded-For"] = ", ".join(filter(None, [headers.get("X-Forwarded-For"), request.remote]))
+        headers["X-Forwarded-Host"] = request.host
+        headers["X-Forwarded-Proto"] = request.scheme
+        target_url = f"{upstream.url}/{path}" + (f"?{request.query_string}" if request.query_string else "")
+
+        self.requests += 1
+        started = time.monotonic()
+        # Bytes each way, whether the client hung up, and when the upstream request got where
+        sent = {"in": 0, "out": 0, "aborted": False, "dispatched": None, "headers": None, "connect": None}
+        status = None
+        async with self._limit:
+            self.in_flight += 1
+            upstream.outstanding += 1
+            self.metrics.opened(client)
+            try:
+                # Sent as it arrives: with Content-Length when the client gave one, chunked otherwise
+                body = self._relay_body(request, sent) if request.body_exists else None
+                sent["dispatched"] = time.monotonic()
+                _TRANSFER.set(sent)
+                async with self._session.request(request.method, target_url, headers=headers, data=body,
+                                                 allow_redirects=False) as resp:
+                    sent["headers"] = time.monotonic()
+                    status = resp.status
+                    upstream.failures = 0
+                    response = await self._relay_response(request, resp, sent)
+                    if sent["aborted"]:
+                        # Leaving the block closes the upstream connection mid-response
+                        self.client_aborts += 1
+                        status = 499
+                    return response
+            except asyncio.TimeoutError:
+                self.upstream_timeouts += 1
+                self._failed(upstream)
+                if status is not None:
+                    # Headers already went out; all that is left is to cut the stream
+                    raise
+                status = 504
+                return web.json_response({"error": f"{client} did not answer in time"}, status=504)
+            except aiohttp.ClientError as e:
+                self.upstream_errors += 1
+                self._failed(upstream)
+                print(f"Error proxying {request.method} {target_url}: {str(e)}")
+                if status is not None:
+                    raise
+                status = 502
+                return web.json_response({"error": f"{client} is unavailable"}, status=502)
+            finally:
+                self.in_flight -= 1
+                upstream.outstanding -= 1
+                self._record(request, client, status, sent, started)
+
+    async def _relay_body(self, request, sent):
+        async for chunk in request.content.iter_chunked(self.buffer_size):
+            sent["in"] += len(chunk)
+            yield chunk
+
+    async def _relay_response(self, request, resp, sent):
+        """
+        Copy the container's response to the client chunk by chunk, as it
+        arrives: server-sent events and chunked responses reach the client
+        as the container writes them. Each write waits for the client to
+        drain, and the container is read no further ahead than the buffer.
+        Stops early, setting sent["aborted"], if the client disconnects.
+        """
+        headers = _forwardable(resp.headers)
+        length = headers.pop("Content-Length", None)
+        response = web.StreamResponse(status=resp.status, reason=resp.reason, headers=headers)
+        if length is not None:
+            response.content_length = int(length)
+        try:
+            await response.prepare(request)
+            async for chunk in resp.content.iter_any():
+                sent["out"] += len(chunk)
+                await response.write(chunk)
+            await response.write_eof()
+        except ConnectionResetError:
+            sent["aborted"] = True
+        return response
+
+    def _record(self, request, client, status, sent, started):
+        """
+        Add the request to the metrics of its route. Log one in
+        access_log_sample of the requests, and every one the proxy failed.
+        """
+        ended, dispatched = time.monotonic(), sent["dispatched"] or started
+        self.metrics.closed(client, status, sent["in"], sent["out"], {
+            "connect": sent["connect"],
+            "ttfb": (sent["headers"] - dispatched) * 1000 if sent["headers"] else None,
+            "total": (ended - dispatched) * 1000,
+            "overhead": (dispatched - started) * 1000,
+        })
+        if status is None or (status < 500 and random.random() >= self.access_log_sample):
+            return
+        ACCESS_LOG.info(json.dumps({
+            "route": client,
+            "method": request.method,
+            "path": request.path,
+            "status": status,
+            "bytes_in": sent["in"],
+            "bytes_out": sent["out"],
+            "duration_ms": round((ended - started) * 1000, 1),
+            "sampled": status < 500,
+        }))
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "upstream_errors": self.upstream_errors,
+            "upstream_timeouts": self.upstream_timeouts,
+            "client_aborts": self.client_aborts,
+            "ejections": self.ejections,
+        }
+
+
+PROXY_KEY = web.AppKey("proxy", ReverseProxy)
+
+
+def create_app(proxy=None):
+    proxy = proxy or ReverseProxy.from_env()
+    # Request bodies are buffered up to buffer_size before the client is made to wait
+    app = web.Application(handler_args={"read_bufsize": proxy.buffer_size})
+    app[PROXY_KEY] = proxy
+    app.on_startup.append(proxy.start)
+    app.on_cleanup.append(proxy.close)
+    app.router.add_post("/_routes", proxy.routes_changed)
+    app.router.add_get("/_metrics", proxy.metrics_data)
+    app.router.add_route("*", "/{client}", proxy.handle)
+    app.router.add_route("*", "/{client}/{path:.*}", proxy.handle)
+    return app
+
+
+if __name__ == '__main__':
+    port = int(os.getenv("PROXY_PORT", "8080"))
+    subprocess.Popen(["ngrok", "http", str(port)])
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    # Replaced by the sampled log of ReverseProxy
+    web.run_app(create_app(), port=port, access_log=None)
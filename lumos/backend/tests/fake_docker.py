@@ -0,0 +1,197 @@
+"""
+A stand-in for the docker CLI, installed as an executable named `docker`
+on PATH. Images and containers are kept in a JSON state file and every
+invocation is appended to `<state>.log`. `docker run` starts a small HTTP
+server playing the ui_app admin endpoints on the published port; `docker
+stats` reports each container's "memory" from the state (10MiB if unset).
+"""
+import json
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+
+FAKE_DOCKER = textwrap.dedent('''\
+    #!{python}
+    import fcntl, json, os, signal, subprocess, sys, time
+    state_path = os.environ["FAKE_DOCKER_STATE"]
+    lock = open(state_path + ".lock", "w")
+    fcntl.flock(lock, fcntl.LOCK_EX)
+    state = json.load(open(state_path)) if os.path.exists(state_path) else {{}}
+    state.setdefault("images", [])
+    state.setdefault("in_use", [])
+    state.setdefault("containers", {{}})
+    with open(state_path + ".log", "a") as log:
+        log.write(" ".join(sys.argv[1:]) + "\\n")
+    args = sys.argv[1:]
+    code = 0
+    if args[:2] == ["image", "inspect"]:
+        code = 0 if args[2] in state["images"] else 1
+    elif args[0] == "build" and os.environ.get("FAKE_DOCKER_FAIL_BUILD"):
+        print("build failed", file=sys.stderr)
+        code = 1
+    elif args[0] == "build":
+        print("Step 1/2 : FROM python:3.11-slim", flush=True)
+        time.sleep(float(os.environ.get("FAKE_DOCKER_BUILD_SECONDS", "0")))
+        print("Step 2/2 : COPY . /app", flush=True)
+        tags = [args[i + 1] for i, arg in enumerate(args) if arg == "-t"]
+        state["images"] = tags + [t for t in state["images"] if t not in tags]
+    elif args[:2] == ["image", "ls"]:
+        print("\\n".join(t.split(":", 1)[1] for t in state["images"] if t.startswith(args[2] + ":")))
+    elif args[0] == "rmi":
+        if args[1] in state["in_use"]:
+            print("image is being used by a container", file=sys.stderr)
+            code = 1
+        else:
+            state["images"].remove(args[1])
+    elif args[0] == "run":
+        options = dict(zip(args[1:-1], args[2:]))
+        port = options["-p"].split(":")[0]
+        env = dict(value.split("=", 1) for flag, value in zip(args, args[1:]) if flag == "-e")
+        server = subprocess.Popen([sys.executable, {server!r}, port, env.get("ADMIN_TOKEN", "")],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+        state["containers"][options["--name"]] = {{"pid": server.pid, "image": args[-1], "port": int(port)}}
+        print(options["--name"])
+    elif args[0] == "stats":
+        for name, container in state["containers"].items():
+            print(f"{{name}}\t{{container.get('memory', '10MiB')}} / 1GiB")
+    elif args[:2] == ["rm", "-f"]:
+        for name in args[2:]:
+            container = state["containers"].pop(name, None)
+            if container:
+                try:
+                    os.kill(container["pid"], signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+    json.dump(state, open(state_path, "w"))
+    sys.exit(code)
+''')
+
+# ui_app admin endpoints, as served by a warm container
+FAKE_UI_APP = textwrap.dedent('''\
+    import gzip, json, sys
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    port, token = int(sys.argv[1]), sys.argv[2]
+    config = {}
+    pushes = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/_admin/health":
+                self._reply(200, {"status": "ok", "configured": bool(config)})
+            elif self.path == "/_admin/config":
+                self._reply(200, config)
+            elif self.path == "/_admin/pushes":
+                self._reply(200, pushes)
+            else:
+                self._reply(200, {"path": self.path})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if self.path != "/_admin/config" or self.headers.get("X-Admin-Token") != token:
+                return self._reply(403, {"error": "Forbidden"})
+            # a config bundle: "LUMOSCFG <format> <version>\\n" + gzipped JSON
+            header, _, compressed = body.partition(b"\\n")
+            magic, _, version = header.decode().split(" ")
+            if magic != "LUMOSCFG" or version != self.headers.get("X-Config-Version"):
+                return self._reply(400, {"error": "Not a config bundle"})
+            config.clear()
+            config.update(json.loads(gzip.decompress(compressed)))
+            pushes.append({"version": version, "bytes": len(body)})
+            self._reply(200, {"status": "ok"})
+
+        def log_message(self, *args):
+            pass
+
+    ThreadingHTTPServer(("127.0.0.1", port), Handler).serve_forever()
+''')
+
+
+def install(directory):
+    """
+    Write the fake docker into `directory`/bin and return the environment
+    variables that put it on PATH.
+    """
+    bin_dir = os.path.join(directory, "bin")
+    os.makedirs(bin_dir, exist_ok=True)
+    server = os.path.join(bin_dir, "fake_ui_app.py")
+    with open(server, "w") as f:
+        f.write(FAKE_UI_APP)
+    docker = os.path.join(bin_dir, "docker")
+    with open(docker, "w") as f:
+        f.write(FAKE_DOCKER.format(python=sys.executable, server=server))
+    os.chmod(docker, 0o755)
+    return {
+        "PATH": bin_dir + os.pathsep + os.environ["PATH"],
+        "FAKE_DOCKER_STATE": os.path.join(directory, "docker_state.json"),
+    }
+
+
+def read_state(env):
+    with open(env["FAKE_DOCKER_STATE"]) as f:
+        return json.load(f)
+
+
+def write_state(env, state):
+    with open(env["FAKE_DOCKER_STATE"], "w") as f:
+        json.dump(state, f)
+
+
+def calls(env, command):
+    """Logged invocations starting with `command`."""
+    with open(env["FAKE_DOCKER_STATE"] + ".log") as f:
+        return [line for line in f.read().splitlines() if line.startswith(command)]
+
+
+def remove_containers(env):
+    """Stop the servers of containers still running, e.g. in tearDown."""
+    if not os.path.exists(env["FAKE_DOCKER_STATE"]):
+        return
+    for container in read_state(env).get("containers", {}).values():
+        try:
+            os.kill(container["pid"], 15)
+        except ProcessLookupError:
+            pass
+
+
+class FakeDockerTestCase(unittest.TestCase):
+    """
+    Tests running against the fake docker: each gets a temporary directory
+    (self.tmp), a ui_app build context in it (self.context) and the fake
+    docker on PATH. Environment variables set through setenv() are restored
+    and containers still running are stopped after the test.
+    """
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_env = {}
+        self.env = install(self.tmp.name)
+        self.setenv(**self.env)
+        self.context = os.path.join(self.tmp.name, "ui_app")
+        os.makedirs(self.context)
+        with open(os.path.join(self.context, "app.py"), "w") as f:
+            f.write("print('hello')")
+
+    def tearDown(self):
+        remove_containers(self.env)
+        for key, value in self.saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        self.tmp.cleanup()
+
+    def setenv(self, **values):
+        """Set environment variables until the end of the test."""
+        for key, value in values.items():
+            self.saved_env.setdefault(key, os.environ.get(key))
+            os.environ[key] = value
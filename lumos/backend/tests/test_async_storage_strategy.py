@@ -0,0 +1,65 @@
+import unittest
+import asyncio
+import threading
+import time
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.models.async_storage_strategy import ThreadedProjectStorage
+
+
+class SlowStorage:
+    def __init__(self, delay):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def _write(self, project_data, project_id=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        return {"status": "success", "project_id": project_data["id"]}
+
+    save_project = _write
+    create_project = _write
+
+
+class TestThreadedProjectStorage(unittest.TestCase):
+    def test_blocking_writes_do_not_stall_the_event_loop(self):
+        storage = ThreadedProjectStorage(SlowStorage(0.2), max_workers=2)
+
+        async def scenario():
+            save = asyncio.ensure_future(storage.save_project({"id": 1}))
+            start = time.monotonic()
+            await asyncio.sleep(0.01)
+            loop_delay = time.monotonic() - start
+            return loop_delay, await save
+
+        loop_delay, result = asyncio.run(scenario())
+        self.assertLess(loop_delay, 0.1)
+        self.assertEqual(result["project_id"], 1)
+
+    def test_concurrency_is_bounded_and_queue_depth_reported(self):
+        slow = SlowStorage(0.05)
+        storage = ThreadedProjectStorage(slow, max_workers=2)
+
+        async def scenario():
+            saves = [asyncio.ensure_future(storage.save_project({"id": i})) for i in range(6)]
+            await asyncio.sleep(0.01)
+            queued = storage.stats()["queue_depth"]
+            await asyncio.gather(*saves)
+            return queued
+
+        queued = asyncio.run(scenario())
+        self.assertEqual(slow.peak, 2)
+        self.assertEqual(queued, 4)
+        stats = storage.stats()
+        self.assertEqual((stats["queue_depth"], stats["running"], stats["completed"]), (0, 0, 6))
+        self.assertGreater(stats["max_queue_wait"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
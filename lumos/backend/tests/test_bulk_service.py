@@ -0,0 +1,106 @@
+import unittest
+import asyncio
+import json
+import tempfile
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.models.project_model import ProjectModel
+from app.models.sqlite_storage_strategy import SQLiteProjectStorage
+from app.services.bulk_service import BulkService, iter_lines
+from benchmarks.synthetic import make_project
+
+
+class TestBulkService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SQLiteProjectStorage(os.path.join(self.tmp.name, "lumos.sqlite3"))
+        self.model = ProjectModel(self.storage)
+        self.bulk = BulkService(self.model)
+
+    def tearDown(self):
+        self.model.async_strategy.shutdown()
+        self.storage.db.disconnect()
+        self.tmp.cleanup()
+
+    def test_export_then_import_round_trips_projects(self):
+        for i in range(5):
+            self.storage.save_project(make_project(4, name=f"p{i}"))
+        lines = list(self.bulk.export_lines(chunk_size=2))
+        self.assertEqual(len(lines), 5)
+
+        target = SQLiteProjectStorage(os.path.join(self.tmp.name, "copy.sqlite3"))
+        try:
+            results = list(BulkService(ProjectModel(target)).import_lines(lines, batch_size=2))
+            self.assertEqual([r["status"] for r in results], ["success"] * 5)
+            copied = [json.loads(line) for line in BulkService(ProjectModel(target)).export_lines()]
+        finally:
+            target.db.disconnect()
+
+        original = [json.loads(line) for line in lines]
+        for before, after in zip(original, copied):
+            self.assertEqual(after["project"]["name"], before["project"]["name"])
+            self.assertEqual(after["agents"], before["agents"])
+            self.assertEqual(after["tools"], before["tools"])
+            self.assertEqual(after["connections"], before["connections"])
+            self.assertEqual(len(after["interactions"]), len(before["interactions"]))
+
+    def test_invalid_lines_are_reported_without_aborting_the_batch(self):
+        lines = [
+            json.dumps(make_project(2, name="first")),
+            "not json",
+            "",
+            json.dumps({"project": {"name": "no version"}}),
+            json.dumps(make_project(2, name="second")),
+        ]
+        results = list(self.bulk.import_lines(lines, batch_size=10))
+        self.assertEqual([(r["line"], r["status"]) for r in results],
+                         [(1, "success"), (2, "error"), (4, "error"), (5, "success")])
+        self.assertEqual([p["name"] for p in self.storage.get_all_projects()], ["first", "second"])
+
+    def test_failed_project_is_rolled_back_to_its_savepoint(self):
+        broken = make_project(2, name="broken")
+        broken["agents"][1]["name"] = None  # violates NOT NULL
+        results = self.storage.create_projects([make_project(1, name="a"), broken, make_project(1, name="b")])
+        self.assertEqual([r["status"] for r in results], ["success", "error", "success"])
+        self.assertEqual([p["name"] for p in self.storage.get_all_projects()], ["a", "b"])
+
+        conn = self.storage.db.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM agents")
+            self.assertEqual(cursor.fetchone()[0], 2)
+        finally:
+            cursor.close()
+            conn.close()
+
+    def test_async_import_reads_lines_split_across_chunks(self):
+        body = "\n".join(json.dumps(make_project(1, name=f"p{i}")) for i in range(3)).encode()
+
+        async def chunks():
+            for start in range(0, len(body), 100):
+                yield body[start:start + 100]
+
+        async def scenario():
+            return [result async for result in self.bulk.import_lines_async(iter_lines(chunks()), batch_size=2)]
+
+        results = asyncio.run(scenario())
+        self.assertEqual([r["line"] for r in results], [1, 2, 3])
+        self.assertEqual(len(self.storage.get_all_projects()), 3)
+
+    def test_lines_that_are_not_utf8_are_reported(self):
+        body = b"\n".join([json.dumps(make_project(1, name="ok")).encode(),
+                           json.dumps(make_project(1, name="caf\u00e9"), ensure_ascii=False).encode("latin-1")])
+
+        async def chunks():
+            yield body
+
+        async def scenario():
+            return [result async for result in self.bulk.import_lines_async(iter_lines(chunks()))]
+
+        results = asyncio.run(scenario())
+        self.assertEqual([(r["line"], r["status"]) for r in results], [(1, "success"), (2, "error")])
+        self.assertIn("Invalid UTF-8", results[1]["message"])
+
+
+if __name__ == '__main__':
+    unittest.main()
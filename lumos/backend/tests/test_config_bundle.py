@@ -0,0 +1,132 @@
+import unittest
+import importlib.util
+import io
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.utils.config_bundle import VERSION_HEADER, decode_config, encode_config, read_header
+
+UI_APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'ui_app'))
+sys.path.insert(0, UI_APP_DIR)
+from config_store import ConfigStore
+
+
+def _large_project(agents=20000):
+    """A project of about 20 MB."""
+    return {
+        "project": {"name": "big", "version": "1.0", "description": "d", "authors": []},
+        "agents": [{"id": f"agent-{i}", "name": f"Agent {i}", "description": "Checks facts. " * 60,
+                    "type": "llm", "capabilities": ["search", "summarize"]} for i in range(agents)],
+        "tools": [],
+        "interactions": [],
+    }
+
+
+class TestConfigBundle(unittest.TestCase):
+    def test_round_trip_and_stable_version(self):
+        config = {"project": {"name": "p", "version": "1"}, "agents": [{"id": "a"}]}
+        bundle = encode_config(config)
+        self.assertEqual(decode_config(bundle.data), config)
+        self.assertEqual(read_header(bundle.data)[1], bundle.version)
+        reordered = {"agents": [{"id": "a"}], "project": {"version": "1", "name": "p"}}
+        self.assertEqual(encode_config(reordered), bundle)
+        self.assertNotEqual(encode_config({"project": {"name": "q"}}).version, bundle.version)
+
+    def test_not_a_bundle(self):
+        with self.assertRaises(ValueError):
+            decode_config(b'{"project": {}}')
+
+    def test_large_project_is_compressed(self):
+        config = _large_project()
+        bundle = encode_config(config)
+        self.assertGreater(len(str(config)), 15 * 1024 * 1024)
+        self.assertLess(len(bundle.data), 2 * 1024 * 1024)
+        self.assertEqual(decode_config(bundle.data), config)
+
+
+class TestConfigStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "data", "config.lumos")
+        self.store = ConfigStore(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_pushed_bundle_is_parsed_once_on_first_use(self):
+        self.assertEqual((self.store.stored_version(), self.store.config()), (None, {}))
+        bundle = encode_config({"project": {"name": "p"}})
+        self.assertTrue(self.store.save(io.BytesIO(bundle.data), bundle.version))
+        self.assertEqual(self.store.stored_version(), bundle.version)
+        # nothing parsed yet
+        self.assertIsNone(self.store.version)
+        config = self.store.config()
+        self.assertEqual(config, {"project": {"name": "p"}})
+        self.assertIs(self.store.config(), config)
+        self.assertEqual(self.store.text(), str(config))
+        # the same version again is not rewritten
+        self.assertFalse(self.store.save(io.BytesIO(bundle.data), bundle.version))
+
+    def test_a_new_version_replaces_the_config(self):
+        for name in ("p", "q"):
+            bundle = encode_config({"project": {"name": name}})
+            self.store.save(io.BytesIO(bundle.data), bundle.version)
+            self.assertEqual(self.store.config(), {"project": {"name": name}})
+        self.assertEqual(self.store.version, bundle.version)
+
+    def test_bad_pushes_are_rejected_and_keep_the_config(self):
+        bundle = encode_config({"project": {"name": "p"}})
+        self.store.save(io.BytesIO(bundle.data), bundle.version)
+        self.store.config()
+        with self.assertRaises(ValueError):
+            self.store.save(io.BytesIO(b'{"project": {}}'), "")
+        with self.assertRaises(ValueError):
+            self.store.save(io.BytesIO(bundle.data), "another-version")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["config.lumos"])
+        self.assertEqual(self.store.config(), {"project": {"name": "p"}})
+
+    def test_large_project_loads_from_the_file(self):
+        config = _large_project()
+        bundle = encode_config(config)
+        self.store.save(io.BytesIO(bundle.data), bundle.version)
+        started = time.monotonic()
+        self.assertEqual(self.store.config(), config)
+        self.assertLess(time.monotonic() - started, 10)
+
+
+class TestUiAppAdminConfig(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.saved_env = {key: os.environ.get(key) for key in ("CONFIG_PATH", "ADMIN_TOKEN")}
+        os.environ.update({"CONFIG_PATH": os.path.join(self.tmp.name, "config.lumos"), "ADMIN_TOKEN": "secret"})
+        spec = importlib.util.spec_from_file_location("ui_app_main", os.path.join(UI_APP_DIR, "app.py"))
+        self.ui_app = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.ui_app)
+        self.client = self.ui_app.app.test_client()
+
+    def tearDown(self):
+        for key, value in self.saved_env.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        self.tmp.cleanup()
+
+    def test_config_is_pushed_as_a_bundle(self):
+        bundle = encode_config({"project": {"name": "p"}})
+        self.assertFalse(self.client.get("/_admin/health").json["configured"])
+        self.assertEqual(self.client.post("/_admin/config", data=bundle.data).status_code, 403)
+        response = self.client.post("/_admin/config", data=bundle.data,
+                                    headers={"X-Admin-Token": "secret", VERSION_HEADER: bundle.version})
+        self.assertEqual(response.json, {"status": "ok", "version": bundle.version, "changed": True})
+        health = self.client.get("/_admin/health").json
+        self.assertEqual((health["configured"], health["config_version"]), (True, bundle.version))
+        self.assertEqual(self.ui_app.CONFIG.config(), {"project": {"name": "p"}})
+        bad = self.client.post("/_admin/config", data=b"{}", headers={"X-Admin-Token": "secret"})
+        self.assertEqual(bad.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import threading
+import time
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.models.connection_pool import ConnectionPool, PoolTimeoutError
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.alive = True
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise RuntimeError("gone away")
+
+    def is_connected(self):
+        return self.alive and not self.closed
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+    def _creator(self):
+        conn = FakeConnection()
+        self.created.append(conn)
+        return conn
+
+    def test_connection_is_reused_after_close(self):
+        pool = ConnectionPool(self._creator, pool_size=2, max_overflow=0)
+        conn = pool.checkout()
+        conn.close()
+        with pool.connection():
+            pass
+        self.assertEqual(len(self.created), 1)
+        self.assertEqual(pool.stats()["idle"], 1)
+        self.assertEqual(pool.stats()["checkouts"], 2)
+
+    def test_overflow_connections_are_closed_on_return(self):
+        pool = ConnectionPool(self._creator, pool_size=1, max_overflow=1)
+        first, second = pool.checkout(), pool.checkout()
+        self.assertEqual(pool.stats()["in_use"], 2)
+        first.close()
+        second.close()
+        stats = pool.stats()
+        self.assertEqual(stats["open"], 1)
+        self.assertEqual(stats["idle"], 1)
+        self.assertEqual(sum(c.closed for c in self.created), 1)
+
+    def test_checkout_times_out_when_exhausted(self):
+        pool = ConnectionPool(self._creator, pool_size=1, max_overflow=0, timeout=0.05)
+        held = pool.checkout()
+        with self.assertRaises(PoolTimeoutError):
+            pool.checkout()
+        self.assertEqual(pool.stats()["timeouts"], 1)
+        held.close()
+
+    def test_waiter_is_woken_by_release(self):
+        pool = ConnectionPool(self._creator, pool_size=1, max_overflow=0, timeout=2)
+        held = pool.checkout()
+        threading.Timer(0.05, held.close).start()
+        with pool.connection() as conn:
+            self.assertTrue(conn.is_connected())
+        self.assertEqual(len(self.created), 1)
+
+    def test_stale_connection_is_replaced_by_pre_ping(self):
+        pool = ConnectionPool(self._creator, pool_size=1, max_overflow=0, pre_ping=True)
+        pool.checkout().close()
+        self.created[0].alive = False
+        with pool.connection():
+            pass
+        self.assertEqual(len(self.created), 2)
+        self.assertTrue(self.created[0].closed)
+
+    def test_connection_is_recycled_after_max_age(self):
+        pool = ConnectionPool(self._creator, pool_size=1, max_overflow=0, recycle=0.01, pre_ping=False)
+        pool.checkout().close()
+        time.sleep(0.02)
+        pool.checkout().close()
+        self.assertEqual(len(self.created), 2)
+
+    def test_open_transaction_is_rolled_back_on_return(self):
+        pool = ConnectionPool(self._creator, pool_size=1, max_overflow=0)
+        conn = pool.checkout()
+        self.created[0].in_transaction = True
+        conn.close()
+        self.assertEqual(self.created[0].rollbacks, 1)
+
+    def test_failed_connect_does_not_leak_a_slot(self):
+        def failing_creator():
+            raise RuntimeError("cannot connect")
+        pool = ConnectionPool(failing_creator, pool_size=1, max_overflow=0, timeout=0.05)
+        for _ in range(2):
+            with self.assertRaises(RuntimeError):
+                pool.checkout()
+        self.assertEqual(pool.stats()["open"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
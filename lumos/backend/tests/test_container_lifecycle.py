@@ -0,0 +1,172 @@
+import unittest
+import asyncio
+import aiohttp
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.container_lifecycle import ContainerLifecycle, parse_memory
+from app.services.export_job_store import ExportJobStore
+from app.services.image_cache import ImageCache
+from app.services.route_registry import RouteAccessTracker, RouteRegistry
+from app.services.warm_pool import WarmPool
+from app.utils.config_bundle import encode_config
+from tests import fake_docker
+
+
+class TestContainerLifecycle(fake_docker.FakeDockerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pool = WarmPool(ImageCache(self.context, repository="ui"), min_size=0, max_size=0)
+        self.routes = RouteRegistry(os.path.join(self.tmp.name, "route_map.json"))
+        self.store = ExportJobStore(os.path.join(self.tmp.name, "jobs.sqlite3"))
+        self.access = RouteAccessTracker(self.routes.path + ".access")
+
+    def _lifecycle(self, **options):
+        return ContainerLifecycle(self.store, self.routes, self.pool, self.access.path, **options)
+
+    async def _deploy(self, lifecycle, route):
+        instance = await self.pool.claim()
+        bundle = encode_config({"project": {"name": route}})
+        await self.pool.configure(instance, bundle)
+        self.routes.add(route, instance.url)
+        await lifecycle.register(route, instance.name, instance.url, bundle)
+        return instance
+
+    def _containers(self):
+        return set(fake_docker.read_state(self.env)["containers"])
+
+    def test_idle_exports_are_parked(self):
+        lifecycle = self._lifecycle(idle_ttl=0.3)
+
+        async def scenario():
+            idle = await self._deploy(lifecycle, "ui_idle")
+            used = await self._deploy(lifecycle, "ui_used")
+            await asyncio.sleep(0.4)
+            self.access.touch("ui_used")
+            self.access.flush()
+            await lifecycle.sweep()
+            await self.pool.shutdown()
+            return idle, used
+
+        idle, used = asyncio.run(scenario())
+        self.assertTrue(self.routes.is_parked("ui_idle"))
+        self.assertEqual(self.routes.lookup("ui_used"), used.url)
+        self.assertEqual(self._containers(), {used.name})
+        self.assertEqual(self.store.get_deployment("ui_idle")["state"], "parked")
+        stats = lifecycle.stats()
+        self.assertEqual((stats["running"], stats["parked"], stats["parked_idle"]), (1, 1, 1))
+        self.assertEqual(stats["reclaimed_bytes"], 10 * 1024 * 1024)
+
+    def test_least_recently_used_exports_are_parked_over_capacity(self):
+        lifecycle = self._lifecycle(max_containers=2)
+
+        async def scenario():
+            instances = [await self._deploy(lifecycle, f"ui_{i}") for i in range(3)]
+            # ui_0 was started first but requested last
+            self.access.touch("ui_0")
+            self.access.flush()
+            await lifecycle.sweep()
+            await self.pool.shutdown()
+            return instances
+
+        instances = asyncio.run(scenario())
+        self.assertTrue(self.routes.is_parked("ui_1"))
+        self.assertEqual(self._containers(), {instances[0].name, instances[2].name})
+        self.assertEqual(lifecycle.stats()["parked_for_capacity"], 1)
+
+    def test_exports_are_parked_over_the_memory_budget(self):
+        lifecycle = self._lifecycle(memory_budget=150 * 1024 * 1024)
+
+        async def scenario():
+            instances = [await self._deploy(lifecycle, f"ui_{i}") for i in range(3)]
+            state = fake_docker.read_state(self.env)
+            for instance, memory in zip(instances, ["100MiB", "40MiB", "30MiB"]):
+                state["containers"][instance.name]["memory"] = memory
+            fake_docker.write_state(self.env, state)
+            await lifecycle.sweep()
+            await self.pool.shutdown()
+            return instances
+
+        instances = asyncio.run(scenario())
+        self.assertEqual(self._containers(), {instances[1].name, instances[2].name})
+        stats = lifecycle.stats()
+        self.assertEqual(stats["memory_bytes"], 70 * 1024 * 1024)
+        self.assertEqual(stats["reclaimed_bytes"], 100 * 1024 * 1024)
+
+    def test_parked_export_wakes_with_its_config(self):
+        lifecycle = self._lifecycle(idle_ttl=0)
+
+        async def scenario():
+            old = await self._deploy(lifecycle, "ui_a")
+            await lifecycle.sweep()
+            urls = await asyncio.gather(*(lifecycle.wake("ui_a") for _ in range(5)))
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"{urls[0]}/_admin/config") as resp:
+                    config = await resp.json()
+            missing = await lifecycle.wake("ui_missing")
+            await self.pool.shutdown()
+            return old, urls, config, missing
+
+        old, urls, config, missing = asyncio.run(scenario())
+        self.assertEqual(len(set(urls)), 1)
+        self.assertEqual(config, {"project": {"name": "ui_a"}})
+        self.assertIsNone(missing)
+        self.assertEqual(self.routes.lookup("ui_a"), urls[0])
+        self.assertFalse(self.routes.is_parked("ui_a"))
+        # the concurrent wakes shared one container
+        self.assertEqual(len(fake_docker.calls(self.env, "run")), 2)
+        self.assertNotIn(old.name, self._containers())
+        deployment = self.store.get_deployment("ui_a")
+        self.assertEqual((deployment["state"], deployment["url"]), ("running", urls[0]))
+        self.assertEqual(lifecycle.stats()["wakes"], 1)
+
+    def test_export_released_while_waking_leaves_no_container(self):
+        lifecycle = self._lifecycle(idle_ttl=0)
+        configure = self.pool.configure
+
+        async def release_then_configure(instance, bundle):
+            # the last export using it is released while its container starts
+            self.store.release_deployment("ui_a")
+            await configure(instance, bundle)
+
+        async def scenario():
+            await self._deploy(lifecycle, "ui_a")
+            await lifecycle.sweep()
+            self.pool.configure = release_then_configure
+            url = await lifecycle.wake("ui_a")
+            await self.pool.shutdown()
+            return url
+
+        self.assertIsNone(asyncio.run(scenario()))
+        self.assertEqual(self._containers(), set())
+        self.assertIsNone(self.store.get_deployment("ui_a"))
+
+    def test_export_released_while_parking_leaves_no_route(self):
+        lifecycle = self._lifecycle(idle_ttl=0)
+        claim = self.store.claim_deployment
+
+        def claim_then_release(route, from_state, to_state):
+            claimed = claim(route, from_state, to_state)
+            # the last export using it is released, as ProjectService does
+            self.store.release_deployment(route)
+            self.routes.remove(route)
+            return claimed
+
+        async def scenario():
+            await self._deploy(lifecycle, "ui_a")
+            self.store.claim_deployment = claim_then_release
+            await lifecycle.sweep()
+            await self.pool.shutdown()
+
+        asyncio.run(scenario())
+        self.assertIsNone(self.store.get_deployment("ui_a"))
+        self.assertNotIn("ui_a", self.routes.routes())
+        self.assertEqual(self._containers(), set())
+
+    def test_parse_memory(self):
+        self.assertEqual(parse_memory("45.5MiB / 7.6GiB"), int(45.5 * 1024 * 1024))
+        self.assertEqual(parse_memory("1.2GB / 8GB"), 1_200_000_000)
+        self.assertEqual(parse_memory("--"), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
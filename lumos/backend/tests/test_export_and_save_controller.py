@@ -14,11 +14,18 @@ class TestExportAndSaveController(unittest.TestCase):
                 return await client.post(path, json=payload)
         return asyncio.run(_do())
 
+    @staticmethod
+    def _get(path):
+        async def _do():
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                return await client.get(path)
+        return asyncio.run(_do())
+
     @patch('app.controllers.export_controller.service')
     def test_export_project_success(self, mock_service):
         mock_service.export_project = AsyncMock(return_value={'ngrok_url': 'http://example', 'status': 'success'})
         payload = {"project": {"name": "test", "version": "1.0", "description": "desc", "authors": []}, "agents": [], "interactions": []}
-        response = self._post("/api/export", payload)
+        response = self._post("/api/export?wait=true", payload)
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json().get("url"), 'http://example')
 
@@ -26,12 +33,84 @@ class TestExportAndSaveController(unittest.TestCase):
     def test_export_project_error(self, mock_service):
         mock_service.export_project = AsyncMock(return_value={'ngrok_url': '', 'status': 'error: fail'})
         payload = {"project": {"name": "test", "version": "1.0", "description": "desc", "authors": []}, "agents": [], "interactions": []}
-        response = self._post("/api/export", payload)
+        response = self._post("/api/export?wait=true", payload)
         self.assertEqual(response.status_code, 400)
 
+    @patch('app.controllers.export_controller.service')
+    def test_export_project_priority_and_tenant(self, mock_service):
+        mock_service.export_project = AsyncMock(return_value={'ngrok_url': 'http://example', 'status': 'success'})
+        payload = {"project": {"name": "test", "version": "1.0", "description": "desc", "authors": []}, "agents": [], "interactions": []}
+
+        async def _do():
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                return await client.post("/api/export?priority=5&wait=true", json=payload, headers={"X-Tenant-ID": "acme"})
+        self.assertEqual(asyncio.run(_do()).status_code, 200)
+        _, kwargs = mock_service.export_project.call_args
+        self.assertEqual((kwargs["priority"], kwargs["tenant"]), (5, "acme"))
+
+    @patch('app.controllers.export_controller.service')
+    def test_cancel_unknown_export(self, mock_service):
+        mock_service.cancel_export = AsyncMock(return_value={'status': 'error', 'message': 'No queued or running export'})
+
+        async def _do():
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                return await client.delete("/api/export/abc")
+        self.assertEqual(asyncio.run(_do()).status_code, 404)
+        mock_service.cancel_export.assert_called_once_with("abc")
+
+    @patch('app.controllers.export_controller.service')
+    def test_scale_route(self, mock_service):
+        mock_service.scale_route = AsyncMock(return_value={'status': 'success', 'route': 'ui_a', 'replicas': ['u1', 'u2']})
+        response = self._post("/api/routes/ui_a/scale", {"replicas": 2})
+        self.assertEqual((response.status_code, response.json()["replicas"]), (200, ['u1', 'u2']))
+        mock_service.scale_route.assert_called_once_with("ui_a", 2)
+        mock_service.scale_route = AsyncMock(return_value={
+            'status': 'error', 'error': 'conflict', 'message': 'Export ui_a is parked; only running exports can be scaled'})
+        self.assertEqual(self._post("/api/routes/ui_a/scale", {"replicas": 2}).status_code, 409)
+        mock_service.scale_route = AsyncMock(return_value={
+            'status': 'error', 'error': 'not_found', 'message': 'No export is deployed at ui_b'})
+        self.assertEqual(self._post("/api/routes/ui_b/scale", {"replicas": 2}).status_code, 404)
+        # e.g. docker failing to start a replica
+        mock_service.scale_route = AsyncMock(return_value={'status': 'error', 'message': 'No space left on device'})
+        self.assertEqual(self._post("/api/routes/ui_a/scale", {"replicas": 2}).status_code, 500)
+
+    @patch('app.controllers.export_controller.service')
+    def test_export_returns_a_job_id(self, mock_service):
+        mock_service.submit_export.return_value = {'status': 'success', 'job_id': 'abc123', 'state': 'queued'}
+        payload = {"project": {"name": "test", "version": "1.0", "description": "desc", "authors": []}, "agents": [], "interactions": []}
+        response = self._post("/api/export", payload)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["job_id"], 'abc123')
+        self.assertEqual(response.json()["events_url"], '/api/export/abc123/events')
+
+    @patch('app.controllers.export_controller.service')
+    def test_get_unknown_export_job(self, mock_service):
+        mock_service.get_export_job = AsyncMock(return_value={'status': 'error', 'message': 'No export job with ID abc'})
+        self.assertEqual(self._get("/api/export/abc").status_code, 404)
+
+    @patch('app.controllers.export_controller.service')
+    def test_export_events_stream(self, mock_service):
+        mock_service.get_export_job = AsyncMock(return_value={'status': 'success', 'job': {'job_id': 'abc'}})
+
+        async def events(job_id, after_seq):
+            for seq, stage in enumerate(["running", "public_url", "succeeded"], start=after_seq + 1):
+                yield {"seq": seq, "stage": stage, "state": "running", "data": {}, "at": 0}
+
+        mock_service.export_events = events
+
+        async def _do():
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                return await client.get("/api/export/abc/events", headers={"Last-Event-ID": "1"})
+        response = asyncio.run(_do())
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        self.assertEqual([line for line in response.text.splitlines() if line.startswith("event:")],
+                         ["event: running", "event: public_url", "event: succeeded"])
+        self.assertIn("id: 2", response.text)
+
     @patch('app.controllers.export_controller.service')
     def test_save_project_success(self, mock_service):
-        mock_service.save_project.return_value = {'status': 'success', 'project_id': 1}
+        mock_service.save_project_async = AsyncMock(return_value={'status': 'success', 'project_id': 1})
         payload = {"project": {"name": "test", "version": "1.0", "description": "desc", "authors": []}, "agents": [], "tools": [], "tasks": [], "connections": []}
         response = self._post("/api/save", payload)
         self.assertEqual(response.status_code, 200)
@@ -39,7 +118,98 @@ class TestExportAndSaveController(unittest.TestCase):
 
     @patch('app.controllers.export_controller.service')
     def test_save_project_error(self, mock_service):
-        mock_service.save_project.return_value = {'status': 'error', 'message': 'fail'}
+        mock_service.save_project_async = AsyncMock(return_value={'status': 'error', 'message': 'fail'})
         payload = {"project": {"name": "test", "version": "1.0", "description": "desc", "authors": []}, "agents": [], "tools": [], "tasks": [], "connections": []}
         response = self._post("/api/save", payload)
-        self.assertEqual(response.status_code, 400)
\ No newline at end of file
+        self.assertEqual(response.status_code, 400)
+
+    @patch('app.controllers.export_controller.service')
+    def test_get_projects_page(self, mock_service):
+        mock_service.get_projects_page_async = AsyncMock(return_value={'status': 'success', 'projects': [{'id': 3}], 'next_after_id': 3})
+        response = self._get("/api/projects?after_id=2&limit=1&sort=created_at&fields=name")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json().get('next_after_id'), 3)
+        mock_service.get_projects_page_async.assert_awaited_once_with(2, 1, 'created_at', ['name'])
+
+    @patch('app.controllers.export_controller.service')
+    def test_get_projects_stream(self, mock_service):
+        rows = [{'id': i, 'name': f'p{i}'} for i in range(450)]
+        mock_service.iter_projects.return_value = iter(rows)
+        response = self._get("/api/projects?stream=true")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'success', 'projects': rows})
+
+    @patch('app.controllers.export_controller.service')
+    def test_get_projects_invalid_sort(self, mock_service):
+        mock_service.iter_projects.side_effect = ValueError("Unsupported sort key 'name'")
+        response = self._get("/api/projects?stream=true&sort=name")
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_projects_page_invalid_sort_or_fields(self):
+        # rejected by the service before the storage is queried
+        self.assertEqual(self._get("/api/projects?sort=name").status_code, 400)
+        self.assertEqual(self._get("/api/projects?limit=5&fields=name,secret").status_code, 400)
+
+    @patch('app.controllers.export_controller.service')
+    def test_get_latest_and_numbered_versions(self, mock_service):
+        mock_service.get_version_async = AsyncMock(return_value={'status': 'success', 'version': 2, 'document': {}})
+        self.assertEqual(self._get("/api/projects/7/versions/latest").status_code, 200)
+        mock_service.get_version_async.assert_awaited_with(7, None)
+        self.assertEqual(self._get("/api/projects/7/versions/1").status_code, 200)
+        mock_service.get_version_async.assert_awaited_with(7, 1)
+
+    @patch('app.controllers.export_controller.service')
+    def test_diff_versions(self, mock_service):
+        mock_service.diff_versions_async = AsyncMock(return_value={'status': 'error', 'message': 'not found'})
+        response = self._get("/api/projects/7/versions/diff?from_version=1&to_version=3")
+        self.assertEqual(response.status_code, 404)
+        mock_service.diff_versions_async.assert_awaited_once_with(7, 1, 3)
+
+    @patch('app.controllers.export_controller.service')
+    def test_versions_and_search_unsupported_by_the_backend(self, mock_service):
+        unsupported = {'status': 'error', 'error': 'unsupported', 'message': 'not supported'}
+        mock_service.list_versions_async = AsyncMock(return_value=unsupported)
+        mock_service.get_version_async = AsyncMock(return_value=unsupported)
+        mock_service.search_async = AsyncMock(return_value=unsupported)
+        self.assertEqual(self._get("/api/projects/7/versions").status_code, 501)
+        self.assertEqual(self._get("/api/projects/7/versions/latest").status_code, 501)
+        self.assertEqual(self._get("/api/search?q=agent").status_code, 501)
+
+    @patch('app.controllers.export_controller.bulk_service')
+    def test_import_projects_reports_line_errors(self, mock_bulk):
+        async def results(lines, batch_size):
+            async for line in lines:
+                yield {"line": 1, "status": "success", "project_id": 1} if line == b"ok" else \
+                      {"line": 2, "status": "error", "message": "Invalid JSON"}
+
+        mock_bulk.import_lines_async = results
+
+        async def _do():
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                return await client.post("/api/projects/import", content=b"ok\nbad\n")
+        response = asyncio.run(_do())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["imported"], 1)
+        self.assertEqual(response.json()["errors"], [{"line": 2, "message": "Invalid JSON"}])
+
+    @patch('app.controllers.export_controller.bulk_service')
+    def test_export_projects_streams_ndjson(self, mock_bulk):
+        mock_bulk.export_lines.return_value = iter([b'{"project": {"id": 1}}\n', b'{"project": {"id": 2}}\n'])
+        response = self._get("/api/projects/export?after_id=5&chunk_size=2")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        self.assertEqual(len(response.text.splitlines()), 2)
+        mock_bulk.export_lines.assert_called_once_with(5, 2)
+
+    @patch('app.controllers.export_controller.service')
+    def test_search(self, mock_service):
+        mock_service.search_async = AsyncMock(return_value={'status': 'success', 'results': [], 'next_offset': None})
+        response = self._get("/api/search?q=fact+checker&kind=agent&limit=5")
+        self.assertEqual(response.status_code, 200)
+        mock_service.search_async.assert_awaited_once_with(
+            'fact checker', {'kind': 'agent', 'type': None, 'subtype': None, 'capability': None}, 5, 0)
+
+    @patch('app.controllers.export_controller.service')
+    def test_search_without_query_or_filters(self, mock_service):
+        mock_service.search_async = AsyncMock(side_effect=ValueError("Search needs a query"))
+        self.assertEqual(self._get("/api/search").status_code, 400)
@@ -0,0 +1,128 @@
+import unittest
+import asyncio
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.schemas.project_schema import ProjectExport
+from app.services.project_service import ProjectService, export_config, export_key
+from tests import fake_docker
+from tests.test_tunnel_resolver import FakeNgrokAPI
+
+
+def _project(name="demo"):
+    return ProjectExport(project={"name": name, "version": "1.0", "description": "desc", "authors": []})
+
+
+class TestExportDeduplication(fake_docker.FakeDockerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.setenv(
+            UI_APP_CONTEXT=self.context,
+            WARM_POOL_MIN_SIZE="0",
+            EXPORT_JOB_STORE_PATH=os.path.join(self.tmp.name, "jobs.sqlite3"),
+            ROUTE_MAP_PATH=os.path.join(self.tmp.name, "route_map.json"),
+            EXPORT_COMMAND_LOG=os.path.join(self.tmp.name, "commands.log"),
+        )
+
+    def _run(self, scenario):
+        async def run():
+            api = FakeNgrokAPI()
+            api.tunnels = [{"public_url": "https://abc.ngrok.app"}]
+            await api.start()
+            self.setenv(NGROK_API_URL=api.url)
+            service = ProjectService()
+            await service.start_exports()
+            try:
+                return await scenario(service)
+            finally:
+                await service.shutdown_exports()
+                await service.warm_pool.shutdown()
+                await service.tunnels.shutdown()
+                await api.stop()
+        return asyncio.run(run())
+
+    def test_export_key_ignores_key_order(self):
+        config = export_config(_project().dict())
+        reordered = {key: config[key] for key in reversed(list(config))}
+        self.assertEqual(export_key(config), export_key(reordered))
+        self.assertNotEqual(export_key(config), export_key(export_config(_project("other").dict())))
+
+    def test_identical_exports_share_one_container(self):
+        async def scenario(service):
+            concurrent = await asyncio.gather(*(service.export_project(_project()) for _ in range(3)))
+            later = service.submit_export(_project())
+            await service.scheduler.get(later["job_id"]).future
+            other = await service.export_project(_project("other"))
+            refs = service.job_store.get_deployment(concurrent[0]["container"])["refs"]
+            return concurrent, refs, other, service.scheduler.stats()
+
+        concurrent, refs, other, stats = self._run(scenario)
+        self.assertEqual({r["status"] for r in concurrent}, {"success"})
+        self.assertEqual(len({r["ngrok_url"] for r in concurrent}), 1)
+        self.assertEqual(stats["coalesced"], 2)
+        # the coalesced exports hold one reference, the later one another
+        self.assertEqual(refs, 2)
+        # one container for the demo project, one for the other
+        self.assertEqual(len(fake_docker.calls(self.env, "run")), 2)
+        self.assertNotEqual(other["container"], concurrent[0]["container"])
+        self.assertEqual(fake_docker.read_state(self.env)["containers"].keys(),
+                         {concurrent[0]["container"], other["container"]})
+
+    def test_released_exports_remove_the_container_with_the_last_reference(self):
+        async def scenario(service):
+            first = service.submit_export(_project())
+            await service.scheduler.get(first["job_id"]).future
+            second = service.submit_export(_project())
+            result = await service.scheduler.get(second["job_id"]).future
+            container = result["container"]
+            refs = service.job_store.get_deployment(container)["refs"]
+
+            released = await service.cancel_export(first["job_id"])
+            again = await service.cancel_export(first["job_id"])
+            still_running = container in fake_docker.read_state(self.env)["containers"]
+            last = await service.cancel_export(second["job_id"])
+            return container, refs, released, again, still_running, last, service.routes.lookup(container)
+
+        container, refs, released, again, still_running, last, route = self._run(scenario)
+        self.assertEqual(refs, 2)
+        self.assertEqual((released["state"], released["refs"]), ("released", 1))
+        self.assertEqual(again["status"], "error")
+        self.assertTrue(still_running)
+        self.assertEqual(last["refs"], 0)
+        self.assertNotIn(container, fake_docker.read_state(self.env)["containers"])
+        self.assertIsNone(route)
+
+    def test_merged_export_is_cancelled_by_its_last_submitter(self):
+        async def scenario(service):
+            configuring = asyncio.Event()
+
+            async def configure_slowly(instance, bundle):
+                configuring.set()
+                await asyncio.sleep(10)
+
+            service.warm_pool.configure = configure_slowly
+            first = service.submit_export(_project())
+            second = service.submit_export(_project())
+            job = service.scheduler.get(first["job_id"])
+            # the container is started and being configured
+            await configuring.wait()
+            withdrawn = await service.cancel_export(first["job_id"])
+            state_after_one = job.state
+            cancelled = await service.cancel_export(second["job_id"])
+            try:
+                await job.future
+            except Exception:
+                pass
+            return second, withdrawn, state_after_one, cancelled, job.state
+
+        second, withdrawn, state_after_one, cancelled, state = self._run(scenario)
+        self.assertEqual(second["job_id"], withdrawn["job_id"])
+        # the other submitter still waits for it
+        self.assertEqual(withdrawn["requests"], 1)
+        self.assertNotEqual(state_after_one, "cancelled")
+        self.assertEqual(cancelled["state"], "cancelled")
+        self.assertEqual(state, "cancelled")
+        self.assertEqual(fake_docker.read_state(self.env)["containers"], {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.export_job_store import ExportJobStore
+from app.services.export_scheduler import ExportScheduler
+from app.utils.config_bundle import encode_config
+
+
+class TestExportJobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "jobs.sqlite3")
+        self.store = ExportJobStore(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    async def _runner(self, job):
+        job.container = "ui_abc"
+        job.report("container_started", container="ui_abc")
+        await asyncio.sleep(0)
+        job.report("public_url", url="https://example.ngrok.app/ui_abc")
+        return {"container": "ui_abc", "ngrok_url": "https://example.ngrok.app/ui_abc"}
+
+    def _run(self, payload, flush=True):
+        scheduler = ExportScheduler(self._runner, listener=self.store.record)
+
+        async def scenario():
+            job = scheduler.submit(payload, tenant="acme")
+            await job.future
+            return job
+
+        job = asyncio.run(scenario())
+        if flush:
+            self.store.flush()
+        return job
+
+    def test_job_progress_is_readable_from_another_store(self):
+        job = self._run({"project": {"name": "p"}})
+        other_worker = ExportJobStore(self.path)
+        stored = other_worker.get(job.id)
+        self.assertEqual((stored["state"], stored["tenant"], stored["container"]), ("succeeded", "acme", "ui_abc"))
+        self.assertTrue(stored["finished"])
+        self.assertEqual(stored["result"]["ngrok_url"], "https://example.ngrok.app/ui_abc")
+        self.assertEqual([event["stage"] for event in other_worker.events(job.id)],
+                         ["queued", "running", "container_started", "public_url", "succeeded"])
+        self.assertEqual([event["seq"] for event in other_worker.events(job.id, after_seq=3)], [4, 5])
+        self.assertIsNone(other_worker.get("missing"))
+
+    def test_recording_does_not_wait_for_the_database(self):
+        locker = sqlite3.connect(self.path, isolation_level=None)
+        self.store.get("missing")
+        # another worker holds the write lock
+        locker.execute("BEGIN IMMEDIATE")
+        started = time.monotonic()
+        job = self._run({"project": {"name": "p"}}, flush=False)
+        elapsed = time.monotonic() - started
+        locker.execute("COMMIT")
+        locker.close()
+        self.assertLess(elapsed, 1)
+        self.store.flush()
+        self.assertEqual(self.store.get(job.id)["state"], "succeeded")
+        self.assertEqual(len(self.store.events(job.id)), 5)
+
+    def _leave_unfinished(self, store):
+        """Leave a job queued in the store, as a worker shutting down does."""
+        async def blocked(job):
+            await asyncio.Event().wait()
+
+        async def scenario():
+            scheduler = ExportScheduler(blocked, max_concurrent=1, listener=store.record)
+            scheduler.submit({"project": {"name": "running"}})
+            job = scheduler.submit({"project": {"name": "queued"}})
+            await asyncio.sleep(0)
+            await scheduler.shutdown(cancel_queued=False)
+            return job
+
+        job = asyncio.run(scenario())
+        store.flush()
+        return job
+
+    def test_unfinished_jobs_of_a_dead_worker_are_recovered_once(self):
+        dead_worker = ExportJobStore(self.path)
+        dead_worker.heartbeat()
+        job = self._leave_unfinished(dead_worker)
+        # a restarted worker has the same host and pid, but not the same boot id
+        restarted = ExportJobStore(self.path, lease=0.2)
+        self.assertNotEqual(restarted.owner, dead_worker.owner)
+        restarted.heartbeat()
+        # the dead worker's lease has not run out yet
+        self.assertEqual(restarted.recover(), [])
+        time.sleep(0.3)
+
+        recovered = restarted.recover()
+        self.assertEqual([(r["job_id"], r["state"], r["payload"]) for r in recovered],
+                         [(job.id, "queued", {"project": {"name": "queued"}})])
+        self.assertEqual(ExportJobStore(self.path).recover(), [])
+        self.store = restarted
+
+        self.store.fail(job.id, "Interrupted by a worker restart")
+        self.assertEqual(self.store.get(job.id)["state"], "failed")
+        self.assertEqual(self.store.events(job.id)[-1]["data"], {"error": "Interrupted by a worker restart"})
+
+    def test_jobs_of_live_workers_are_not_recovered(self):
+        live_worker = ExportJobStore(self.path)
+        live_worker.heartbeat()
+        self._leave_unfinished(live_worker)
+        remote_worker = ExportJobStore(self.path)
+        remote_worker.owner = "another-host:1:0123456789ab"
+        remote_worker.heartbeat()
+        self._leave_unfinished(remote_worker)
+        self.assertEqual(self.store.recover(), [])
+
+    def test_prune_removes_old_finished_jobs(self):
+        job = self._run({"project": {"name": "p"}})
+        self.assertEqual(self.store.prune(3600), 0)
+        self.assertEqual(self.store.prune(-1), 1)
+        self.assertIsNone(self.store.get(job.id))
+        self.assertEqual(self.store.events(job.id), [])
+
+
+    def test_jobs_of_a_retired_worker_are_recovered_right_away(self):
+        worker = ExportJobStore(self.path)
+        worker.heartbeat()
+        job = self._leave_unfinished(worker)
+        self.assertEqual(self.store.recover(), [])
+        worker.retire()
+        self.assertEqual([r["job_id"] for r in self.store.recover()], [job.id])
+
+    def test_identical_exports_share_a_deployment_until_all_are_released(self):
+        bundle = encode_config({"project": {"name": "p"}})
+        self.store.save_deployment("ui_abc", "ui_abc", "http://localhost:5001", bundle)
+        first = self._run({"project": {"name": "p"}})
+        other_worker = ExportJobStore(self.path)
+        self.assertEqual(other_worker.get_deployment("ui_abc")["config"], bundle)
+        shared = other_worker.acquire_deployment(bundle.version)
+        self.assertEqual((shared["route"], shared["refs"]), ("ui_abc", 2))
+        self.assertIsNone(other_worker.acquire_deployment("unknown"))
+        second = self._run({"project": {"name": "p"}})
+
+        self.assertEqual(self.store.release_export(first.id), {"route": "ui_abc", "refs": 1, "deployment": None})
+        self.assertIsNone(other_worker.release_export(first.id))
+        self.assertEqual(self.store.get(first.id)["stage"], "released")
+        self.store.add_replica("ui_abc", "ui_abc_r1", "http://localhost:5002")
+        released = other_worker.release_export(second.id)
+        self.assertEqual((released["route"], released["refs"]), ("ui_abc", 0))
+        self.assertEqual((released["deployment"]["container"], released["deployment"]["state"]), ("ui_abc", "running"))
+        self.assertEqual([r["container"] for r in released["deployment"]["replicas"]], ["ui_abc_r1"])
+        # deleted with the last reference, so nobody acquires it while it is removed
+        self.assertIsNone(self.store.get_deployment("ui_abc"))
+        self.assertEqual(self.store.replicas("ui_abc"), [])
+        self.assertIsNone(self.store.acquire_deployment(bundle.version))
+        self.assertIsNone(self.store.release_export("missing"))
+
+    def test_released_deployments_are_not_acquired(self):
+        bundle = encode_config({"project": {"name": "p"}})
+        self.store.save_deployment("ui_abc", "ui_abc", "http://localhost:5001", bundle)
+        released = self.store.release_deployment("ui_abc")
+        self.assertEqual(released["deployment"]["container"], "ui_abc")
+        self.assertIsNone(self.store.acquire_deployment(bundle.version))
+        self.assertEqual(self.store.release_deployment("ui_abc"), {"route": "ui_abc", "refs": 0, "deployment": None})
+
+if __name__ == '__main__':
+    unittest.main()
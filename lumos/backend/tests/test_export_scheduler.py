@@ -0,0 +1,215 @@
+import unittest
+import asyncio
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.export_scheduler import ExportScheduler, ExportCancelled, ExportTimeout
+
+
+class TestExportScheduler(unittest.TestCase):
+    def setUp(self):
+        self.order = []
+        self.running = 0
+        self.peak = 0
+        self.removed = []
+
+    async def _runner(self, job):
+        self.order.append(job.payload)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            job.container = f"ui_{job.payload}"
+            await asyncio.sleep(job.payload.get("seconds", 0.05) if isinstance(job.payload, dict) else 0.05)
+            return {"container": job.container}
+        finally:
+            self.running -= 1
+
+    async def _cleanup(self, job):
+        self.removed.append(job.container)
+
+    def _scheduler(self, **kwargs):
+        return ExportScheduler(self._runner, cleanup=self._cleanup, **kwargs)
+
+    def test_runs_up_to_max_concurrent_exports_at_once(self):
+        scheduler = self._scheduler(max_concurrent=3)
+
+        async def scenario():
+            jobs = [scheduler.submit(i) for i in range(7)]
+            return await asyncio.gather(*(job.future for job in jobs))
+
+        results = asyncio.run(scenario())
+        self.assertEqual([r["container"] for r in results], [f"ui_{i}" for i in range(7)])
+        self.assertEqual(self.peak, 3)
+        stats = scheduler.stats()
+        self.assertEqual((stats["succeeded"], stats["queued"], stats["running"]), (7, 0, 0))
+        self.assertGreater(stats["p95_wait_time"], 0)
+        self.assertGreater(stats["avg_run_time"], 0)
+
+    def test_higher_priority_runs_first(self):
+        scheduler = self._scheduler(max_concurrent=1)
+
+        async def scenario():
+            jobs = [scheduler.submit("first")]
+            jobs += [scheduler.submit("low", priority=-1), scheduler.submit("normal"),
+                     scheduler.submit("urgent", priority=5)]
+            await asyncio.gather(*(job.future for job in jobs))
+
+        asyncio.run(scenario())
+        self.assertEqual(self.order, ["first", "urgent", "normal", "low"])
+
+    def test_tenants_take_turns(self):
+        scheduler = self._scheduler(max_concurrent=1)
+
+        async def scenario():
+            jobs = [scheduler.submit(f"a{i}", tenant="a") for i in range(3)]
+            jobs += [scheduler.submit(f"b{i}", tenant="b") for i in range(2)]
+            await asyncio.gather(*(job.future for job in jobs))
+
+        asyncio.run(scenario())
+        self.assertEqual(self.order, ["a0", "b0", "a1", "b1", "a2"])
+
+    def test_timed_out_export_is_cleaned_up(self):
+        scheduler = self._scheduler(max_concurrent=1, timeout=0.1)
+
+        async def scenario():
+            slow = scheduler.submit({"seconds": 5})
+            after = scheduler.submit("next")
+            with self.assertRaises(ExportTimeout):
+                await slow.future
+            return await after.future
+
+        self.assertEqual(asyncio.run(scenario()), {"container": "ui_next"})
+        self.assertEqual(len(self.removed), 1)
+        self.assertEqual(scheduler.stats()["timed_out"], 1)
+
+    def test_cancel_queued_and_running_exports(self):
+        scheduler = self._scheduler(max_concurrent=1)
+
+        async def scenario():
+            running = scheduler.submit({"seconds": 5})
+            queued = scheduler.submit("queued")
+            self.assertTrue(scheduler.cancel(queued.id))
+            await asyncio.sleep(0.01)
+            self.assertTrue(scheduler.cancel(running.id))
+            for job in (queued, running):
+                with self.assertRaises(ExportCancelled):
+                    await job.future
+            self.assertFalse(scheduler.cancel(running.id))
+            return running, queued
+
+        running, queued = asyncio.run(scenario())
+        self.assertEqual((running.state, queued.state), ("cancelled", "cancelled"))
+        # only the running export had a container to remove; the queued one never ran
+        self.assertEqual(self.removed, [running.container])
+        self.assertEqual(len(self.order), 1)
+        self.assertEqual(scheduler.stats()["cancelled"], 2)
+
+    def test_export_cancelled_before_it_starts_frees_its_slot(self):
+        scheduler = self._scheduler(max_concurrent=1)
+
+        async def scenario():
+            first = scheduler.submit({"seconds": 5})
+            # dispatched, but its task has not run yet
+            self.assertTrue(scheduler.cancel(first.id))
+            with self.assertRaises(ExportCancelled):
+                await first.future
+            return first, await scheduler.submit("next").future
+
+        first, result = asyncio.run(scenario())
+        self.assertEqual(first.state, "cancelled")
+        self.assertEqual(result, {"container": "ui_next"})
+
+    def test_failed_export_reports_its_error(self):
+        async def failing(job):
+            job.container = "ui_failed"
+            raise RuntimeError("Ngrok tunnel not found")
+
+        scheduler = ExportScheduler(failing, cleanup=self._cleanup)
+
+        async def scenario():
+            job = scheduler.submit("x")
+            with self.assertRaises(RuntimeError):
+                await job.future
+
+        asyncio.run(scenario())
+        self.assertEqual(self.removed, ["ui_failed"])
+        self.assertEqual(scheduler.jobs()[0]["error"], "Ngrok tunnel not found")
+
+    def test_identical_exports_share_one_job(self):
+        scheduler = self._scheduler(max_concurrent=1)
+
+        async def scenario():
+            first = scheduler.submit({"seconds": 0.1}, key="k")
+            again = scheduler.submit({"seconds": 0.1}, key="k")
+            other = scheduler.submit("other", key="other")
+            results = await asyncio.gather(first.future, again.future, other.future)
+            # a finished job is not joined
+            later = scheduler.submit({"seconds": 0.1}, key="k")
+            await later.future
+            return first, again, later, results
+
+        first, again, later, results = asyncio.run(scenario())
+        self.assertIs(first, again)
+        self.assertIsNot(first, later)
+        self.assertEqual(first.requests, 2)
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(len(self.order), 3)
+        self.assertEqual(scheduler.stats()["coalesced"], 1)
+
+    def test_shared_job_runs_until_every_submitter_abandons_it(self):
+        scheduler = self._scheduler(max_concurrent=1)
+
+        async def scenario():
+            job = scheduler.submit({"seconds": 5}, key="k")
+            scheduler.submit({"seconds": 5}, key="k")
+            await asyncio.sleep(0.01)
+            self.assertFalse(scheduler.abandon(job.id))
+            self.assertEqual(job.state, "running")
+            self.assertTrue(scheduler.abandon(job.id))
+            with self.assertRaises(ExportCancelled):
+                await job.future
+
+        asyncio.run(scenario())
+
+    def test_command_output_reaches_subscribers_but_is_not_recorded(self):
+        recorded = []
+
+        async def building(job):
+            job.output("stdout", "Step 1/2 : FROM python")
+            job.report("image_ready")
+            return {}
+
+        scheduler = ExportScheduler(building, listener=lambda job, event: recorded.append(event["stage"]))
+
+        async def scenario():
+            job = scheduler.submit("x")
+            queue = job.subscribe()
+            await job.future
+            events = []
+            while (event := queue.get_nowait()) is not None:
+                events.append(event)
+            return job, events
+
+        job, events = asyncio.run(scenario())
+        self.assertEqual([(e["stage"], e["seq"]) for e in events],
+                         [("output", 2), ("image_ready", 3), ("succeeded", 4)])
+        self.assertEqual(events[0]["data"], {"stream": "stdout", "line": "Step 1/2 : FROM python"})
+        self.assertNotIn("output", [e["stage"] for e in job.events])
+        self.assertNotIn("output", recorded)
+
+    def test_shutdown_cancels_outstanding_exports(self):
+        scheduler = self._scheduler(max_concurrent=1)
+
+        async def scenario():
+            jobs = [scheduler.submit({"seconds": 5}), scheduler.submit("queued")]
+            await asyncio.sleep(0.01)
+            await scheduler.shutdown()
+            with self.assertRaises(RuntimeError):
+                scheduler.submit("late")
+            return jobs
+
+        jobs = asyncio.run(scenario())
+        self.assertEqual([job.state for job in jobs], ["cancelled", "cancelled"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import asyncio
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.image_cache import ImageCache
+from tests import fake_docker
+
+
+class TestImageCache(fake_docker.FakeDockerTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(os.path.join(self.context, "templates"))
+        self._write("templates/index.html", "<html></html>")
+
+    def _write(self, name, content):
+        with open(os.path.join(self.context, name), "w") as f:
+            f.write(content)
+
+    def _calls(self, command):
+        return fake_docker.calls(self.env, command)
+
+    def test_builds_once_and_reuses_the_image(self):
+        cache = ImageCache(self.context, repository="ui", keep=2)
+        first = asyncio.run(cache.ensure_image())
+        second = asyncio.run(cache.ensure_image())
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith("ui:"))
+        self.assertEqual(len(self._calls("build")), 1)
+        self.assertEqual((cache.stats()["builds"], cache.stats()["hits"]), (1, 1))
+
+    def test_hash_changes_with_content_but_not_with_bytecode(self):
+        cache = ImageCache(self.context)
+        original = cache.context_hash()
+        os.makedirs(os.path.join(self.context, "__pycache__"))
+        self._write("__pycache__/app.cpython-311.pyc", "bytecode")
+        self.assertEqual(cache.context_hash(), original)
+        self._write("app.py", "print('changed')")
+        self.assertNotEqual(cache.context_hash(), original)
+
+    def test_concurrent_exports_share_one_build(self):
+        os.environ["FAKE_DOCKER_BUILD_SECONDS"] = "0.3"
+        try:
+            cache = ImageCache(self.context, repository="ui")
+
+            async def scenario():
+                return await asyncio.gather(*(cache.ensure_image() for _ in range(5)))
+
+            tags = asyncio.run(scenario())
+        finally:
+            del os.environ["FAKE_DOCKER_BUILD_SECONDS"]
+        self.assertEqual(len(set(tags)), 1)
+        self.assertEqual(len(self._calls("build")), 1)
+
+    def test_stale_tags_are_collected_except_images_in_use(self):
+        cache = ImageCache(self.context, repository="ui", keep=2)
+        tags = []
+        for i in range(4):
+            self._write("app.py", f"print({i})")
+            tags.append(asyncio.run(cache.ensure_image()))
+            if i == 0:
+                state = fake_docker.read_state(self.env)
+                state["in_use"] = [tags[0]]
+                fake_docker.write_state(self.env, state)
+
+        images = fake_docker.read_state(self.env)["images"]
+        # current + one previous kept, the one in use survives, the rest removed
+        self.assertEqual(sorted(images), sorted([tags[3], tags[2], tags[0], "ui:latest"]))
+        self.assertEqual(cache.stats()["removed_tags"], 1)
+
+    def test_failed_build_raises_and_is_retried(self):
+        cache = ImageCache(self.context, repository="ui")
+        os.environ["FAKE_DOCKER_FAIL_BUILD"] = "1"
+        try:
+            with self.assertRaises(RuntimeError):
+                asyncio.run(cache.ensure_image())
+        finally:
+            del os.environ["FAKE_DOCKER_FAIL_BUILD"]
+        self.assertEqual(cache.stats()["build_failures"], 1)
+        self.assertTrue(asyncio.run(cache.ensure_image()).startswith("ui:"))
+        self.assertEqual(cache.stats()["builds"], 1)
+
+
+    def test_build_output_is_streamed_to_listeners_and_the_log(self):
+        log_path = os.path.join(self.tmp.name, "logs", "build.log")
+        cache = ImageCache(self.context, repository="ui", log_path=log_path)
+        lines = []
+        cache.add_output_listener(lambda stream, line: lines.append((stream, line)))
+        asyncio.run(cache.ensure_image())
+        self.assertEqual(lines, [("stdout", "Step 1/2 : FROM python:3.11-slim"), ("stdout", "Step 2/2 : COPY . /app")])
+        with open(log_path) as f:
+            self.assertIn("docker build [stdout] Step 2/2 : COPY . /app", f.read())
+
+    def test_build_over_the_timeout_is_killed(self):
+        os.environ["FAKE_DOCKER_BUILD_SECONDS"] = "30"
+        try:
+            cache = ImageCache(self.context, repository="ui", build_timeout=0.5)
+            with self.assertRaisesRegex(RuntimeError, "timed out"):
+                asyncio.run(cache.ensure_image())
+        finally:
+            del os.environ["FAKE_DOCKER_BUILD_SECONDS"]
+        self.assertEqual(cache.stats()["build_failures"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.init_db import apply_migrations
+
+
+class InformationSchemaCursor:
+    """Cursor double answering information_schema queries from a dict of tables."""
+    def __init__(self, tables, indexes=()):
+        self.tables = tables
+        self.indexes = set(indexes)
+        self.statements = []
+        self._result = []
+
+    def execute(self, query, params=()):
+        if "information_schema.COLUMNS" in query:
+            self._result = [(name, *column) for name, column in self.tables.get(params[1], {}).items()]
+        elif "information_schema.STATISTICS" in query:
+            self._result = [(1,)] if (params[1], params[2]) in self.indexes else []
+        else:
+            self.statements.append(query)
+
+    def fetchall(self):
+        return self._result
+
+
+class TestMigrations(unittest.TestCase):
+    def test_tables_from_the_export_dump_are_migrated(self):
+        # as created by lumos_export_20250413.sql
+        cursor = InformationSchemaCursor({
+            "agents": {"id": ("int", "NO"), "agent_id": ("varchar(255)", "NO")},
+            "tools": {"id": ("int", "NO"), "tool_id": ("varchar(255)", "NO")},
+            "connections": {
+                "id": ("int", "NO"),
+                "connection_id": ("varchar(255)", "NO"),
+                "source_type": ("enum('agent','tool','task')", "NO"),
+                "source_id": ("varchar(255)", "NO"),
+                "target_type": ("enum('agent','tool','task')", "NO"),
+                "target_id": ("varchar(255)", "NO"),
+                "label": ("varchar(255)", "YES"),
+            },
+        }, indexes=[("tools", "idx_tools_project")])
+
+        applied = apply_migrations(cursor, "lumos")
+
+        self.assertEqual(applied, cursor.statements)
+        self.assertEqual(applied, [
+            "ALTER TABLE agents ADD COLUMN content_hash CHAR(40)",
+            "ALTER TABLE tools ADD COLUMN content_hash CHAR(40)",
+            "ALTER TABLE connections ADD COLUMN source VARCHAR(255) NOT NULL DEFAULT ''",
+            "UPDATE connections SET source = source_id WHERE source_id IS NOT NULL",
+            "ALTER TABLE connections ADD COLUMN target VARCHAR(255) NOT NULL DEFAULT ''",
+            "UPDATE connections SET target = target_id WHERE target_id IS NOT NULL",
+            "ALTER TABLE connections ADD COLUMN content_hash CHAR(40)",
+            "ALTER TABLE connections MODIFY COLUMN source_type enum('agent','tool','task') NULL",
+            "ALTER TABLE connections MODIFY COLUMN source_id varchar(255) NULL",
+            "ALTER TABLE connections MODIFY COLUMN target_type enum('agent','tool','task') NULL",
+            "ALTER TABLE connections MODIFY COLUMN target_id varchar(255) NULL",
+            "CREATE INDEX idx_agents_project ON agents (project_id, agent_id)",
+            "CREATE INDEX idx_connections_project ON connections (project_id, connection_id)",
+        ])
+
+    def test_current_tables_are_left_alone(self):
+        columns = {
+            "agents": ["agent_id", "content_hash"],
+            "tools": ["tool_id", "content_hash"],
+            "connections": ["connection_id", "source", "target", "label", "content_hash"],
+        }
+        cursor = InformationSchemaCursor(
+            {table: {name: ("varchar(255)", "YES") for name in names} for table, names in columns.items()},
+            indexes=[("agents", "idx_agents_project"), ("tools", "idx_tools_project"),
+                     ("connections", "idx_connections_project")],
+        )
+        self.assertEqual(apply_migrations(cursor, "lumos"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -37,3 +37,17 @@ def test_metrics_dashboard_content_type_and_body():
     assert response.headers["content-type"].startswith("text/html")
     # Basic check that the HTML contains a dashboard title
     assert "Server Metrics Dashboard" in response.text
+
+
+def test_metrics_dashboard_shows_proxy_traffic(monkeypatch):
+    from app.services.proxy_metrics import ProxyMetrics
+    from app.utils import metrics_utils
+    traffic = ProxyMetrics()
+    traffic.opened("ui_hot")
+    traffic.closed("ui_hot", 200, 10, 2048, {"connect": 1.5, "ttfb": 40.0, "total": 42.0, "overhead": 0.2})
+    monkeypatch.setitem(metrics_utils.metrics_providers, "proxy",
+                        lambda: {**traffic.snapshot(), "available": True, "error": None})
+    assert _get("/metrics/data").json()["proxy"]["routes"]["ui_hot"]["statuses"]["2xx"] == 1
+    body = _get("/metrics").text
+    assert "Proxy Traffic" in body
+    assert "<td>ui_hot</td>" in body
@@ -1,7 +1,9 @@
 import unittest
+import asyncio
+import aiohttp
 import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from app.utils.network_utils import random_free_port, random_name, random_port
+from app.utils.network_utils import random_free_port, random_name, random_port, backoff_delays, wait_until_healthy
 
 class TestNetworkUtils(unittest.TestCase):
     def test_random_free_port(self):
@@ -22,5 +24,20 @@ class TestNetworkUtils(unittest.TestCase):
         self.assertGreaterEqual(port, 2000)
         self.assertLessEqual(port, 9000)
 
+    def test_backoff_delays_grow_with_jitter_up_to_the_maximum(self):
+        delays = backoff_delays(initial=0.1, maximum=0.4, jitter=0.5)
+        first = [next(delays) for _ in range(6)]
+        self.assertTrue(0.05 <= first[0] <= 0.15)
+        self.assertTrue(all(0.2 <= delay <= 0.6 for delay in first[2:]))
+        self.assertGreater(len(set(first)), 1)
+
+    def test_wait_until_healthy_gives_up_at_the_deadline(self):
+        async def probe():
+            async with aiohttp.ClientSession() as session:
+                return await wait_until_healthy(session, f"http://127.0.0.1:{random_free_port()}/health", timeout=0.2)
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(probe())
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
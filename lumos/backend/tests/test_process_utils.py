@@ -0,0 +1,106 @@
+import unittest
+import asyncio
+import os
+import tempfile
+import time
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.utils.process_utils import CommandTimeout, command_log, run_command, stream_command
+
+
+def _running(pid):
+    """Whether pid is a live process; a killed orphan may linger as a zombie until reaped."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def _python(code):
+    return (sys.executable, "-c", code)
+
+
+class TestStreamCommand(unittest.TestCase):
+    def test_lines_arrive_while_the_command_runs(self):
+        seen = []
+
+        async def scenario():
+            started = time.monotonic()
+            result = await stream_command(
+                *_python("import sys, time\n"
+                         "print('first', flush=True)\n"
+                         "time.sleep(0.5)\n"
+                         "print('oops', file=sys.stderr, flush=True)\n"
+                         "print('last')"),
+                on_output=lambda stream, line: seen.append((stream, line, time.monotonic() - started)),
+            )
+            return result, time.monotonic() - started
+
+        (returncode, stdout, stderr), elapsed = asyncio.run(scenario())
+        self.assertEqual((returncode, stdout, stderr), (0, "first\nlast", "oops"))
+        self.assertEqual([(stream, line) for stream, line, _ in seen],
+                         [("stdout", "first"), ("stderr", "oops"), ("stdout", "last")])
+        # the first line was handled long before the command exited
+        self.assertLess(seen[0][2], elapsed - 0.3)
+
+    def test_only_the_tail_of_the_output_is_kept(self):
+        returncode, stdout, stderr = asyncio.run(stream_command(
+            *_python("import sys\n"
+                     "for i in range(5000): print(i)\n"
+                     "sys.stdout.write('x' * 200000)\n"
+                     "sys.exit(3)"),
+            tail_lines=3,
+        ))
+        self.assertEqual(returncode, 3)
+        self.assertEqual(stdout.splitlines(), ["4998", "4999", "x" * 200000])
+        self.assertEqual(stderr, "")
+
+    def test_timeout_kills_the_whole_process_group(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pid_file = os.path.join(tmp, "child.pid")
+
+            async def scenario():
+                # the command leaves a grandchild behind, as docker build's helpers would
+                await stream_command("sh", "-c", f"sleep 30 & echo $! > {pid_file}; echo started; wait", timeout=0.5)
+
+            started = time.monotonic()
+            with self.assertRaisesRegex(CommandTimeout, "timed out after 0.5s"):
+                asyncio.run(scenario())
+            self.assertLess(time.monotonic() - started, 5)
+            with open(pid_file) as f:
+                child = int(f.read())
+        time.sleep(0.1)
+        self.assertFalse(_running(child))
+
+    def test_run_command_times_out_like_stream_command(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            pid_file = os.path.join(tmp, "child.pid")
+
+            async def scenario():
+                # e.g. docker rm against a daemon that stopped answering
+                await run_command("sh", "-c", f"sleep 30 & echo $! > {pid_file}; wait", timeout=0.5)
+
+            with self.assertRaisesRegex(CommandTimeout, "timed out after 0.5s"):
+                asyncio.run(scenario())
+            with open(pid_file) as f:
+                child = int(f.read())
+        time.sleep(0.1)
+        self.assertFalse(_running(child))
+        self.assertEqual(asyncio.run(run_command("sh", "-c", "echo out; echo err >&2")), (0, "out\n", "err\n"))
+
+    def test_command_log_rotates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "commands.log")
+            log = command_log(path, max_bytes=2000, backup_count=2)
+            self.assertIs(command_log(path), log)
+            asyncio.run(stream_command(*_python("for i in range(200): print('line', i)"), log=log))
+            for handler in log.handlers:
+                handler.close()
+            self.assertEqual(sorted(os.listdir(tmp)), ["commands.log", "commands.log.1", "commands.log.2"])
+            with open(path) as f:
+                self.assertIn("[stdout] line 199", f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import unittest
+import tempfile
+import time
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.project_cache import MemoryCacheBackend, SharedCacheBackend, ProjectCache
+from app.models.project_storage_strategy import ProjectStorageStrategy
+
+
+class TestMemoryCacheBackend(unittest.TestCase):
+    def test_evicts_least_recently_used_entry(self):
+        backend = MemoryCacheBackend(max_entries=2, ttl=0)
+        backend.set("a", {"v": 1})
+        backend.set("b", {"v": 2})
+        backend.get("a")
+        backend.set("c", {"v": 3})
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("a"), {"v": 1})
+        self.assertEqual(backend.stats()["evictions"], 1)
+
+    def test_evicts_to_stay_under_byte_budget(self):
+        backend = MemoryCacheBackend(max_entries=100, max_bytes=50, ttl=0)
+        backend.set("a", {"v": "x" * 20})
+        backend.set("b", {"v": "y" * 20})
+        self.assertIsNone(backend.get("a"))
+        self.assertLessEqual(backend.stats()["bytes"], 50)
+
+    def test_callers_get_copies(self):
+        backend = MemoryCacheBackend(ttl=0)
+        value = {"agents": [{"id": "a"}]}
+        backend.set("a", value)
+        value["agents"].append({"id": "b"})
+        backend.get("a")["agents"].clear()
+        self.assertEqual(backend.get("a"), {"agents": [{"id": "a"}]})
+
+    def test_entries_expire_after_ttl(self):
+        backend = MemoryCacheBackend(ttl=0.01)
+        backend.set("a", {"v": 1})
+        time.sleep(0.02)
+        self.assertIsNone(backend.get("a"))
+
+
+    def test_generations_are_bounded(self):
+        backend = MemoryCacheBackend(max_generations=2)
+        stale = backend.generation("a")
+        for key in ("a", "b", "c"):
+            backend.invalidate(key)
+        self.assertEqual(len(backend._generations), 2)
+        # "a" was forgotten: a load started before its invalidation is still skipped
+        self.assertFalse(backend.set("a", {"v": 1}, stale))
+        self.assertTrue(backend.set("a", {"v": 2}, backend.generation("a")))
+        self.assertEqual(backend.get("a"), {"v": 2})
+
+
+class TestSharedCacheBackend(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_entries_and_invalidations_are_shared_between_instances(self):
+        worker_a = SharedCacheBackend(self.path)
+        worker_b = SharedCacheBackend(self.path)
+        worker_a.set("project:1", {"name": "demo"})
+        self.assertEqual(worker_b.get("project:1"), {"name": "demo"})
+        worker_b.delete("project:1")
+        self.assertIsNone(worker_a.get("project:1"))
+
+    def test_load_racing_another_workers_save_is_not_cached(self):
+        worker_a = ProjectCache(SharedCacheBackend(self.path))
+        worker_b = ProjectCache(SharedCacheBackend(self.path))
+
+        def load_then_save():
+            # worker b saves the project after worker a read it
+            worker_b.invalidate(1)
+            return {"project": {"id": 1, "name": "before"}}
+
+        worker_a.get_or_load(1, load_then_save)
+        self.assertIsNone(worker_b.backend.get("project:1"))
+        self.assertEqual(worker_a.stats()["stale_loads"], 1)
+
+    def test_generations_are_bounded(self):
+        backend = SharedCacheBackend(self.path, max_generations=2)
+        stale = backend.generation("a")
+        for key in ("a", "b", "c"):
+            backend.invalidate(key)
+        count = backend._connection().execute("SELECT COUNT(*) FROM cache_generations").fetchone()[0]
+        self.assertEqual(count, 2)
+        self.assertFalse(backend.set("a", {"v": 1}, stale))
+        self.assertTrue(backend.set("a", {"v": 2}, backend.generation("a")))
+        self.assertEqual(backend.get("a"), {"v": 2})
+
+    def test_evicts_least_recently_used_entry(self):
+        backend = SharedCacheBackend(self.path, max_entries=2, ttl=0)
+        backend.set("a", 1)
+        time.sleep(0.01)
+        backend.set("b", 2)
+        time.sleep(0.01)
+        backend.get("a")
+        backend.set("c", 3)
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.stats()["entries"], 2)
+
+
+class FakeStorage(ProjectStorageStrategy):
+    def save_project(self, project_data):
+        self._notify("saved", project_data["id"])
+
+    def create_project(self, project_data):
+        self._notify("created", project_data["id"])
+
+    def get_all_projects(self):
+        return []
+
+    def get_projects_page(self, after_id=None, limit=50, sort="id", fields=None):
+        return [], None
+
+    def iter_projects(self, after_id=None, limit=None, sort="id", fields=None, chunk_size=500):
+        return iter(())
+
+    def get_project_by_id(self, project_id):
+        return None
+
+
+class TestProjectCache(unittest.TestCase):
+    def test_read_through_and_invalidation_from_storage(self):
+        cache = ProjectCache(MemoryCacheBackend())
+        storage = FakeStorage()
+        storage.add_listener(cache.on_storage_event)
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return {"project": {"id": 1}}
+
+        cache.get_or_load(1, loader)
+        cache.get_or_load(1, loader)
+        self.assertEqual(len(loads), 1)
+
+        storage.save_project({"id": 1})
+        cache.get_or_load(1, loader)
+        self.assertEqual(len(loads), 2)
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["invalidations"]), (1, 2, 1))
+
+    def test_load_racing_a_save_is_not_cached(self):
+        cache = ProjectCache(MemoryCacheBackend())
+        storage = FakeStorage()
+        storage.add_listener(cache.on_storage_event)
+
+        def load_then_save():
+            project = {"project": {"id": 1, "name": "before"}}
+            # the project is saved after it was read, before it is cached
+            storage.save_project({"id": 1})
+            return project
+
+        self.assertEqual(cache.get_or_load(1, load_then_save)["project"]["name"], "before")
+        after = cache.get_or_load(1, lambda: {"project": {"id": 1, "name": "after"}})
+        self.assertEqual(after["project"]["name"], "after")
+        self.assertEqual(cache.stats()["stale_loads"], 1)
+
+    def test_errors_are_not_cached(self):
+        cache = ProjectCache(MemoryCacheBackend())
+        cache.get_or_load(9, lambda: {"status": "error", "message": "not found"})
+        self.assertEqual(cache.stats()["entries"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
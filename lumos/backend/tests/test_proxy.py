@@ -0,0 +1,351 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.route_registry import RouteRegistry, ROUTES_TOKEN_HEADER
+from app.utils.network_utils import random_free_port
+from proxy import ReverseProxy, create_app
+
+
+class StubUpstream:
+    """A ui_app container stand-in echoing what it received."""
+
+    def __init__(self):
+        self.port = random_free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.client_ports = set()
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.release = asyncio.Event()
+        self._runner = None
+
+    async def _echo(self, request):
+        self.client_ports.add(request.transport.get_extra_info("peername")[1])
+        self.requests += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(float(request.query.get("sleep", 0)))
+            response = web.json_response({
+                "method": request.method,
+                "path": request.path,
+                "query": request.query_string,
+                "body": (await request.read()).decode(),
+                "headers": dict(request.headers),
+            })
+            response.headers.add("Set-Cookie", "a=1")
+            response.headers.add("Set-Cookie", "b=2")
+            response.headers["Keep-Alive"] = "timeout=5"
+            return response
+        finally:
+            self.active -= 1
+
+    async def _events(self, request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b"data: first\n\n")
+        await self.release.wait()
+        for i in range(3):
+            await asyncio.sleep(0.2)
+            await response.write(f"data: {i}\n\n".encode())
+        await response.write_eof()
+        return response
+
+    async def _upload(self, request):
+        received = 0
+        async for chunk in request.content.iter_any():
+            received += len(chunk)
+        return web.json_response({"received": received, "chunked": "Transfer-Encoding" in request.headers})
+
+    async def _download(self, request):
+        return web.Response(body=b"x" * int(request.query["size"]))
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/events", self._events)
+        app.router.add_post("/upload", self._upload)
+        app.router.add_get("/download", self._download)
+        app.router.add_route("*", "/{tail:.*}", self._echo)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+class TestReverseProxy(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.routes = RouteRegistry(os.path.join(self.tmp.name, "route_map.json"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _run(self, scenario, **options):
+        async def run():
+            upstream = StubUpstream()
+            await upstream.start()
+            self.routes.add("ui_a", upstream.url)
+            proxy = ReverseProxy(self.routes, routes_token="secret", **options)
+            client = TestClient(TestServer(create_app(proxy)))
+            await client.start_server()
+            try:
+                return await scenario(client, upstream, proxy)
+            finally:
+                await client.close()
+                await upstream.stop()
+        return asyncio.run(run())
+
+    def test_request_and_response_are_forwarded(self):
+        async def scenario(client, upstream, proxy):
+            resp = await client.post("/ui_a/chat?x=1&y=2", data="hello",
+                                     headers={"Connection": "keep-alive, X-Hop", "X-Hop": "1", "X-Keep": "2"})
+            return resp.status, await resp.json(), resp.headers
+
+        status, echoed, headers = self._run(scenario)
+        self.assertEqual(status, 200)
+        self.assertEqual((echoed["method"], echoed["path"], echoed["query"], echoed["body"]),
+                         ("POST", "/chat", "x=1&y=2", "hello"))
+        self.assertEqual(echoed["headers"]["X-Keep"], "2")
+        # hop-by-hop headers, including those named in Connection, stay with their connection
+        self.assertNotIn("X-Hop", echoed["headers"])
+        self.assertEqual(echoed["headers"]["X-Forwarded-For"], "127.0.0.1")
+        self.assertNotIn("Keep-Alive", headers)
+        self.assertEqual(headers.getall("Set-Cookie"), ["a=1", "b=2"])
+
+    def test_unknown_routes_and_admin_paths_are_not_proxied(self):
+        async def scenario(client, upstream, proxy):
+            return [(await client.get(path)).status for path in ("/ui_b/", "/ui_a/_admin/config")]
+
+        self.assertEqual(self._run(scenario), [404, 404])
+
+    def test_upstream_connections_are_kept_alive(self):
+        async def scenario(client, upstream, proxy):
+            for _ in range(20):
+                self.assertEqual((await client.get("/ui_a/")).status, 200)
+            return upstream.client_ports
+
+        self.assertEqual(len(self._run(scenario)), 1)
+
+    def test_connections_per_upstream_are_limited(self):
+        async def scenario(client, upstream, proxy):
+            responses = await asyncio.gather(*(client.get("/ui_a/?sleep=0.1") for _ in range(10)))
+            return [r.status for r in responses], upstream.peak
+
+        statuses, peak = self._run(scenario, max_connections_per_upstream=2)
+        self.assertEqual(statuses, [200] * 10)
+        self.assertEqual(peak, 2)
+
+    def test_slow_and_missing_upstreams(self):
+        async def scenario(client, upstream, proxy):
+            slow = await client.get("/ui_a/?sleep=2")
+            self.routes.add("ui_gone", f"http://127.0.0.1:{random_free_port()}")
+            gone = await client.get("/ui_gone/")
+            return slow.status, gone.status, proxy.stats()
+
+        slow, gone, stats = self._run(scenario, timeout=0.3)
+        self.assertEqual((slow, gone), (504, 502))
+        self.assertEqual((stats["upstream_timeouts"], stats["upstream_errors"], stats["in_flight"]), (1, 1, 0))
+
+    def test_events_are_streamed_as_they_are_written(self):
+        async def scenario(client, upstream, proxy):
+            resp = await client.get("/ui_a/events")
+            # the container is still holding the rest of the stream back
+            first = await asyncio.wait_for(resp.content.readuntil(b"\n\n"), 2)
+            upstream.release.set()
+            # the stream outlives the proxy timeout as long as the container keeps writing
+            rest = await resp.read()
+            return resp.status, resp.headers, first, rest
+
+        status, headers, first, rest = self._run(scenario, timeout=0.5)
+        self.assertEqual((status, headers["Content-Type"]), (200, "text/event-stream"))
+        self.assertEqual(headers["Transfer-Encoding"], "chunked")
+        self.assertEqual(first, b"data: first\n\n")
+        self.assertEqual(rest, b"data: 0\n\ndata: 1\n\ndata: 2\n\n")
+
+    def test_large_bodies_are_streamed_both_ways(self):
+        size = 8 * 1024 * 1024
+
+        async def body():
+            for _ in range(size // (64 * 1024)):
+                yield b"x" * (64 * 1024)
+
+        async def scenario(client, upstream, proxy):
+            uploaded = await (await client.post("/ui_a/upload", data=body())).json()
+            sized = await (await client.post("/ui_a/upload", data=b"x" * 1000)).json()
+            download = await client.get(f"/ui_a/download?size={size}")
+            return uploaded, sized, download.headers["Content-Length"], len(await download.read())
+
+        uploaded, sized, length, downloaded = self._run(scenario, buffer_size=16 * 1024)
+        self.assertEqual(uploaded, {"received": size, "chunked": True})
+        self.assertEqual(sized, {"received": 1000, "chunked": False})
+        self.assertEqual((length, downloaded), (str(size), size))
+
+    def test_access_log_is_sampled(self):
+        async def scenario(client, upstream, proxy):
+            self.routes.add("ui_gone", f"http://127.0.0.1:{random_free_port()}")
+            for path in ("/ui_a/chat?x=1", "/ui_a/", "/ui_gone/"):
+                await (await client.post(path, data="hi")).read()
+            proxy.access_log_sample = 1.0
+            await (await client.post("/ui_a/chat", data="hello")).read()
+
+        with self.assertLogs("lumos.proxy.access") as logs:
+            self._run(scenario, access_log_sample=0)
+        entries = [json.loads(record.getMessage()) for record in logs.records]
+        # failures are always logged, successes only when sampled
+        self.assertEqual([(e["route"], e["status"], e["sampled"]) for e in entries],
+                         [("ui_gone", 502, False), ("ui_a", 200, True)])
+        self.assertEqual((entries[1]["method"], entries[1]["path"], entries[1]["bytes_in"]), ("POST", "/ui_a/chat", 5))
+        self.assertGreater(entries[1]["bytes_out"], 0)
+
+    def test_traffic_is_recorded_per_route(self):
+        async def scenario(client, upstream, proxy):
+            self.routes.add("ui_gone", f"http://127.0.0.1:{random_free_port()}")
+            for path in ("/ui_a/chat", "/ui_a/chat", "/ui_gone/"):
+                await (await client.post(path, data="hello")).read()
+            forbidden = await client.get("/_metrics")
+            scraped = await client.get("/_metrics", headers={ROUTES_TOKEN_HEADER: "secret"})
+            return forbidden.status, await scraped.json()
+
+        forbidden, scraped = self._run(scenario)
+        self.assertEqual(forbidden, 403)
+        route = scraped["routes"]["ui_a"]
+        self.assertEqual((route["requests"], route["statuses"]["2xx"], route["in_flight"]), (2, 2, 0))
+        self.assertEqual(route["bytes_in"], 10)
+        self.assertGreater(route["bytes_out"], 0)
+        latency = route["latency_ms"]
+        # the second request reused the kept-alive connection
+        self.assertEqual((latency["connect"]["count"], latency["ttfb"]["count"], latency["total"]["count"]), (1, 2, 2))
+        self.assertEqual(scraped["routes"]["ui_gone"]["statuses"]["5xx"], 1)
+        self.assertEqual((scraped["total"]["requests"], scraped["proxy"]["upstream_errors"]), (3, 1))
+
+    def test_requests_are_balanced_over_replicas(self):
+        async def scenario(client, upstream, proxy):
+            other = StubUpstream()
+            await other.start()
+            try:
+                self.routes.add("ui_a", [upstream.url, other.url])
+                statuses = [r.status for r in await asyncio.gather(
+                    *(client.get("/ui_a/?sleep=0.1") for _ in range(20)))]
+                return statuses, upstream.requests, other.requests, upstream.peak, other.peak
+            finally:
+                await other.stop()
+
+        for balancing in ("p2c", "least"):
+            statuses, first, second, first_peak, second_peak = self._run(scenario, balancing=balancing)
+            self.assertEqual(statuses, [200] * 20)
+            # requests go to the replica with fewer outstanding
+            self.assertEqual((first, second, first_peak, second_peak), (10, 10, 10, 10))
+
+    def test_failing_replica_is_ejected(self):
+        async def scenario(client, upstream, proxy):
+            dead = f"http://127.0.0.1:{random_free_port()}"
+            self.routes.add("ui_a", [upstream.url, dead])
+            statuses = [(await client.get("/ui_a/")).status for _ in range(20)]
+            upstreams = (await (await client.get("/_metrics", headers={ROUTES_TOKEN_HEADER: "secret"})).json())["upstreams"]
+            return statuses, upstreams[dead], upstreams[upstream.url], proxy.ejections
+
+        statuses, dead, alive, ejections = self._run(scenario, eject_after=2)
+        # at most eject_after requests reached the dead replica before it was left out
+        self.assertLessEqual(statuses.count(502), 2)
+        self.assertEqual(statuses.count(200) + statuses.count(502), 20)
+        self.assertTrue(dead["ejected"])
+        self.assertFalse(alive["ejected"])
+        self.assertEqual(ejections, 1)
+
+    def test_health_checks_eject_and_restore_replicas(self):
+        async def scenario(client, upstream, proxy):
+            other = StubUpstream()
+            await other.start()
+            dead = f"http://127.0.0.1:{random_free_port()}"
+            self.routes.add("ui_a", [upstream.url, other.url, dead])
+            proxy._eject(proxy._upstream(other.url))
+            await proxy.check_health()
+            await other.stop()
+            ejected = {url: proxy._upstream(url).ejected_until > 0 for url in (upstream.url, other.url, dead)}
+            # a replica removed from the route is forgotten at the next check
+            self.routes.add("ui_a", [upstream.url, other.url])
+            await proxy.check_health()
+            return ejected, set(proxy._upstreams) == {upstream.url, other.url}
+
+        ejected, forgotten = self._run(scenario, health_interval=0)
+        self.assertEqual(list(ejected.values()), [False, False, True])
+        self.assertTrue(forgotten)
+
+    def test_route_changes_are_announced_with_the_token(self):
+        async def scenario(client, upstream, proxy):
+            forbidden = await client.post("/_routes", json={})
+            RouteRegistry(self.routes.path).add("ui_new", upstream.url)
+            announced = await client.post("/_routes", json={"op": "add", "name": "ui_new"},
+                                          headers={ROUTES_TOKEN_HEADER: "secret"})
+            return forbidden.status, announced.status, self.routes.lookup("ui_new")
+
+        forbidden, announced, url = self._run(scenario)
+        self.assertEqual((forbidden, announced), (403, 200))
+        self.assertIsNotNone(url)
+
+    def test_unknown_routes_are_looked_up_at_most_once_per_interval(self):
+        refresh = self.routes.refresh
+        reads = []
+
+        def counted_refresh():
+            reads.append(threading.get_ident())
+            refresh()
+
+        self.routes.refresh = counted_refresh
+
+        async def scenario(client, upstream, proxy):
+            await asyncio.sleep(0.3)
+            missed = [(await client.get(f"/ui_missing_{i}/")).status for i in range(20)]
+            # added by a backend worker whose announcement got lost
+            RouteRegistry(self.routes.path).add("ui_new", upstream.url)
+            before = (await client.get("/ui_new/")).status
+            await asyncio.sleep(0.3)
+            after = (await client.get("/ui_new/")).status
+            return missed, before, after
+
+        missed, before, after = self._run(scenario, health_interval=0, miss_refresh_interval=0.2)
+        self.assertEqual(set(missed), {404})
+        self.assertEqual((before, after), (404, 200))
+        # on start, the first miss, and the miss after the interval, never on the event loop's thread
+        self.assertEqual(len(reads), 3)
+        self.assertNotIn(threading.get_ident(), reads)
+
+    def test_parked_route_is_woken_through_the_backend(self):
+        async def scenario(client, upstream, proxy):
+            woken = []
+
+            async def wake(request):
+                route = request.match_info["route"]
+                if request.headers.get(ROUTES_TOKEN_HEADER) != "secret" or route != "ui_a":
+                    return web.json_response({"status": "error"}, status=404)
+                woken.append(route)
+                RouteRegistry(self.routes.path).add(route, upstream.url)
+                return web.json_response({"status": "success", "url": upstream.url})
+
+            backend = web.Application()
+            backend.router.add_post("/api/routes/{route}/wake", wake)
+            backend_server = TestServer(backend)
+            await backend_server.start_server()
+            proxy.backend_url = str(backend_server.make_url("")).rstrip("/")
+            try:
+                self.routes.park("ui_a")
+                self.routes.add("ui_b", upstream.url)
+                self.routes.park("ui_b")
+                return (await client.get("/ui_a/")).status, (await client.get("/ui_b/")).status, woken
+            finally:
+                await backend_server.close()
+
+        self.assertEqual(self._run(scenario), (200, 503, ["ui_a"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+from aiohttp.test_utils import TestServer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.proxy_metrics import ProxyMetrics, ProxyMetricsScraper
+from app.services.route_registry import RouteRegistry
+from app.utils.metrics_utils import Histogram
+from app.utils.network_utils import random_free_port
+from proxy import ReverseProxy, create_app
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles_come_from_the_buckets(self):
+        histogram = Histogram(bounds=(10, 100, 1000))
+        self.assertIsNone(histogram.quantile(0.5))
+        for value in [1, 5, 10, 50, 60, 70, 80, 90, 500, 5000]:
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot["buckets"], [3, 5, 1, 1])
+        self.assertEqual((snapshot["count"], snapshot["sum"]), (10, 5866))
+        self.assertEqual((snapshot["p50"], snapshot["p90"]), (100, 1000))
+        # beyond the last bound
+        self.assertEqual(snapshot["p99"], 1000)
+
+
+class TestProxyMetrics(unittest.TestCase):
+    def test_requests_are_counted_per_route_and_in_total(self):
+        metrics = ProxyMetrics()
+        metrics.opened("ui_a")
+        metrics.opened("ui_b")
+        self.assertEqual(metrics.snapshot()["total"]["in_flight"], 2)
+        metrics.closed("ui_a", 200, 5, 50, {"connect": None, "ttfb": 3.0, "total": 4.0, "overhead": 0.1})
+        metrics.closed("ui_b", 499, 0, 10, {"connect": 1.0, "ttfb": 3.0, "total": 9.0, "overhead": 0.1})
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["total"]["in_flight"], 0)
+        self.assertEqual(snapshot["total"]["statuses"], {"1xx": 0, "2xx": 1, "3xx": 0, "4xx": 1, "5xx": 0})
+        self.assertEqual((snapshot["total"]["bytes_in"], snapshot["total"]["bytes_out"]), (5, 60))
+        self.assertEqual(snapshot["routes"]["ui_a"]["latency_ms"]["connect"]["count"], 0)
+        self.assertEqual(snapshot["routes"]["ui_b"]["latency_ms"]["total"]["p50"], 10)
+
+
+    def test_removed_routes_are_forgotten(self):
+        metrics = ProxyMetrics()
+        for route in ("ui_a", "ui_gone", "ui_busy"):
+            metrics.opened(route)
+        metrics.closed("ui_a", 200, 0, 10, {})
+        metrics.closed("ui_gone", 200, 0, 10, {})
+        metrics.retain({"ui_a": "http://localhost:9000"})
+        # ui_busy is kept until its request is done
+        self.assertEqual(set(metrics.snapshot()["routes"]), {"ui_a", "ui_busy"})
+        metrics.closed("ui_busy", 200, 0, 10, {})
+        metrics.retain({"ui_a": "http://localhost:9000"})
+        self.assertEqual(set(metrics.snapshot()["routes"]), {"ui_a"})
+        self.assertEqual(metrics.snapshot()["total"]["requests"], 3)
+
+
+class TestProxyMetricsScraper(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.routes = RouteRegistry(os.path.join(self.tmp.name, "route_map.json"))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_metrics_are_read_from_the_proxy(self):
+        async def scenario():
+            proxy = ReverseProxy(self.routes, routes_token="secret")
+            proxy.metrics.opened("ui_a")
+            proxy.metrics.closed("ui_a", 200, 0, 10, {"ttfb": 2.0})
+            server = TestServer(create_app(proxy))
+            await server.start_server()
+            scraper = ProxyMetricsScraper(str(server.make_url("/_metrics")), "secret", interval=0.05)
+            try:
+                await scraper.start()
+                await asyncio.sleep(0.2)
+                live = scraper.stats()
+                await server.close()
+                await asyncio.sleep(0.2)
+                stale = scraper.stats()
+            finally:
+                await scraper.shutdown()
+            return live, stale
+
+        live, stale = asyncio.run(scenario())
+        self.assertTrue(live["available"])
+        self.assertIsNone(live["error"])
+        self.assertEqual(live["routes"]["ui_a"]["requests"], 1)
+        self.assertEqual(live["proxy"]["max_concurrency"], 256)
+        # the proxy went away: the last reading is kept, with the error
+        self.assertEqual(stale["routes"], live["routes"])
+        self.assertIsNotNone(stale["error"])
+        self.assertGreater(stale["failures"], 0)
+
+    def test_health_checks_drop_the_metrics_of_removed_routes(self):
+        async def scenario():
+            self.routes.add("ui_a", "http://localhost:9000")
+            self.routes.add("ui_gone", "http://localhost:9001")
+            proxy = ReverseProxy(self.routes, health_interval=0)
+            for route in ("ui_a", "ui_gone"):
+                proxy.metrics.opened(route)
+                proxy.metrics.closed(route, 200, 0, 10, {})
+            self.routes.remove("ui_gone")
+            await proxy.check_health()
+            return proxy.metrics.snapshot()["routes"]
+
+        self.assertEqual(set(asyncio.run(scenario())), {"ui_a"})
+
+    def test_nothing_is_read_without_the_token(self):
+        async def scenario():
+            scraper = ProxyMetricsScraper(f"http://127.0.0.1:{random_free_port()}/_metrics", "")
+            await scraper.start()
+            await scraper.shutdown()
+            return scraper.stats()
+
+        stats = asyncio.run(scenario())
+        self.assertFalse(stats["available"])
+        self.assertEqual((stats["scrapes"], stats["error"]), (0, "PROXY_ROUTES_TOKEN is not set"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+import asyncio
+import aiohttp
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.container_lifecycle import ContainerLifecycle
+from app.services.export_job_store import ExportJobStore
+from app.services.image_cache import ImageCache
+from app.services.replica_scaler import ExportNotRunningError, ReplicaScaler
+from app.services.route_registry import RouteRegistry
+from app.services.warm_pool import WarmPool
+from app.utils.config_bundle import encode_config
+from tests import fake_docker
+
+
+def _proxy_metrics(uptime, busy_ms):
+    """What ProxyMetricsScraper.stats() reports, reduced to what autoscaling reads."""
+    return {
+        "available": True,
+        "uptime": uptime,
+        "routes": {route: {"latency_ms": {"total": {"sum": ms}}} for route, ms in busy_ms.items()},
+    }
+
+
+class TestReplicaScaler(fake_docker.FakeDockerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pool = WarmPool(ImageCache(self.context, repository="ui"), min_size=0, max_size=0)
+        self.routes = RouteRegistry(os.path.join(self.tmp.name, "route_map.json"))
+        self.store = ExportJobStore(os.path.join(self.tmp.name, "jobs.sqlite3"))
+        self.lifecycle = ContainerLifecycle(self.store, self.routes, self.pool, self.routes.path + ".access")
+        self.metrics = None
+
+    def _scaler(self, **options):
+        return ReplicaScaler(self.store, self.routes, self.pool, load=lambda: self.metrics, drain_seconds=0,
+                             **options)
+
+    async def _deploy(self, route):
+        instance = await self.pool.claim()
+        bundle = encode_config({"project": {"name": route}})
+        await self.pool.configure(instance, bundle)
+        self.routes.add(route, instance.url)
+        await self.lifecycle.register(route, instance.name, instance.url, bundle)
+        return instance
+
+    def _containers(self):
+        return set(fake_docker.read_state(self.env)["containers"])
+
+    def test_replicas_are_added_and_removed(self):
+        scaler = self._scaler(max_replicas=3)
+
+        async def scenario():
+            instance = await self._deploy("ui_a")
+            up = await scaler.scale("ui_a", 5)
+            async with aiohttp.ClientSession() as session:
+                configs = []
+                for url in up:
+                    async with session.get(f"{url}/_admin/config") as resp:
+                        configs.append(await resp.json())
+            routed = self.routes.replicas("ui_a")
+            running = self._containers()
+            down = await scaler.scale("ui_a", 1)
+            # removed replicas are drained, then removed
+            await scaler.shutdown()
+            await self.pool.shutdown()
+            return instance, up, configs, routed, running, down
+
+        instance, up, configs, routed, running, down = asyncio.run(scenario())
+        # capped at max_replicas
+        self.assertEqual(len(up), 3)
+        self.assertEqual(up[0], instance.url)
+        self.assertEqual(configs, [{"project": {"name": "ui_a"}}] * 3)
+        self.assertEqual((routed, len(running)), (up, 3))
+        self.assertEqual(down, [instance.url])
+        self.assertEqual(self.routes.lookup("ui_a"), instance.url)
+        self.assertEqual(self._containers(), {instance.name})
+        self.assertEqual(self.store.replicas("ui_a"), [])
+        self.assertEqual(self.store.get_deployment("ui_a")["state"], "running")
+        self.assertEqual((scaler.stats()["scaled_up"], scaler.stats()["scaled_down"]), (1, 1))
+
+    def test_only_running_exports_are_scaled(self):
+        scaler = self._scaler()
+
+        async def scenario():
+            await self._deploy("ui_a")
+            await scaler.scale("ui_a", 2)
+            await self.lifecycle.park(self.store.get_deployment("ui_a"))
+            with self.assertRaises(ExportNotRunningError):
+                await scaler.scale("ui_a", 2)
+            missing = await scaler.scale("ui_missing", 2)
+            await self.pool.shutdown()
+            return missing
+
+        self.assertIsNone(asyncio.run(scenario()))
+        # parking removed the replica too
+        self.assertEqual(self._containers(), set())
+        self.assertEqual(self.store.replicas("ui_a"), [])
+        self.assertTrue(self.routes.is_parked("ui_a"))
+
+    def test_replicas_of_a_cancelled_scale_are_removed(self):
+        scaler = self._scaler(max_replicas=3)
+        configure = self.pool.configure
+
+        async def scenario():
+            instance = await self._deploy("ui_a")
+            configured = asyncio.Event()
+
+            async def configure_one(replica, bundle):
+                # the first replica starts, the second hangs
+                if configured.is_set():
+                    await asyncio.sleep(30)
+                await configure(replica, bundle)
+                configured.set()
+
+            self.pool.configure = configure_one
+            scaling = asyncio.ensure_future(scaler.scale("ui_a", 3))
+            await configured.wait()
+            while not self.store.replicas("ui_a"):
+                await asyncio.sleep(0.01)
+            scaling.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await scaling
+            await self.pool.shutdown()
+            return instance
+
+        instance = asyncio.run(scenario())
+        self.assertEqual(self._containers(), {instance.name})
+        self.assertEqual(self.store.replicas("ui_a"), [])
+        self.assertEqual(self.routes.replicas("ui_a"), [instance.url])
+        self.assertEqual(self.store.get_deployment("ui_a")["state"], "running")
+
+    def test_routes_are_scaled_to_their_load(self):
+        scaler = self._scaler(max_replicas=4, target_in_flight=4, scale_down_after=0.2)
+
+        async def scenario():
+            await self._deploy("ui_hot")
+            await self._deploy("ui_quiet")
+            self.metrics = _proxy_metrics(10, {"ui_hot": 0, "ui_quiet": 0})
+            await scaler.autoscale()
+            # 10 requests in flight on average over 10 s, against 4 per container
+            self.metrics = _proxy_metrics(20, {"ui_hot": 100_000, "ui_quiet": 1_000})
+            await scaler.autoscale()
+            hot = len(self.routes.replicas("ui_hot"))
+            load = scaler.stats()["load"]
+            self.metrics = _proxy_metrics(30, {"ui_hot": 101_000, "ui_quiet": 1_000})
+            await scaler.autoscale()
+            kept = len(self.routes.replicas("ui_hot"))
+            await asyncio.sleep(0.3)
+            self.metrics = _proxy_metrics(40, {"ui_hot": 102_000, "ui_quiet": 1_000})
+            await scaler.autoscale()
+            await scaler.shutdown()
+            await self.pool.shutdown()
+            return hot, load, kept
+
+        hot, load, kept = asyncio.run(scenario())
+        self.assertEqual(hot, 3)
+        self.assertEqual(load, {"ui_hot": 10.0, "ui_quiet": 0.1})
+        # not scaled down before scale_down_after
+        self.assertEqual(kept, 3)
+        self.assertEqual(len(self.routes.replicas("ui_hot")), 1)
+        self.assertEqual(len(self.routes.replicas("ui_quiet")), 1)
+        self.assertEqual(len(self._containers()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
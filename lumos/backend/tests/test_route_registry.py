@@ -0,0 +1,124 @@
+import unittest
+import json
+import subprocess
+import tempfile
+import threading
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.route_registry import RouteRegistry
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# One backend worker registering `count` exports
+WORKER = """
+import sys
+sys.path.insert(0, {backend!r})
+from app.services.route_registry import RouteRegistry
+routes = RouteRegistry({path!r}, compact_every=25)
+for i in range({count}):
+    routes.add(f"ui_{{sys.argv[1]}}_{{i}}", f"http://localhost:{{5000 + i}}")
+    if i % 3 == 0:
+        routes.remove(f"ui_{{sys.argv[1]}}_{{i}}")
+"""
+
+
+class TestRouteRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "route_map.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_add_lookup_remove(self):
+        routes = RouteRegistry(self.path)
+        changes = []
+        routes.add_listener(changes.append)
+        routes.add("ui_a", "http://localhost:5001")
+        routes.add("ui_b", "http://localhost:5002")
+        routes.remove("ui_a")
+        self.assertIsNone(routes.lookup("ui_a"))
+        self.assertEqual(routes.lookup("ui_b"), "http://localhost:5002")
+        self.assertEqual([change["op"] for change in changes], ["add", "add", "remove"])
+        self.assertEqual(RouteRegistry(self.path).routes(), {"ui_b": "http://localhost:5002"})
+
+    def test_route_with_replicas(self):
+        routes = RouteRegistry(self.path, compact_every=2)
+        reader = RouteRegistry(self.path)
+        routes.add("ui_a", ["http://localhost:5001", "http://localhost:5002"])
+        reader.refresh()
+        self.assertEqual(reader.replicas("ui_a"), ["http://localhost:5001", "http://localhost:5002"])
+        self.assertEqual(reader.lookup("ui_a"), "http://localhost:5001")
+        self.assertEqual(reader.stats()["replicated"], 1)
+        # one replica left is stored as a plain URL, as route_map.json always had it
+        routes.add("ui_a", ["http://localhost:5001"])
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"ui_a": "http://localhost:5001"})
+        reader.refresh()
+        self.assertEqual(reader.replicas("ui_a"), ["http://localhost:5001"])
+        routes.park("ui_a")
+        self.assertIsNone(routes.replicas("ui_a"))
+
+    def test_existing_route_map_is_loaded(self):
+        with open(self.path, "w") as f:
+            json.dump({"ui_old": "http://localhost:5000"}, f)
+        routes = RouteRegistry(self.path)
+        routes.add("ui_new", "http://localhost:5001")
+        self.assertEqual(RouteRegistry(self.path).routes(),
+                         {"ui_old": "http://localhost:5000", "ui_new": "http://localhost:5001"})
+
+    def test_compaction_keeps_the_routes(self):
+        routes = RouteRegistry(self.path, compact_every=4)
+        reader = RouteRegistry(self.path)
+        self.assertEqual(reader.routes(), {})
+        for i in range(10):
+            routes.add(f"ui_{i}", f"http://localhost:{5000 + i}")
+        routes.remove("ui_0")
+        self.assertEqual(routes.stats()["compactions"], 2)
+        with open(self.path) as f:
+            self.assertEqual(len(json.load(f)), 8)
+        # a reader that was following the old log notices it was compacted away
+        reader.refresh()
+        self.assertEqual(reader.routes(), routes.routes())
+        self.assertEqual(len(reader.routes()), 9)
+
+    def test_torn_log_line_is_skipped(self):
+        routes = RouteRegistry(self.path)
+        routes.add("ui_a", "http://localhost:5001")
+        with open(routes.log_path, "ab") as f:
+            f.write(b'{"op": "add", "na')
+        self.assertEqual(RouteRegistry(self.path).routes(), {"ui_a": "http://localhost:5001"})
+        RouteRegistry(self.path).add("ui_b", "http://localhost:5002")
+        self.assertEqual(RouteRegistry(self.path).routes(),
+                         {"ui_a": "http://localhost:5001", "ui_b": "http://localhost:5002"})
+
+    def test_concurrent_exports_in_threads_lose_no_routes(self):
+        # one registry per thread, as separate workers would have
+        def export(worker):
+            routes = RouteRegistry(self.path, compact_every=30)
+            for i in range(50):
+                routes.add(f"ui_{worker}_{i}", f"http://localhost:{5000 + i}")
+
+        threads = [threading.Thread(target=export, args=(w,)) for w in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(RouteRegistry(self.path).routes()), 400)
+
+    def test_concurrent_exports_in_processes_lose_no_routes(self):
+        script = WORKER.format(backend=BACKEND_DIR, path=self.path, count=60)
+        reader = RouteRegistry(self.path)
+        self.assertEqual(reader.routes(), {})
+        workers = [subprocess.Popen([sys.executable, "-c", script, str(w)]) for w in range(4)]
+        for worker in workers:
+            self.assertEqual(worker.wait(timeout=60), 0)
+        expected = {f"ui_{w}_{i}" for w in range(4) for i in range(60) if i % 3 != 0}
+        self.assertEqual(set(RouteRegistry(self.path).routes()), expected)
+        self.assertIsNone(reader.lookup("ui_0_1"))
+        self.assertEqual(reader.lookup("ui_0_1", refresh_on_miss=True), "http://localhost:5001")
+        self.assertEqual(set(reader.routes()), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
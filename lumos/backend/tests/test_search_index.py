@@ -0,0 +1,118 @@
+import unittest
+import tempfile
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.models.search_index import tokenize
+from app.models.sqlite_storage_strategy import SQLiteProjectStorage
+from benchmarks.synthetic import make_project
+
+
+def _project(name, agents, tools=()):
+    project = make_project(0, name=name)
+    project["agents"] = [
+        {"id": agent_id, "name": agent_name, "description": description, "type": "AI", "subtype": "LLM",
+         "capabilities": capabilities, "tools": []}
+        for agent_id, agent_name, description, capabilities in agents
+    ]
+    project["tools"] = [
+        {"id": tool_id, "name": tool_name, "description": "", "type": tool_type}
+        for tool_id, tool_name, tool_type in tools
+    ]
+    return project
+
+
+class TestTokenize(unittest.TestCase):
+    def test_splits_lowercases_and_drops_stop_words(self):
+        self.assertEqual(tokenize("The Fact-Checker of news"), ["fact", "checker", "news"])
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SQLiteProjectStorage(os.path.join(self.tmp.name, "lumos.sqlite3"))
+        self.news = self.storage.save_project(_project("News", [
+            ("checker", "Fact Checker", "Verifies claims", ["fact-checking"]),
+            ("writer", "Writer", "Writes articles that a fact checker reviews", ["writing"]),
+        ], [("summarizer", "Digest", "Summarization")]))["project_id"]
+        self.research = self.storage.create_project(_project("Research", [
+            ("reviewer", "Fact Checker", "Checks citations", ["fact-checking", "citations"]),
+        ]))["project_id"]
+
+    def tearDown(self):
+        self.storage.db.disconnect()
+        self.tmp.cleanup()
+
+    def test_ranks_name_matches_above_description_matches(self):
+        results, next_offset = self.storage.search("fact checker")
+        self.assertEqual([(r["project_id"], r["id"]) for r in results][-1], (self.news, "writer"))
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]["name"], "Fact Checker")
+        self.assertEqual(results[0]["project_name"], "News")
+        self.assertIsNone(next_offset)
+
+    def test_facet_filters_with_and_without_terms(self):
+        results, _ = self.storage.search("", {"kind": "tool", "type": "summarization"})
+        self.assertEqual([(r["project_id"], r["id"]) for r in results], [(self.news, "summarizer")])
+
+        results, _ = self.storage.search("checker", {"capability": "citations"})
+        self.assertEqual([r["id"] for r in results], ["reviewer"])
+
+    def test_pagination(self):
+        first, next_offset = self.storage.search("fact", limit=2)
+        self.assertEqual(next_offset, 2)
+        rest, next_offset = self.storage.search("fact", limit=2, offset=next_offset)
+        self.assertIsNone(next_offset)
+        self.assertEqual(len({(r["project_id"], r["id"]) for r in first + rest}), 3)
+
+    def test_saving_a_project_updates_its_entries(self):
+        self.storage.save_project(_project("News", [
+            ("writer", "Writer", "Writes articles", ["writing"]),
+        ]), project_id=self.news)
+        results, _ = self.storage.search("fact checker")
+        self.assertEqual([(r["project_id"], r["id"]) for r in results], [(self.research, "reviewer")])
+
+    def test_entities_without_an_id_are_not_indexed(self):
+        project = _project("Drafts", [("editor", "Editor", "Edits drafts", [])], [("", "Draft Tool", "Drafting")])
+        project["agents"].append({"name": "Draft Agent", "description": "No id yet", "type": "AI",
+                                  "tools": [{"name": "Draft Tool"}]})
+        del project["tools"][0]["id"]
+        saved = self.storage.save_project(project)
+        self.assertEqual(saved["status"], "success")
+        results, _ = self.storage.search("edits drafts")
+        self.assertEqual([(r["project_id"], r["id"]) for r in results], [(saved["project_id"], "editor")])
+
+    def test_invalid_queries(self):
+        with self.assertRaises(ValueError):
+            self.storage.search("")
+        with self.assertRaises(ValueError):
+            self.storage.search("fact", {"color": "red"})
+
+    def test_reindex_rebuilds_from_stored_projects(self):
+        conn = self.storage.db.get_connection()
+        cursor = conn.cursor()
+        try:
+            for table in ("search_postings", "search_facets", "search_entities"):
+                cursor.execute(f"DELETE FROM {table}")
+            conn.commit()
+        finally:
+            cursor.close()
+            conn.close()
+        self.assertEqual(self.storage.reindex_search(chunk_size=1), 2)
+        results, _ = self.storage.search("checker", {"kind": "agent"})
+        self.assertEqual(len(results), 3)
+
+    def test_term_lookup_uses_the_index(self):
+        conn = self.storage.db.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("EXPLAIN QUERY PLAN SELECT project_id FROM search_postings WHERE term IN (%s, %s)",
+                           ("fact", "checker"))
+            plan = " ".join(str(row[-1]) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+            conn.close()
+        self.assertIn("SEARCH search_postings", plan)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,227 @@
+import unittest
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.models.sql_storage_strategy import SQLProjectStorage
+from app.models.project_queries import PROJECT_CHILD_QUERIES, build_projects_query
+from benchmarks.synthetic import make_project
+
+
+class RecordingCursor:
+    """Cursor double that records statements and hands out auto-increment ids."""
+    def __init__(self, db):
+        self.db = db
+        self.lastrowid = None
+        self._result = []
+
+    def execute(self, query, params=()):
+        self.db.statements.append((query, list(params)))
+        words = query.split()
+        if words[0] == "INSERT":
+            table = words[2]
+            rows = query.count("(") - 1
+            ids = self.db.ids.setdefault(table, [])
+            ids.extend(range(len(ids) + 1, len(ids) + rows + 1))
+            self.lastrowid = ids[-rows]
+        elif words[0] == "SELECT":
+            self._result = [{"id": row_id} for row_id in self.db.ids.get(words[words.index("FROM") + 1], [])]
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+class RecordingDatabase:
+    def __init__(self):
+        self.statements = []
+        self.ids = {}
+        self.committed = False
+
+    def get_connection(self):
+        return self
+
+    def cursor(self, dictionary=False):
+        return RecordingCursor(self)
+
+    def start_transaction(self):
+        pass
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def inserts_into(self, table):
+        return [params for query, params in self.statements if query.startswith(f"INSERT INTO {table} ")]
+
+
+class TestSQLProjectStorageBulkInsert(unittest.TestCase):
+    def test_create_project_batches_rows_per_table(self):
+        db = RecordingDatabase()
+        project = make_project(25)
+        result = SQLProjectStorage(db, batch_size=10).create_project(project)
+
+        self.assertEqual(result["status"], "success")
+        self.assertTrue(db.committed)
+        # 25 agents in chunks of 10, 75 capabilities in chunks of 10
+        self.assertEqual(len(db.inserts_into("agents")), 3)
+        self.assertEqual(len(db.inserts_into("agent_capabilities")), 8)
+        # one statement per chunk, not per row (version history and search index aside)
+        project_tables = [q for q, _ in db.statements if "project_blobs" not in q and "search_" not in q]
+        self.assertLess(len(project_tables), 60)
+
+    def test_child_rows_reference_their_parent_row_ids(self):
+        db = RecordingDatabase()
+        db.ids["agents"] = [1, 2, 3]  # rows belonging to an earlier project
+        project = make_project(3, capabilities_per_agent=1, tools_per_agent=0)
+        SQLProjectStorage(db, batch_size=100).create_project(project)
+
+        capabilities = db.inserts_into("agent_capabilities")[0]
+        self.assertEqual(capabilities[0::2], [4, 5, 6])
+        participants = db.inserts_into("interaction_participants")[0]
+        self.assertEqual(participants[0::2], [1, 1, 2, 2])
+
+    def test_save_project_batches_agents_tools_and_connections(self):
+        db = RecordingDatabase()
+        result = SQLProjectStorage(db, batch_size=1000).save_project(make_project(50))
+
+        self.assertEqual(result["status"], "success")
+        for table in ("agents", "tools", "connections"):
+            self.assertEqual(len(db.inserts_into(table)), 1)
+
+    def test_save_into_existing_project_locks_it_first(self):
+        db = RecordingDatabase()
+        db.ids["projects"] = [1]
+        result = SQLProjectStorage(db, batch_size=1000).save_project(make_project(3), project_id=1)
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(db.statements[0], ("SELECT id FROM projects WHERE id = %s FOR UPDATE", [1]))
+        version_reads = [q for q, _ in db.statements if "FROM project_versions" in q]
+        self.assertTrue(version_reads[0].endswith("FOR UPDATE"))
+
+
+def _table_rows(agent_count):
+    """Rows as create_project would have written them for `agent_count` agents."""
+    agents = [{"id": 100 + i, "agent_id": f"agent-{i}", "name": f"Agent {i}", "description": "d",
+               "type": "AI", "subtype": None} for i in range(agent_count)]
+    return {
+        "authors": [{"name": "alice"}],
+        "agents": agents,
+        "agent_models": [{"agent_id": a["id"], "name": "gpt-4o", "version": None, "provider": "openai",
+                          "parameters": "{'temperature': 0.2}"} for a in agents],
+        "agent_capabilities": [{"agent_id": a["id"], "capability": c} for a in agents for c in ("plan", "act")],
+        "agent_tools": [{"agent_id": a["id"], "name": "Search", "description": "web", "type": "Information",
+                         "subtype": "", "parameters": "{}"} for a in agents],
+        "tools": [],
+        "connections": [{"connection_id": "c-1", "source": "agent-0", "target": "agent-1", "label": "hand off"}],
+        "interactions": [{"id": 7, "interaction_id": "interaction-0", "type": "AgentAgent", "subtype": "", "pattern": None}],
+        "interaction_participants": [{"interaction_id": 7, "agent_id": "agent-0"},
+                                     {"interaction_id": 7, "agent_id": "agent-1"}],
+        "interaction_protocols": [{"interaction_id": 7, "type": "DirectedMessaging", "message_types": "['task']"}],
+    }
+
+
+class HydrationCursor:
+    def __init__(self, db):
+        self.db = db
+        self._result = None
+
+    def execute(self, query, params=()):
+        self.db.queries.append(query)
+        if query.startswith("SELECT id, name, version"):
+            self._result = [] if self.db.missing else [{"id": 1, "name": "P", "version": "1.0", "description": "", "created_at": None}]
+        else:
+            key = next(k for k, q in PROJECT_CHILD_QUERIES.items() if q == query)
+            self._result = self.db.rows[key]
+
+    def fetchone(self):
+        return self._result[0] if self._result else None
+
+    def fetchall(self):
+        return self._result
+
+    def close(self):
+        pass
+
+
+class HydrationDatabase:
+    Error = Exception
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.missing = False
+
+    def get_connection(self):
+        return self
+
+    def cursor(self, dictionary=False):
+        return HydrationCursor(self)
+
+    def close(self):
+        pass
+
+
+class TestSQLProjectStorageHydration(unittest.TestCase):
+    def _load(self, agent_count):
+        db = HydrationDatabase(_table_rows(agent_count))
+        return SQLProjectStorage(db).get_project_by_id(1), db.queries
+
+    def test_query_count_is_independent_of_agent_count(self):
+        _, small = self._load(2)
+        _, large = self._load(1000)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(large), len(PROJECT_CHILD_QUERIES) + 1)
+
+    def test_hydrates_all_child_tables(self):
+        project, _ = self._load(2)
+        self.assertEqual(project["project"]["authors"], ["alice"])
+
+        agent = project["agents"][0]
+        self.assertEqual(agent["id"], "agent-0")
+        self.assertEqual(agent["capabilities"], ["plan", "act"])
+        self.assertEqual(agent["model"]["parameters"], {"temperature": 0.2})
+        self.assertEqual(agent["model"]["version"], "latest")
+        self.assertEqual(agent["tools"][0]["name"], "Search")
+
+        stored, from_connection = project["interactions"]
+        self.assertEqual(stored["participants"], ["agent-0", "agent-1"])
+        self.assertEqual(stored["protocol"], {"type": "DirectedMessaging", "messageTypes": ["task"]})
+        self.assertEqual(from_connection["name"], "hand off")
+
+    def test_missing_project_returns_error(self):
+        db = HydrationDatabase(_table_rows(0))
+        db.missing = True
+        result = SQLProjectStorage(db).get_project_by_id(42)
+        self.assertEqual(result["status"], "error")
+
+
+class TestBuildProjectsQuery(unittest.TestCase):
+    def test_keyset_on_id(self):
+        query, params = build_projects_query(after_id=10)
+        self.assertEqual(query, "SELECT id, name, version, description, created_at FROM projects WHERE id > %s ORDER BY id")
+        self.assertEqual(params, (10,))
+
+    def test_keyset_on_created_at_breaks_ties_by_id(self):
+        query, _ = build_projects_query(after_id=10, sort="created_at", fields=["name"])
+        self.assertTrue(query.startswith("SELECT id, name FROM projects"))
+        self.assertIn("(created_at, id) > (SELECT created_at, id FROM projects WHERE id = %s)", query)
+        self.assertTrue(query.endswith("ORDER BY created_at, id"))
+
+    def test_rejects_unknown_fields_and_sort_keys(self):
+        with self.assertRaises(ValueError):
+            build_projects_query(fields=["password"])
+        with self.assertRaises(ValueError):
+            build_projects_query(sort="name")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,223 @@
+import unittest
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.models.sqlite_storage_strategy import SQLiteProjectStorage
+from benchmarks.synthetic import make_project
+
+
+class TestSQLiteProjectStorage(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.storage = SQLiteProjectStorage(os.path.join(self.tmp.name, "lumos.sqlite3"), batch_size=7)
+
+    def tearDown(self):
+        self.storage.db.disconnect()
+        self.tmp.cleanup()
+
+    def test_create_and_load_full_project(self):
+        project = make_project(12)
+        result = self.storage.create_project(project)
+        self.assertEqual(result["status"], "success")
+
+        loaded = self.storage.get_project_by_id(result["project_id"])
+        self.assertEqual(loaded["project"]["name"], project["project"]["name"])
+        self.assertEqual(loaded["project"]["authors"], ["benchmark"])
+        self.assertEqual([a["id"] for a in loaded["agents"]], [a["id"] for a in project["agents"]])
+        self.assertEqual(loaded["agents"][3]["capabilities"], project["agents"][3]["capabilities"])
+        self.assertEqual(loaded["agents"][3]["model"]["parameters"], {"temperature": 0.2})
+        self.assertEqual(len(loaded["agents"][3]["tools"]), 2)
+        self.assertEqual(loaded["interactions"][0]["participants"], ["agent-0", "agent-1"])
+        self.assertEqual(loaded["interactions"][0]["protocol"]["messageTypes"], ["task"])
+
+    def test_save_project_twice_keeps_both_copies(self):
+        first = self.storage.save_project(make_project(5))
+        second = self.storage.save_project(make_project(5))
+        self.assertEqual(first["status"], "success")
+        self.assertEqual(second["status"], "success")
+
+        loaded = self.storage.get_project_by_id(second["project_id"])
+        self.assertEqual(len(loaded["agents"]), 5)
+        self.assertEqual(len(loaded["connections"]), 4)
+
+    def test_save_into_existing_project_writes_only_changes(self):
+        project = make_project(20)
+        project_id = self.storage.save_project(make_project(20))["project_id"]
+
+        project["agents"][0]["description"] = "edited"
+        project["agents"].pop()
+        project["agents"].append({"id": "agent-new", "name": "New", "description": "", "type": "AI"})
+        project["tools"][0]["name"] = "Renamed"
+        project["connections"] = project["connections"][:10]
+        project["project"]["name"] = "Renamed project"
+
+        result = self.storage.save_project(project, project_id=project_id)
+        self.assertEqual(result["project_id"], project_id)
+        self.assertEqual(result["changes"]["agents"], {"added": 1, "changed": 1, "removed": 1, "unchanged": 18})
+        self.assertEqual(result["changes"]["tools"], {"added": 0, "changed": 1, "removed": 0, "unchanged": 1})
+        self.assertEqual(result["changes"]["connections"]["removed"], 9)
+
+        loaded = self.storage.get_project_by_id(project_id)
+        self.assertEqual(loaded["project"]["name"], "Renamed project")
+        self.assertEqual(len(loaded["agents"]), 20)
+        self.assertEqual(loaded["agents"][0]["description"], "edited")
+        self.assertEqual((loaded["tools"][0]["id"], loaded["tools"][0]["name"]), ("tool-0", "Renamed"))
+        self.assertEqual(len(loaded["connections"]), 10)
+        self.assertEqual(len(self.storage.get_all_projects()), 1)
+
+    def test_unchanged_save_writes_nothing(self):
+        project_id = self.storage.save_project(make_project(5))["project_id"]
+        result = self.storage.save_project(make_project(5), project_id=project_id)
+        for counts in result["changes"].values():
+            self.assertEqual((counts["added"], counts["changed"], counts["removed"]), (0, 0, 0))
+
+    def test_save_into_missing_project_fails(self):
+        result = self.storage.save_project(make_project(1), project_id=404)
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(self.storage.get_all_projects(), [])
+
+    def test_save_with_duplicate_ids_is_rejected(self):
+        project = make_project(5)
+        project_id = self.storage.save_project(make_project(5))["project_id"]
+        project["agents"][1]["id"] = project["agents"][0]["id"]
+
+        result = self.storage.save_project(project, project_id=project_id)
+        self.assertEqual(result["status"], "error")
+        self.assertIn("Duplicate id 'agent-0' in agents", result["message"])
+        self.assertEqual(len(self.storage.get_project_by_id(project_id)["agents"]), 5)
+
+        project = make_project(5)
+        project["connections"].append(dict(project["connections"][0]))
+        result = self.storage.save_project(project)
+        self.assertEqual(result["status"], "error")
+        self.assertIn("in connections", result["message"])
+
+    def test_connection_interactions_do_not_grow_on_round_trips(self):
+        project_id = self.storage.save_project(make_project(5))["project_id"]
+        first = self.storage.get_project_by_id(project_id)
+
+        copy_id = self.storage.create_project(first)["project_id"]
+        second = self.storage.get_project_by_id(copy_id)
+        ids = [interaction["id"] for interaction in second["interactions"]]
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(ids, [interaction["id"] for interaction in first["interactions"]])
+
+    def test_missing_project(self):
+        self.assertEqual(self.storage.get_project_by_id(404)["status"], "error")
+
+    def test_keyset_pages_and_stream_cover_every_project(self):
+        ids = [self.storage.save_project(make_project(1, name=f"p{i}"))["project_id"] for i in range(7)]
+
+        seen, after_id = [], None
+        while True:
+            rows, after_id = self.storage.get_projects_page(after_id, limit=3, sort="created_at", fields=["name"])
+            seen.extend(row["id"] for row in rows)
+            self.assertEqual(set(rows[0]), {"id", "name"})
+            if after_id is None:
+                break
+        self.assertEqual(seen, ids)
+
+        streamed = [row["id"] for row in self.storage.iter_projects(after_id=ids[1], chunk_size=2)]
+        self.assertEqual(streamed, ids[2:])
+
+    def test_abandoned_stream_does_not_leak_connections(self):
+        for i in range(3):
+            self.storage.save_project(make_project(1, name=f"p{i}"))
+        rows = self.storage.iter_projects(chunk_size=1)
+        next(rows)
+        rows.close()
+        self.assertEqual(self.storage.db.pool_stats()["in_use"], 0)
+
+    def test_failed_write_is_rolled_back(self):
+        project = make_project(3)
+        project["agents"][2]["name"] = None  # violates NOT NULL
+        result = self.storage.create_project(project)
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(self.storage.get_all_projects(), [])
+
+    def test_listeners_are_notified_after_commit(self):
+        events = []
+        self.storage.add_listener(lambda event, project_id: events.append((event, project_id)))
+        created = self.storage.create_project(make_project(1))["project_id"]
+        saved = self.storage.save_project(make_project(1))["project_id"]
+        self.assertEqual(events, [("created", created), ("saved", saved)])
+
+
+    def test_each_save_records_a_version(self):
+        project = make_project(20)
+        created = self.storage.save_project(make_project(20))
+        project_id = created["project_id"]
+        self.assertEqual(created["version"], 1)
+
+        project["agents"][4]["description"] = "edited"
+        project["connections"].pop()
+        self.assertEqual(self.storage.save_project(project, project_id=project_id)["version"], 2)
+        # Saving the same document again does not add a version
+        self.assertEqual(self.storage.save_project(project, project_id=project_id)["version"], 2)
+
+        versions = self.storage.list_versions(project_id)
+        self.assertEqual([v["version_number"] for v in versions], [1, 2])
+
+        latest = self.storage.get_version(project_id)
+        self.assertEqual(latest["version"], 2)
+        self.assertEqual(latest["document"]["agents"][4]["description"], "edited")
+        self.assertEqual(self.storage.get_version(project_id, 2)["document"], latest["document"])
+        first = self.storage.get_version(project_id, 1)["document"]
+        self.assertEqual(len(first["connections"]), 19)
+        self.assertEqual(self.storage.get_version(project_id, 3)["status"], "error")
+
+    def test_concurrent_saves_get_distinct_versions(self):
+        project_id = self.storage.save_project(make_project(10))["project_id"]
+
+        def save(i):
+            project = make_project(10)
+            project["agents"][0]["description"] = f"edit {i}"
+            return self.storage.save_project(project, project_id=project_id)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(save, range(8)))
+
+        self.assertEqual({r["status"] for r in results}, {"success"})
+        self.assertEqual(sorted(r["version"] for r in results), list(range(2, 10)))
+
+    def test_versions_share_unchanged_blobs(self):
+        project = make_project(200)
+        project_id = self.storage.save_project(make_project(200))["project_id"]
+        project["agents"][0]["name"] = "Renamed"
+
+        conn = self.storage.db.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT COUNT(*) FROM project_blobs")
+            before = cursor.fetchone()[0]
+            self.storage.save_project(project, project_id=project_id)
+            cursor.execute("SELECT COUNT(*) FROM project_blobs")
+            added = cursor.fetchone()[0] - before
+        finally:
+            cursor.close()
+            conn.close()
+        # The edited agent, its page of the agent list and the manifest
+        self.assertEqual(added, 3)
+
+    def test_diff_versions(self):
+        project = make_project(5)
+        project_id = self.storage.save_project(make_project(5))["project_id"]
+        project["project"]["name"] = "Renamed project"
+        project["agents"][1]["description"] = "edited"
+        project["agents"].pop()
+        project["tools"].append({"id": "tool-new", "name": "New", "description": "", "type": "api"})
+        self.storage.save_project(project, project_id=project_id)
+
+        diff = self.storage.diff_versions(project_id, 1, 2)
+        self.assertEqual(list(diff["fields"]), ["project"])
+        self.assertEqual(diff["fields"]["project"]["to"]["name"], "Renamed project")
+        agents = diff["sections"]["agents"]
+        self.assertEqual((agents["added"], agents["removed"]), ([], ["agent-4"]))
+        self.assertEqual([change["id"] for change in agents["changed"]], ["agent-1"])
+        self.assertEqual(agents["changed"][0]["fields"]["description"]["to"], "edited")
+        self.assertEqual(diff["sections"]["tools"]["added"], ["tool-new"])
+        self.assertEqual(self.storage.diff_versions(project_id, 1, 9)["status"], "error")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+import asyncio
+from aiohttp import web
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.tunnel_resolver import TunnelResolver
+from app.utils.network_utils import random_free_port
+
+
+class FakeNgrokAPI:
+    """The ngrok agent's /api/tunnels, serving whatever `tunnels` holds."""
+
+    def __init__(self):
+        self.port = random_free_port()
+        self.url = f"http://127.0.0.1:{self.port}/api/tunnels"
+        self.tunnels = []
+        self.requests = 0
+        self.delay = 0
+        self._runner = None
+
+    async def _handle(self, request):
+        self.requests += 1
+        await asyncio.sleep(self.delay)
+        return web.json_response({"tunnels": self.tunnels})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/api/tunnels", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, "127.0.0.1", self.port).start()
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+class TestTunnelResolver(unittest.TestCase):
+    def test_url_is_looked_up_once_and_cached(self):
+        async def scenario():
+            api = FakeNgrokAPI()
+            api.delay = 0.05
+            api.tunnels = [{"public_url": "http://abc.ngrok.app"}, {"public_url": "https://abc.ngrok.app"}]
+            await api.start()
+            resolver = TunnelResolver(api.url)
+            try:
+                urls = await asyncio.gather(*(resolver.resolve() for _ in range(5)))
+                urls.append(await resolver.resolve())
+            finally:
+                await resolver.shutdown()
+                await api.stop()
+            return urls, api.requests, resolver.stats()
+
+        urls, requests, stats = asyncio.run(scenario())
+        self.assertEqual(set(urls), {"https://abc.ngrok.app"})
+        # concurrent lookups shared one request
+        self.assertEqual(requests, 1)
+        self.assertEqual(stats["hits"], 1)
+
+    def test_waits_for_the_tunnel_to_come_up(self):
+        async def scenario():
+            api = FakeNgrokAPI()
+            await api.start()
+            resolver = TunnelResolver(api.url, timeout=5)
+            asyncio.get_running_loop().call_later(0.3, lambda: api.tunnels.append({"public_url": "https://late.ngrok.app"}))
+            try:
+                return await resolver.resolve(), resolver.stats()["failures"]
+            finally:
+                await resolver.shutdown()
+                await api.stop()
+
+        url, failures = asyncio.run(scenario())
+        self.assertEqual(url, "https://late.ngrok.app")
+        self.assertGreater(failures, 0)
+
+    def test_gives_up_at_the_deadline(self):
+        resolver = TunnelResolver(f"http://127.0.0.1:{random_free_port()}/api/tunnels", timeout=0.3)
+
+        async def scenario():
+            try:
+                await resolver.resolve()
+            finally:
+                await resolver.shutdown()
+
+        with self.assertRaisesRegex(RuntimeError, "Ngrok tunnel not found"):
+            asyncio.run(scenario())
+
+    def test_background_refresh_picks_up_a_new_tunnel(self):
+        async def scenario():
+            api = FakeNgrokAPI()
+            api.tunnels = [{"public_url": "https://old.ngrok.app"}]
+            await api.start()
+            resolver = TunnelResolver(api.url, refresh_interval=0.05)
+            try:
+                await resolver.start()
+                first = await resolver.resolve()
+                api.tunnels = [{"public_url": "https://new.ngrok.app"}]
+                await asyncio.sleep(0.2)
+                return first, await resolver.resolve()
+            finally:
+                await resolver.shutdown()
+                await api.stop()
+
+        self.assertEqual(asyncio.run(scenario()), ("https://old.ngrok.app", "https://new.ngrok.app"))
+
+    def test_url_of_a_stopped_tunnel_is_not_served(self):
+        async def scenario():
+            api = FakeNgrokAPI()
+            api.tunnels = [{"public_url": "https://old.ngrok.app"}]
+            await api.start()
+            resolver = TunnelResolver(api.url, refresh_interval=0.05, timeout=5)
+            try:
+                await resolver.start()
+                first = await resolver.resolve()
+                # ngrok restarts: its tunnel goes away, then comes back on a new URL
+                api.tunnels = []
+                await asyncio.sleep(0.1)
+                stopped = resolver.stats()["public_url"]
+                asyncio.get_running_loop().call_later(
+                    0.2, lambda: api.tunnels.append({"public_url": "https://new.ngrok.app"}))
+                return first, stopped, await resolver.resolve()
+            finally:
+                await resolver.shutdown()
+                await api.stop()
+
+        self.assertEqual(asyncio.run(scenario()), ("https://old.ngrok.app", None, "https://new.ngrok.app"))
+
+
+if __name__ == '__main__':
+    unittest.main()
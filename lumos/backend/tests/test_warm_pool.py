@@ -0,0 +1,97 @@
+import unittest
+import asyncio
+import time
+import aiohttp
+import sys, os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from app.services.image_cache import ImageCache
+from app.services.warm_pool import WarmPool
+from tests import fake_docker
+
+
+class TestWarmPool(fake_docker.FakeDockerTestCase):
+    def setUp(self):
+        super().setUp()
+        self.image_cache = ImageCache(self.context, repository="ui")
+
+    async def _wait_for_idle(self, pool, count, timeout=10):
+        deadline = time.monotonic() + timeout
+        while pool.stats()["idle"] < count:
+            self.assertLess(time.monotonic(), deadline, "pool did not fill")
+            await asyncio.sleep(0.05)
+
+    def test_claims_are_served_warm_and_the_pool_refills(self):
+        pool = WarmPool(self.image_cache, min_size=2, max_size=3)
+
+        async def scenario():
+            await pool.start()
+            await self._wait_for_idle(pool, 2)
+
+            latencies = []
+            for i in range(4):
+                started = time.monotonic()
+                instance = await pool.claim()
+                await pool.configure(instance, {"project": {"name": f"p{i}"}})
+                latencies.append(time.monotonic() - started)
+                await self._wait_for_idle(pool, 2)
+
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"{instance.url}/_admin/config") as resp:
+                    config = await resp.json()
+            await pool.shutdown()
+            return latencies, config
+
+        latencies, config = asyncio.run(scenario())
+        self.assertEqual(config, {"project": {"name": "p3"}})
+        self.assertLess(sorted(latencies)[-1], 0.2)
+        stats = pool.stats()
+        self.assertEqual((stats["claims"], stats["cold_starts"]), (4, 0))
+        # 6 started: 2 initially plus a refill per claim; idle ones removed on shutdown
+        self.assertEqual(len(fake_docker.calls(self.env, "run")), 6)
+        self.assertEqual(len(fake_docker.read_state(self.env)["containers"]), 4)
+
+    def test_empty_pool_starts_a_container_on_demand(self):
+        pool = WarmPool(self.image_cache, min_size=0, max_size=0)
+
+        async def scenario():
+            instance = await pool.claim()
+            await pool.configure(instance, {"project": {"name": "cold"}})
+            await pool.shutdown()
+
+        asyncio.run(scenario())
+        self.assertEqual(pool.stats()["cold_starts"], 1)
+
+    def test_config_push_needs_the_container_token(self):
+        pool = WarmPool(self.image_cache, min_size=0, max_size=0)
+
+        async def scenario():
+            instance = await pool.claim()
+            instance.token = "wrong"
+            try:
+                await pool.configure(instance, {})
+            finally:
+                await pool.shutdown()
+
+        with self.assertRaises(RuntimeError):
+            asyncio.run(scenario())
+
+    def test_idle_containers_of_an_outdated_image_are_replaced(self):
+        pool = WarmPool(self.image_cache, min_size=1, max_size=1)
+
+        async def scenario():
+            await pool.refill()
+            old = list(pool._idle)
+            with open(os.path.join(self.context, "app.py"), "w") as f:
+                f.write("print('changed')")
+            await pool.refill()
+            new = list(pool._idle)
+            await pool.shutdown()
+            return old, new
+
+        old, new = asyncio.run(scenario())
+        self.assertNotEqual(old[0].image, new[0].image)
+        self.assertIn(f"rm -f {old[0].name}", fake_docker.calls(self.env, "rm"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,34 @@
 from flask import Flask, request, render_template
+import hmac
 import os
 import json
 import openai
 import re
+from config_store import ConfigStore
 
 app = Flask(__name__)
 
-config = json.loads(os.environ.get("CONFIG", "{}"))
+# Project config bundle, pushed by the backend or bind-mounted; parsed on first use
+CONFIG = ConfigStore(os.environ.get("CONFIG_PATH", "/app/data/config.lumos"))
 OPENAI_API_KEY = ""
+# Secret for the admin endpoints; warm pool containers get their config through them
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+@app.route('/_admin/health')
+def admin_health():
+    version = CONFIG.stored_version()
+    return {"status": "ok", "configured": version is not None, "config_version": version}
+
+@app.route('/_admin/config', methods=['POST'])
+def admin_config():
+    if not ADMIN_TOKEN or not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return {"error": "Forbidden"}, 403
+    version = request.headers.get("X-Config-Version", "")
+    try:
+        changed = CONFIG.save(request.stream, version)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    return {"status": "ok", "version": version, "changed": changed}
 
 @app.route('/', methods=['GET', 'POST'])
 def home():
@@ -71,7 +92,7 @@ def home():
         
         User Instruction: {user_input}
         
-        Multi-Agent System: {config}
+        Multi-Agent System: {CONFIG.text()}
         
         React:'''
         client = openai.OpenAI(api_key=OPENAI_API_KEY)
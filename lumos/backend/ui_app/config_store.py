@@ -0,0 +1,114 @@
+import json
+import mmap
+import os
+import threading
+import zlib
+
+# Written by the backend (app/utils/config_bundle.py): b"LUMOSCFG <format> <version>\n"
+# followed by the gzipped JSON of the project config
+MAGIC = b"LUMOSCFG"
+FORMAT_VERSION = 1
+COPY_CHUNK_SIZE = 1 << 20
+
+
+def read_header(data):
+    end = bytes(data[:128]).find(b"\n")
+    parts = bytes(data[:end]).split(b" ") if end > 0 else []
+    if len(parts) != 3 or parts[0] != MAGIC or int(parts[1]) != FORMAT_VERSION:
+        raise ValueError("Not a config bundle")
+    return parts[2].decode(), end + 1
+
+
+class ConfigStore:
+    """
+    The project config of this container, kept as a compressed bundle file
+    at `path`: pushed by the backend through /_admin/config or bind-mounted.
+
+    Nothing is parsed at import. The first request after a new version
+    arrives memory-maps the file and decompresses and parses it once; the
+    config and the text rendered into prompts are then reused until the
+    file changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file_id = None
+        self.version = None
+        self._config = {}
+        self._text = "{}"
+
+    def _current_id(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        file_id = self._current_id()
+        if file_id == self._file_id:
+            return
+        with self._lock:
+            if file_id == self._file_id:
+                return
+            self._file_id = file_id
+            if file_id is None:
+                self.version, self._config, self._text = None, {}, "{}"
+                return
+            try:
+                with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    version, offset = read_header(mapped)
+                    with memoryview(mapped) as view:
+                        # wbits=31: gzip container
+                        raw = zlib.decompressobj(wbits=31).decompress(view[offset:])
+                config = json.loads(raw)
+            except (OSError, ValueError, zlib.error) as e:
+                # keep serving the previous config; retried when the file changes again
+                print(f"Error loading config {self.path}: {str(e)}")
+                return
+            self.version, self._config, self._text = version, config, str(config)
+
+    def config(self):
+        self._load()
+        return self._config
+
+    def text(self):
+        """The config as rendered into prompts, built once per version."""
+        self._load()
+        return self._text
+
+    def stored_version(self):
+        """Version of the bundle on disk, read from its header without parsing the config."""
+        try:
+            with open(self.path, "rb") as f:
+                return read_header(f.read(128))[0]
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, stream, version):
+        """
+        Replace the config with the bundle read from `stream`. Written to a
+        temporary file and renamed, so a reader never sees half a bundle.
+        Returns False if `version` is already the current one.
+        """
+        if version and version == self.stored_version():
+            return False
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                while True:
+                    chunk = stream.read(COPY_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+            with open(tmp, "rb") as f:
+                bundle_version, _ = read_header(f.read(128))
+            if version and bundle_version != version:
+                raise ValueError("Config version does not match the bundle")
+            os.replace(tmp, self.path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return True
@@ -38,6 +38,51 @@ describe('ApiService', () => {
       );
     });
 
+    it('follows the export job until it succeeds', async () => {
+      fetchMock
+        .mockResolvedValueOnce({
+          ok: true,
+          status: 202,
+          json: vi.fn().mockResolvedValue({
+            status: 'accepted',
+            job_id: 'abc',
+            status_url: '/api/export/abc',
+            events_url: '/api/export/abc/events',
+          }),
+        } as any)
+        .mockResolvedValueOnce({
+          ok: true,
+          json: vi.fn().mockResolvedValue({
+            status: 'success',
+            job: { state: 'succeeded', finished: true, result: { ngrok_url: 'https://abc.ngrok.app/ui_1' } },
+          }),
+        } as any);
+
+      const response = await ApiService.exportProject({ foo: 'bar' });
+      expect(response).toEqual({ success: true, runtimeUrl: 'https://abc.ngrok.app/ui_1', projectId: undefined });
+      expect(fetchMock).toHaveBeenLastCalledWith('http://localhost:8000/api/export/abc');
+    });
+
+    it('returns failure when the export job fails', async () => {
+      fetchMock
+        .mockResolvedValueOnce({
+          ok: true,
+          status: 202,
+          json: vi.fn().mockResolvedValue({ status: 'accepted', job_id: 'abc', status_url: '/api/export/abc' }),
+        } as any)
+        .mockResolvedValueOnce({
+          ok: true,
+          json: vi.fn().mockResolvedValue({
+            status: 'success',
+            job: { state: 'failed', finished: true, error: 'docker run failed' },
+          }),
+        } as any);
+
+      const response = await ApiService.exportProject({});
+      expect(response.success).toBe(false);
+      expect(heartbeat.resumeHeartbeat).toHaveBeenCalled();
+    });
+
     it('resumes heartbeat and returns failure on non-ok response', async () => {
       fetchMock.mockResolvedValueOnce({ ok: false } as any);
       const response = await ApiService.exportProject({});
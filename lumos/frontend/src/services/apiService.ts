@@ -4,6 +4,10 @@ import YAML from 'js-yaml';
 
 export const API_BASE_URL = 'http://localhost:8000/api'; // Ensure this matches your backend URL
 
+// Exports run as background jobs on the backend; how their status is polled
+export const EXPORT_POLL_INTERVAL_MS = 1000;
+export const EXPORT_TIMEOUT_MS = 10 * 60 * 1000;
+
 // Adapter interface and implementations for LD L formats
 export interface FormatAdapter {
   serialize(data: any): string;
@@ -72,10 +76,14 @@ export class ApiService {
       }
 
       const result = await response.json();
+      // The backend queues the export and answers with its job's status URL
+      const runtimeUrl = result.status_url
+        ? await ApiService.waitForExport(result.status_url)
+        : result.url;
 
       return {
         success: true,
-        runtimeUrl: result.url || undefined,
+        runtimeUrl: runtimeUrl || undefined,
         projectId: result.project_id || undefined,
       };
     } catch (error) {
@@ -87,6 +95,28 @@ export class ApiService {
     }
   }
 
+  /**
+   * Poll an export job until it finishes and return the URL it is served at
+   */
+  private static async waitForExport(statusUrl: string): Promise<string | undefined> {
+    const deadline = Date.now() + EXPORT_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+      const response = await fetch(new URL(statusUrl, API_BASE_URL).toString());
+      if (!response.ok) {
+        throw new Error('Failed to get export status');
+      }
+      const { job } = await response.json();
+      if (job.state === 'succeeded') {
+        return job.result?.ngrok_url;
+      }
+      if (job.finished) {
+        throw new Error(job.error || `Export ${job.state}`);
+      }
+      await new Promise((resolve) => setTimeout(resolve, EXPORT_POLL_INTERVAL_MS));
+    }
+    throw new Error('Timed out waiting for the export');
+  }
+
   /**
    * Save project data to the backend without validation
    * This is for saving checkpoints during development